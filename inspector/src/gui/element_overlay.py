@@ -0,0 +1,81 @@
+import math
+
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QPixmap, QPainter, QPen, QColor
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+
+from logic.AppiumIDPrinter import AppiumIDPrinter
+
+MIN_BOX_PIXELS = 4 # boxes smaller than this on screen are culled
+MAX_LAYER_SIDE = 4096
+
+
+class ElementOverlayItem(QGraphicsItem):
+    """
+    Every element box of a snapshot in a single item, colored per class. Painting goes
+    through a cached layer pixmap per zoom bucket that is only rebuilt when the snapshot
+    changes; zoomed in past what a layer can hold, boxes are drawn directly, clipped to
+    the exposed area.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self._printer = AppiumIDPrinter(None, [])
+        self._boxes = {} # color name -> [(x, y, width, height)]
+        self._bounding_rect = QRectF()
+        self._layers = {} # zoom bucket -> QPixmap
+
+
+    def set_element_index(self, element_index, scene_size: tuple):
+        self.prepareGeometryChange()
+        self._boxes = {}
+        for node_id in element_index.bounded_ids():
+            element = element_index.elements[node_id]
+            color = self._printer.get_color_for_class(element.get("class") or element.get("type") or element.tag)
+            self._boxes.setdefault(color, []).append(element_index.bounds[node_id])
+        self._bounding_rect = QRectF(0, 0, *scene_size)
+        self._layers.clear()
+        self.update()
+
+
+    def boundingRect(self):
+        return self._bounding_rect
+
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        if self._bounding_rect.isEmpty():
+            return
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        bucket = 2 ** math.ceil(math.log2(max(lod, 1 / 64)))
+        side = max(self._bounding_rect.width(), self._bounding_rect.height())
+
+        if side * bucket > MAX_LAYER_SIDE:
+            self._draw_boxes(painter, 1.0, lod, option.exposedRect)
+            return
+
+        layer = self._layers.get(bucket)
+        if layer is None:
+            layer = QPixmap(int(self._bounding_rect.width() * bucket), int(self._bounding_rect.height() * bucket))
+            layer.fill(Qt.transparent)
+            layer_painter = QPainter(layer)
+            self._draw_boxes(layer_painter, bucket, bucket, None)
+            layer_painter.end()
+            self._layers[bucket] = layer
+        painter.drawPixmap(self._bounding_rect, layer, QRectF(layer.rect()))
+
+
+    def _draw_boxes(self, painter: QPainter, scale: float, lod: float, exposed: QRectF):
+        min_side = MIN_BOX_PIXELS / lod
+        for color, boxes in self._boxes.items():
+            pen = QPen(QColor(color))
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            rects = []
+            for x, y, width, height in boxes:
+                if width < min_side or height < min_side:
+                    continue
+                if exposed is not None and not exposed.intersects(QRectF(x, y, width, height)):
+                    continue
+                rects.append(QRectF(x * scale, y * scale, width * scale, height * scale))
+            painter.drawRects(rects)
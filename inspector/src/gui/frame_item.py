@@ -0,0 +1,56 @@
+from PySide6.QtCore import Qt, QRect, QRectF
+from PySide6.QtGui import QPixmap, QPainter, QImage
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+
+
+class FrameItem(QGraphicsItem):
+    """
+    Screenshot item that can be patched in place: changed tiles are painted into the
+    pixmap it owns and only their rects are invalidated, so the view repaints the
+    changed area instead of the whole frame.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+        self._pixmap = QPixmap()
+        self._smooth = False
+
+
+    def setTransformationMode(self, mode):
+        self._smooth = mode == Qt.SmoothTransformation
+        self.update()
+
+
+    def pixmap(self):
+        return self._pixmap
+
+
+    def setPixmap(self, pixmap: QPixmap):
+        if pixmap.size() != self._pixmap.size():
+            self.prepareGeometryChange()
+        self._pixmap = pixmap
+        self.update()
+
+
+    def patch(self, image: QImage, rects: list):
+        """Copies the rects (x, y, width, height, pixels) of image over the current frame."""
+        painter = QPainter(self._pixmap)
+        for x, y, width, height in rects:
+            rect = QRect(x, y, width, height)
+            painter.drawImage(rect, image, rect)
+        painter.end()
+        for x, y, width, height in rects:
+            self.update(QRectF(x, y, width, height))
+
+
+    def boundingRect(self):
+        return QRectF(self._pixmap.rect())
+
+
+    def paint(self, painter: QPainter, option: QStyleOptionGraphicsItem, widget=None):
+        if self._pixmap.isNull():
+            return
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, self._smooth)
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        painter.drawPixmap(exposed, self._pixmap, exposed)
@@ -1,57 +1,84 @@
 
-import io
-import re
+from concurrent.futures import ThreadPoolExecutor
 
-from rtree import index
-from PIL import Image, ImageQt
-from lxml import etree
-from PySide6.QtGui import QPixmap, QPen
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QGraphicsScene, QGraphicsView, QSizePolicy, QGraphicsPixmapItem
-from PySide6.QtCore import Qt, QEvent, QRectF
+from PySide6.QtGui import QPixmap, QPen, QImage, QTransform, QPainterPath
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QGraphicsScene, QGraphicsView, QSizePolicy, QGraphicsPathItem, QLabel, QSlider, QHBoxLayout
+from PySide6.QtCore import Qt, QEvent, QRectF, QTimer
 
-from logic import AppiumDriver
+from logic.element_index import ElementIndex
+from logic.snapshot import Snapshot
+from logic.device_worker import DeviceProcess
+from logic.hover_coalescer import HoverCoalescer
+from logic.snapshot_history import SnapshotHistory
 from .zoomable_view import ZoomableGraphicsView
+from .search_panel import SearchPanel
+from .element_overlay import ElementOverlayItem
+from .frame_item import FrameItem
 
 class InspectionPanel(QWidget):
-    def __init__(self, appium_driver: AppiumDriver):
+    def __init__(self, appium_driver: "AppiumDriver" = None, snapshot: Snapshot = None, history: SnapshotHistory = None):
+        """Live panel when given a driver; offline (no device, no Appium) when given only a snapshot."""
         super().__init__()
 
         self._appium_driver = appium_driver
-        self.screenshot = self._appium_driver.get_screenshot_as_png()
-        ss_window_size = self._appium_driver.get_window_size()
+        self._history = history or SnapshotHistory()
+        if snapshot is None:
+            snapshot = self._capture_snapshot()
 
-        self._rtree = index.Index()
-        self._element_map = {} # id -> (x, y, width, height)
-        self._next_id = 0
-        self._extract_elements_bounds(self._appium_driver.page_source)
-
-        # Load and resize image
-        image_px = Image.open(io.BytesIO(self.screenshot)).convert("RGB")
-        self._view_width, self._view_height = ss_window_size["width"], ss_window_size["height"]
-        image = image_px.resize((self._view_width, self._view_height), Image.LANCZOS) 
+        self._rtree = None
+        self._element_map = {} # id -> (x, y, width, height, element)
+        self._pixmap_released = True
 
         # Layout
         layout = QVBoxLayout(self)
-        
+
         # Set image to the view with a mixmap
         self._scene = QGraphicsScene()
-        self._pixmap_item = QGraphicsPixmapItem()
+        self._pixmap_item = FrameItem()
+        self._pixmap_item.setTransformationMode(Qt.SmoothTransformation)
         self._scene.addItem(self._pixmap_item)
-        qt_image = ImageQt.ImageQt(image)
-        self._pixmap_item.setPixmap(QPixmap.fromImage(qt_image))
-        
+
+        # Every element box at once, one cached layer instead of an item per box
+        self._overlay_item = ElementOverlayItem()
+        self._overlay_item.setVisible(False)
+        self._scene.addItem(self._overlay_item)
+        self._overlay_stale = True
+
         # View
         self._view = ZoomableGraphicsView(self._scene)
         self._view.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self._view.setMouseTracking(True)
         self._view.viewport().installEventFilter(self)
         self._view.viewport().setAttribute(Qt.WA_Hover, True)
-        
+
         # Set event listener
         self._view.resizeEvent = self._on_view_resized
-        
+
+        self._search_panel = SearchPanel()
+        self._search_panel.matches_changed.connect(self._highlight_matches)
+        layout.addWidget(self._search_panel)
         layout.addWidget(self._view)
 
+        # Timeline over the snapshot history
+        timeline = QHBoxLayout()
+        self._timeline_slider = QSlider(Qt.Horizontal)
+        self._timeline_slider.setRange(0, 0)
+        self._timeline_slider.valueChanged.connect(self._on_timeline_moved)
+        self._timeline_label = QLabel()
+        timeline.addWidget(self._timeline_slider)
+        timeline.addWidget(self._timeline_label)
+        layout.addLayout(timeline)
+
+        # Hover: one hit test per frame on the newest pointer position
+        self._hover = HoverCoalescer(self._find_element_at_point, parent=self)
+        self._hover.changed.connect(self._on_hover_changed)
+        self._hover_label = QLabel()
+        self._hover_label.setStyleSheet("color: gray;")
+        self._hover.flushed.connect(lambda received, coalesced: self._hover_label.setText(
+            f"hover: {received} eventos, {coalesced} agrupados"
+        ))
+        layout.addWidget(self._hover_label)
+
         # Selected element
         self._current_selected_element = None
 
@@ -61,14 +88,131 @@ class InspectionPanel(QWidget):
         self._clicked_rect.setVisible(False)
         self._highlight_rect.setVisible(False)
 
+        # Search matches, all in one path item
+        self._matches_item = QGraphicsPathItem()
+        self._matches_item.setPen(QPen(Qt.yellow, 2))
+        self._scene.addItem(self._matches_item)
+
+        # Frame diff: only changed tiles are repainted, optionally outlined (numpy loads with the first frame)
+        self._frame_differ = None
+        self.last_diff = None # FrameDiff of the last frame shown, device pixels
+        self._diff_item = QGraphicsPathItem()
+        self._diff_item.setPen(QPen(Qt.magenta, 2))
+        self._diff_item.setVisible(False)
+        self._scene.addItem(self._diff_item)
+
+        # Live mirroring
+        self._stream = None
+        self._live_timer = QTimer(self)
+        self._live_timer.timeout.connect(self._on_live_tick)
+        self._source_executor = None
+        self._source_future = None
+        self._source_frame = None # frame the current page source was fetched for
+
+        self.show_snapshot(snapshot)
+
+
+    @property
+    def screenshot(self):
+        return self._snapshot.screenshot
+
+
+    def is_offline(self):
+        return self._appium_driver is None
+
 
     def refresh_screenshot(self):
-        self.screenshot = self._appium_driver.get_screenshot_as_png()
-        image_px = Image.open(io.BytesIO(self.screenshot)).convert("RGB")
-        image = image_px.resize((self._view_width, self._view_height), Image.LANCZOS)
-        qt_image = ImageQt.ImageQt(image)
-        self._pixmap_item.setPixmap(QPixmap.fromImage(qt_image))
-        self._extract_elements_bounds(self._appium_driver.page_source)
+        if self._appium_driver is None:
+            return
+        self.show_snapshot(self._capture_snapshot())
+
+
+    def fetch_snapshot(self):
+        """Device I/O, decoding and parsing only; safe to run off the GUI thread."""
+        if self._appium_driver is None:
+            return self._snapshot
+        return self._capture_snapshot()
+
+
+    def show_snapshot(self, snapshot: Snapshot, record: bool = True):
+        """Shows the snapshot; unless record is False it also becomes the newest step of the timeline."""
+        if record:
+            self._set_timeline_position(self._history.append(snapshot))
+        self._snapshot = snapshot
+        self._view_width, self._view_height = snapshot.window_size["width"], snapshot.window_size["height"]
+        self._set_element_index(snapshot.element_index)
+        if self.is_exposed():
+            self._set_pixels(snapshot.pixels, snapshot.size)
+        else:
+            self.release_pixmap()
+
+
+    def is_exposed(self):
+        """False when the panel is hidden, collapsed or scrolled out of view."""
+        return self.isVisible() and self.width() > 0 and not self.visibleRegion().isEmpty()
+
+
+    def release_pixmap(self):
+        """Drops the decoded pixmap of a panel nobody can see; ensure_pixmap brings it back."""
+        if not self._pixmap_released:
+            self._pixmap_item.setPixmap(QPixmap())
+            self._pixmap_released = True
+            if self._frame_differ is not None:
+                self._frame_differ.reset()
+
+
+    def ensure_pixmap(self):
+        if self._pixmap_released:
+            self._set_pixels(self._snapshot.pixels, self._snapshot.size)
+            self._view.fitInView(self._pixmap_item, Qt.KeepAspectRatio)
+
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.ensure_pixmap()
+
+
+    def current_snapshot(self):
+        """What the panel shows right now, ready for a SnapshotStore."""
+        return self._snapshot
+
+
+    def set_overlay_visible(self, visible: bool):
+        if visible and self._overlay_stale:
+            self._overlay_item.set_element_index(self._element_index, (self._view_width, self._view_height))
+            self._overlay_stale = False
+        self._overlay_item.setVisible(visible)
+
+
+    def is_live(self):
+        return self._stream is not None
+
+
+    def start_live(self, url: str = None, max_fps: int = 15):
+        """Mirrors the device through the Appium MJPEG stream instead of polling screenshots."""
+        if self._stream is not None:
+            return
+        if self._appium_driver is None:
+            raise ValueError("Offline panels have no device to mirror")
+        from logic.mjpeg_stream import MjpegStream, mjpeg_url_from_capabilities
+
+        url = url or mjpeg_url_from_capabilities(self._appium_driver.capabilities)
+        if not url:
+            raise ValueError("Session has no mjpegServerPort or mjpegScreenshotUrl capability")
+
+        if self._source_executor is None:
+            self._source_executor = ThreadPoolExecutor(max_workers=1)
+        self._stream = MjpegStream(url)
+        self._stream.start()
+        self._live_timer.start(max(1, int(1000 / max_fps)))
+
+
+    def stop_live(self):
+        if self._stream is None:
+            return
+        self._live_timer.stop()
+        self._stream.stop()
+        self._stream = None
 
 
     def get_selected_element_bounds(self):
@@ -78,78 +222,202 @@ class InspectionPanel(QWidget):
         width = rect.width()
         height = rect.height()
         return (x, y, width, height)
-        
+
 
     def eventFilter(self, watched, event):
         if watched is self._view.viewport():
             if event.type() == QEvent.MouseMove:
                 pos = event.position() if hasattr(event, 'position') else event.localPos()
                 scene_pos = self._view.mapToScene(int(pos.x()), int(pos.y()))
-                mx, my = int(scene_pos.x()), int(scene_pos.y())
-
-                hit = self._find_element_at_point(mx, my)
-                if hit:
-                    x, y, width, height = hit
-                    self._highlight_rect.setRect(x, y, width, height)
-                    self._highlight_rect.setVisible(True)
-                else:
-                    self._highlight_rect.setVisible(False)
+                self._hover.push(scene_pos.x(), scene_pos.y())
 
             elif event.type() == QEvent.MouseButtonPress:
-                if self._highlight_rect.isVisible:
+                if self._highlight_rect.isVisible():
                     self._clicked_rect.setRect(self._highlight_rect.rect())
                     self._clicked_rect.setVisible(True)
 
         return super().eventFilter(watched, event)
 
 
-    def _find_element_at_point(self, mx: int, my: int):
-        hits = list(self._rtree.intersection((mx, my, mx, my)))
-        if not hits:
-            return None
-        
+    def closeEvent(self, event):
+        self.stop_live()
+        if self._source_executor is not None:
+            self._source_executor.shutdown(wait=False)
+        self._history.close()
+        super().closeEvent(event)
+
+
+    def _on_timeline_moved(self, position: int):
+        # Evicted snapshots leave gaps and the oldest fall off the front; land on the closest one left
+        if position not in self._history:
+            position = self._history.nearest(position)
+            if position is None:
+                return
+        self._set_timeline_position(position)
+        self.show_snapshot(self._history.get(position), record=False)
+
+
+    def _set_timeline_position(self, position: int):
+        first = self._history.first_position
+        self._timeline_slider.blockSignals(True)
+        self._timeline_slider.setRange(first, self._history.last_position)
+        self._timeline_slider.setValue(position)
+        self._timeline_slider.blockSignals(False)
+        self._timeline_label.setText(f"{position - first + 1}/{self._history.last_position - first + 1}")
+
+
+    def _on_live_tick(self):
+        if self._stream is None or not self.is_exposed():
+            return
+
+        if self._source_future is not None and self._source_future.done():
+            future, self._source_future = self._source_future, None
+            try:
+                page_source, element_index = future.result()
+                self._snapshot = Snapshot.from_image(
+                    self._snapshot.image, page_source, self._snapshot.window_size,
+                    self._snapshot.platform, element_index, self._snapshot.device
+                )
+                self._set_element_index(element_index)
+            except Exception as e:
+                print(f"❌ Error refreshing page source: {e}")
+
+        if not self._stream.running:
+            print(f"❌ MJPEG stream stopped: {self._stream.error}")
+            self.stop_live()
+            return
+
+        frame = self._stream.latest_frame()
+        if frame is None:
+            return
+        self._snapshot = Snapshot.from_image(
+            frame, self._snapshot.page_source, self._snapshot.window_size,
+            self._snapshot.platform, self._snapshot.element_index, self._snapshot.device
+        )
+        self._set_pixels(frame.tobytes(), frame.size)
+
+        # Only re-fetch the hierarchy when the screen actually changed
+        from logic.mjpeg_stream import frames_differ
+
+        if self._source_future is None and frames_differ(self._source_frame, frame):
+            self._source_frame = frame
+            self._source_future = self._source_executor.submit(self._fetch_element_index)
+
+
+    def _capture_snapshot(self):
+        # Process-backed sessions decode and index in their worker, pixels arrive through shared memory
+        if isinstance(self._appium_driver, DeviceProcess):
+            return self._appium_driver.capture_snapshot()
+        return Snapshot.capture(self._appium_driver)
+
+
+    def _fetch_element_index(self):
+        if isinstance(self._appium_driver, DeviceProcess):
+            return "", self._appium_driver.fetch_element_index()
+        profile = getattr(self._appium_driver, "source_profile", None)
+        if profile is not None:
+            return profile.fetch(self._appium_driver)
+        page_source = self._appium_driver.page_source
+        return page_source, ElementIndex.from_page_source(page_source)
+
+
+    def _set_pixels(self, pixels, size: tuple):
+        # Scene coordinates stay in logical points; the item scales the device pixels
+        width, height = size
+        qt_image = QImage(pixels, width, height, width * 3, QImage.Format_RGB888)
+        if self._frame_differ is None:
+            from logic.frame_diff import FrameDiffer
+
+            self._frame_differ = FrameDiffer()
+        diff = self._frame_differ.update(pixels, size)
+        if diff.full or self._pixmap_released:
+            self._pixmap_item.setPixmap(QPixmap.fromImage(qt_image))
+        elif diff.rects:
+            self._pixmap_item.patch(qt_image, diff.rects)
+        self._pixmap_released = False
+        self._pixmap_item.setTransform(QTransform.fromScale(self._view_width / width, self._view_height / height))
+
+        self.last_diff = diff
+        if self._diff_item.isVisible():
+            self._outline_diff(diff)
+
+
+    def set_diff_outlines(self, visible: bool):
+        self._diff_item.setVisible(visible)
+        if visible and self.last_diff is not None:
+            self._outline_diff(self.last_diff)
+
+
+    def _outline_diff(self, diff):
+        path = QPainterPath()
+        if not diff.full:
+            for x, y, width, height in diff.rects:
+                path.addRect(self._pixmap_item.mapRectToScene(QRectF(x, y, width, height)))
+        self._diff_item.setPath(path)
+
+
+    def _find_element_at_point(self, mx: float, my: float):
+        """Id of the smallest element under the point, or None."""
+        if self._rtree is None:
+            self._build_rtree()
         best_hit = None
         min_area = float('inf')
 
-        for hit_id in hits:
+        for hit_id in self._rtree.intersection((mx, my, mx, my)):
             x, y, width, height, element = self._element_map[hit_id]
             area = width * height
             if area < min_area:
                 min_area = area
-                best_hit = (x, y, width, height)
+                best_hit = hit_id
 
         return best_hit
 
 
-    def _extract_elements_bounds(self, page_source: str):
-        parser = etree.XMLParser(recover=True)
-        root_element = etree.fromstring(page_source.encode("utf-8"), parser)
-        self._extract_bounds(root_element)
+    def _on_hover_changed(self, node_id):
+        # setRect only invalidates the old and new rect, the rest of the scene is not repainted
+        if node_id is None:
+            self._highlight_rect.setVisible(False)
+            return
+        x, y, width, height, element = self._element_map[node_id]
+        self._highlight_rect.setRect(x, y, width, height)
+        self._highlight_rect.setVisible(True)
 
 
-    def _extract_bounds(self, element):
-        for child in element:
-            self._extract_bounds(child)
-        
-        bounds = element.get("bounds")
-        if bounds:
-            x1, y1, x2, y2 = [float(n) for n in re.findall(r"[\d.]+", bounds)]
-            if all((x1, y1, x2, y2)):
-                x, y, width, height, element = x1, y1, x2 - x1, y2 - y1, element
-            else:
-                return
-        else:
-            bounds_rect = (element.get("x"), element.get("y"), element.get("width"), element.get("height"))
-            if all(bounds_rect):
-                x, y, width, height = map(float, bounds_rect)
-            else:
-                return
+    def _highlight_matches(self, node_ids: list):
+        path = QPainterPath()
+        for node_id in node_ids:
+            bounds = self._element_index.bounds[node_id]
+            if bounds is not None:
+                path.addRect(QRectF(*bounds))
+        self._matches_item.setPath(path)
+
+
+    def _set_element_index(self, element_index: ElementIndex):
+        self._element_index = element_index
+        self._search_panel.set_element_index(element_index)
+        self._overlay_stale = True
+        if self._overlay_item.isVisible():
+            self.set_overlay_visible(True)
+        self._rtree = None # built on the first hover, rtree stays unloaded until then
+        self._element_map = {}
+        for node_id in element_index.bounded_ids():
+            x, y, width, height = element_index.bounds[node_id]
+            self._element_map[node_id] = (x, y, width, height, element_index.elements[node_id])
+        self._hover.reset()
+
+
+    def _build_rtree(self):
+        from rtree import index
+
+        if not self._element_map:
+            self._rtree = index.Index()
+            return
+        # Bulk loading packs the tree in one pass instead of one insert per node
+        self._rtree = index.Index(
+            (node_id, (x, y, x + width, y + height), None)
+            for node_id, (x, y, width, height, _) in self._element_map.items()
+        )
 
-        bound_box = (x, y, x + width, y + height)
-        self._rtree.insert(self._next_id, bound_box)
-        self._element_map[self._next_id] = (x, y, width, height, element)
-        self._next_id += 1
-                
 
     def _on_view_resized(self, event):
         QGraphicsView.resizeEvent(self._view, event)
@@ -1,15 +1,24 @@
 
-import io, os, uuid, re
+import io, os, re, math
 
-from PIL import Image
-from PySide6.QtWidgets import QMainWindow,  QWidget, QSplitter, QVBoxLayout, QHBoxLayout, QPushButton
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMainWindow,  QWidget, QGridLayout, QScrollArea, QVBoxLayout, QHBoxLayout, QPushButton, QLabel
+from PySide6.QtCore import Qt, QObject, Signal, QTimer
 
-from logic import AppiumDriver
+from logic.snapshot import Snapshot
+from logic.snapshot_store import SnapshotStore
+from logic.device_scheduler import DeviceScheduler
+from logic.snapshot_history import SnapshotHistory
 from .inspection_panel import InspectionPanel
 
+PROFILE_CACHE = "../snapshots/source_profiles.json"
+
+class _SnapshotBridge(QObject):
+    # Carries finished fetches from scheduler threads to the GUI thread
+    ready = Signal(object, object) # panel, future
+
+
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, max_workers: int = 8, history_budget_mb: int = 64):
         super().__init__()
         
         self.setWindowTitle("Inspector")
@@ -17,6 +26,17 @@ class MainWindow(QMainWindow):
         self._panels: list[InspectionPanel] = []
         self._main_layout = QVBoxLayout(self)
 
+        # Device farm: every panel's fetches share one bounded pool
+        self._scheduler = DeviceScheduler(max_workers)
+        self._bridge = _SnapshotBridge()
+        self._bridge.ready.connect(self._on_snapshot_ready)
+        self._refreshing = set()
+        self._stale_panels = set()
+        self._live_unavailable = set() # panels whose session cannot stream
+        self._processes = [] # DeviceProcess workers, when sessions run out of process
+        self._history_budget = history_budget_mb * 1024 * 1024
+        self._dataset = None # DatasetIndex, opened on the first capture
+
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         central_widget.setLayout(self._main_layout)
@@ -24,66 +44,245 @@ class MainWindow(QMainWindow):
         btn_bar = QHBoxLayout()
         self._refresh_btn = QPushButton("Refresh Screenshots")
         save_recording = QPushButton("Capture")
+        self._live_btn = QPushButton("Live")
+        self._live_btn.setCheckable(True)
+        save_snapshot = QPushButton("Save Snapshot")
+        self._boxes_btn = QPushButton("Show All Boxes")
+        self._boxes_btn.setCheckable(True)
+        self._diff_btn = QPushButton("Show Diff")
+        self._diff_btn.setCheckable(True)
 
         btn_bar.addWidget(self._refresh_btn)
+        btn_bar.addWidget(self._live_btn)
         btn_bar.addWidget(save_recording)
+        btn_bar.addWidget(save_snapshot)
+        btn_bar.addWidget(self._boxes_btn)
+        self._boxes_btn.toggled.connect(self._toggle_boxes)
+        btn_bar.addWidget(self._diff_btn)
+        self._diff_btn.toggled.connect(self._toggle_diff)
         save_recording.clicked.connect(self._save)
+        save_snapshot.clicked.connect(self._save_snapshots)
 
         self._main_layout.addLayout(btn_bar)
 
 
     def _save(self):
+        """Adds the selected element of every panel to the YOLO dataset; near-duplicate screens only get the label."""
+        from logic.dataset_dedup import DatasetIndex
+
+        if self._dataset is None:
+            self._dataset = DatasetIndex("../dataset")
+
         for panel in self._panels:
             x, y, width, height = panel.get_selected_element_bounds()
             if not all((x, y, width, height)):
                 continue
 
-            output_dir = "../dataset/images/train"
-            os.makedirs(output_dir, exist_ok=True)
-            
-            img_id = str(uuid.uuid4())
-            file_path = os.path.join(output_dir, f"img{img_id}.png")
-            screen_shoot = panel.screenshot
-            with open(file_path, "wb") as f:
-                f.write(screen_shoot)
-
-            width_img, height_img = Image.open(io.BytesIO(screen_shoot)).convert('RGB').size
+            # Selection rects are in logical points, like the scene
+            snapshot = panel.current_snapshot()
+            view_width, view_height = snapshot.window_size["width"], snapshot.window_size["height"]
 
             label_id = 0 # TODO:
-            center_x = (x + width/2)  * (1 / width_img)
-            center_y = (y + height/2)  * (1 / height_img)
-            width_rect = width * (1 / width_img)
-            height_rect = height * (1 / height_img)
-
-            output_dir = "../dataset/labels/train"
-            os.makedirs(output_dir, exist_ok=True)
+            center_x = (x + width/2)  * (1 / view_width)
+            center_y = (y + height/2)  * (1 / view_height)
+            width_rect = width * (1 / view_width)
+            height_rect = height * (1 / view_height)
 
             label = f"{label_id} {center_x} {center_y} {width_rect} {height_rect}"
-            file_path = os.path.join(output_dir, f"img{img_id}.txt")
-            with open(file_path, "w") as f:
-                f.write(label)
+            name, merged = self._dataset.add(snapshot, [label])
+            if merged:
+                print(f"♻️ Pantalla casi idéntica a {name}, solo se añade la etiqueta.")
+            else:
+                print(f"✅ Captura guardada: {name}")
+
+
+    def _save_snapshots(self):
+        store = SnapshotStore("../snapshots")
+        for panel in self._panels:
+            key = store.save(panel.current_snapshot())
+            print(f"✅ Snapshot guardado: {store.path(key)}")
 
                 
-    def load(self, capabilities: dict):
-        splitter = QSplitter(Qt.Horizontal)
+    def load(self, capabilities: dict, processes: bool = False, source_profile: str = None):
+        """
+        One panel per device; with processes every session runs, decodes and parses in its own
+        worker process. source_profile picks how hierarchies are fetched (`auto` measures them).
+        """
+        from logic import AppiumDriver
+        from logic.device_worker import DeviceProcess
+        from logic.snapshot import platform_of
+        from logic.source_profiles import select_source_profile
 
-        index = 0 # TODO: Refactor this
-        for _, cap in capabilities.items():
+        def open_session(cap):
+            if processes:
+                driver = DeviceProcess("http://localhost:4723", cap, source_profile, PROFILE_CACHE)
+                return driver, driver.capture_snapshot()
             driver = AppiumDriver("http://localhost:4723", cap)
-            panel = InspectionPanel(driver)
-            self._panels.append(panel)
-            splitter.addWidget(panel)
-            splitter.setStretchFactor(index, 1)
-            index += 1
+            driver.source_profile = select_source_profile(driver, platform_of(driver.capabilities), source_profile, PROFILE_CACHE)
+            return driver, Snapshot.capture(driver)
+
+        # Sessions start concurrently, the slowest device sets the load time
+        futures = [self._scheduler.submit(name, open_session, cap) for name, cap in capabilities.items()]
+        # History past the budget spills to disk instead of growing; panels delete theirs on close,
+        # so anything left over is from a session that did not close cleanly
+        history_store = SnapshotStore("../snapshots/history")
+        history_store.prune(self._history_budget)
+        panels = []
+        for future in futures:
+            driver, snapshot = future.result()
+            if processes:
+                self._processes.append(driver)
+            history = SnapshotHistory(self._history_budget, history_store)
+            panels.append(InspectionPanel(driver, snapshot, history))
+        self._add_panels(panels)
 
-        total_panels = splitter.count()
-        panel_size = int(splitter.size().width() / total_panels)
-        splitter.setSizes([panel_size] * total_panels)
-        
         self._refresh_btn.clicked.connect(self._refresh_screenshots)
-        self._main_layout.addWidget(splitter)
+        self._live_btn.toggled.connect(self._toggle_live)
+
+
+    def load_offline(self, snapshots_by_device: dict):
+        """Opens saved snapshots or recording steps, one panel per device, without any Appium session."""
+        self._offline_snapshots = [snapshots for snapshots in snapshots_by_device.values() if snapshots]
+        if not self._offline_snapshots:
+            print("⚠️ No hay snapshots para abrir.")
+            return
+        self._offline_step = 0
+        self._add_panels([
+            InspectionPanel(snapshot=snapshots[0], history=SnapshotHistory(self._history_budget))
+            for snapshots in self._offline_snapshots
+        ])
+
+        self._refresh_btn.setEnabled(False)
+        self._live_btn.setEnabled(False)
+        self._step_label = QLabel()
+        previous_btn = QPushButton("◀")
+        next_btn = QPushButton("▶")
+        previous_btn.clicked.connect(lambda: self._show_offline_step(self._offline_step - 1))
+        next_btn.clicked.connect(lambda: self._show_offline_step(self._offline_step + 1))
+        step_bar = QHBoxLayout()
+        step_bar.addWidget(previous_btn)
+        step_bar.addWidget(self._step_label)
+        step_bar.addWidget(next_btn)
+        self._main_layout.insertLayout(1, step_bar)
+        self._show_offline_step(0)
+
+
+    def _show_offline_step(self, step: int):
+        total = max(len(snapshots) for snapshots in self._offline_snapshots)
+        self._offline_step = min(max(step, 0), total - 1)
+        for panel, snapshots in zip(self._panels, self._offline_snapshots):
+            if self._offline_step < len(snapshots):
+                panel.show_snapshot(snapshots[self._offline_step])
+        self._step_label.setText(f"{self._offline_step + 1} / {total}")
+
+
+    def _add_panels(self, panels: list):
+        grid_widget = QWidget()
+        grid = QGridLayout(grid_widget)
+        columns = max(1, math.ceil(math.sqrt(len(panels))))
+
+        for index, panel in enumerate(panels):
+            self._panels.append(panel)
+            panel.setMinimumSize(280, 480)
+            grid.addWidget(panel, index // columns, index % columns)
+
+        self._scroll_area = QScrollArea()
+        self._scroll_area.setWidgetResizable(True)
+        self._scroll_area.setWidget(grid_widget)
+        self._scroll_area.verticalScrollBar().valueChanged.connect(self._update_virtualization)
+        self._scroll_area.horizontalScrollBar().valueChanged.connect(self._update_virtualization)
+        self._main_layout.addWidget(self._scroll_area)
+
 
-    
     def _refresh_screenshots(self):
+        """Refreshes every visible panel concurrently; hidden ones refresh when they scroll into view."""
+        for panel in self._panels:
+            if panel.is_exposed():
+                self._schedule_refresh(panel)
+            else:
+                self._stale_panels.add(panel)
+
+
+    def _schedule_refresh(self, panel: InspectionPanel):
+        self._stale_panels.discard(panel)
+        if panel in self._refreshing:
+            return
+        self._refreshing.add(panel)
+        future = self._scheduler.submit(panel, panel.fetch_snapshot)
+        future.add_done_callback(lambda done, panel=panel: self._bridge.ready.emit(panel, done))
+
+
+    def _on_snapshot_ready(self, panel: InspectionPanel, future):
+        self._refreshing.discard(panel)
+        if not panel.is_exposed():
+            # Scrolled away while fetching: keep no pixmap, refresh again when it comes back
+            self._stale_panels.add(panel)
+            return
+        try:
+            panel.show_snapshot(future.result())
+        except Exception as e:
+            print(f"❌ Error refrescando el panel: {e}")
+
+
+    def _update_virtualization(self):
+        for panel in self._panels:
+            if panel.is_exposed():
+                panel.ensure_pixmap()
+                if self._live_btn.isChecked():
+                    self._start_live(panel)
+                elif panel in self._stale_panels:
+                    self._schedule_refresh(panel)
+            else:
+                panel.stop_live()
+                panel.release_pixmap()
+
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_virtualization()
+
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Panels get their geometry only after the first layout pass
+        QTimer.singleShot(0, self._update_virtualization)
+
+
+    def closeEvent(self, event):
+        self._scheduler.shutdown(wait=False)
+        for panel in self._panels:
+            panel.close() # child widgets get no closeEvent of their own when the window closes
+        for process in self._processes:
+            process.close()
+        super().closeEvent(event)
+
+
+    def _toggle_live(self, enabled: bool):
+        self._refresh_btn.setEnabled(not enabled)
+        # Only what is on screen streams; _update_virtualization starts the rest as they scroll in
+        self._live_unavailable.clear()
+        for panel in self._panels:
+            if enabled and panel.is_exposed():
+                self._start_live(panel)
+            else:
+                panel.stop_live()
+
+
+    def _start_live(self, panel: InspectionPanel):
+        if panel in self._live_unavailable:
+            return
+        try:
+            panel.start_live()
+        except ValueError as e:
+            self._live_unavailable.add(panel)
+            print(f"⚠️ {e}")
+
+
+    def _toggle_boxes(self, enabled: bool):
+        for panel in self._panels:
+            panel.set_overlay_visible(enabled)
+
+
+    def _toggle_diff(self, enabled: bool):
         for panel in self._panels:
-            panel.refresh_screenshot()
+            panel.set_diff_outlines(enabled)
@@ -0,0 +1,45 @@
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QLineEdit, QLabel
+from PySide6.QtCore import Signal
+
+from logic.search_index import SearchIndex
+
+
+class SearchPanel(QWidget):
+    """Search box over the current snapshot; emits matching node ids as the user types."""
+
+    matches_changed = Signal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._element_index = None
+        self._search_index = None
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self._query_edit = QLineEdit()
+        self._query_edit.setPlaceholderText("Search: text, resource-id:brand_card, *substring")
+        self._query_edit.setClearButtonEnabled(True)
+        self._count_label = QLabel()
+        layout.addWidget(self._query_edit)
+        layout.addWidget(self._count_label)
+
+        self._query_edit.textChanged.connect(self._run_query)
+
+
+    def set_element_index(self, element_index):
+        # The inverted index is rebuilt lazily, only if someone searches this snapshot
+        self._element_index = element_index
+        self._search_index = None
+        self._run_query(self._query_edit.text())
+
+
+    def _run_query(self, query: str):
+        if not query.strip() or self._element_index is None:
+            self._count_label.setText("")
+            self.matches_changed.emit([])
+            return
+        if self._search_index is None:
+            self._search_index = SearchIndex(self._element_index)
+        node_ids = self._search_index.search(query)
+        self._count_label.setText(f"{len(node_ids)}")
+        self.matches_changed.emit(node_ids)
@@ -3,8 +3,10 @@ from PySide6.QtWidgets import QApplication, QWidget, QSplitter, QVBoxLayout, QHB
 from PySide6.QtCore import Qt
 from appium.options.common.base import AppiumOptions
 from appium import webdriver
-from AppiumInspector import AppiumInspector
-from AppiumRecorder import AppiumRecorder
+from .AppiumInspector import AppiumInspector
+from .AppiumRecorder import AppiumRecorder
+from .locator_report import write_report
+from .device_scheduler import DeviceScheduler
 import json
 import os
 from PySide6.QtGui import QImage
@@ -53,31 +55,58 @@ def launch_dual_inspector(caps1: dict, caps2: dict):
         main_layout.addWidget(splitter)
 
         recorder = AppiumRecorder()
-        
+        # One worker per device: both phones work at once, widgets are only updated here afterwards
+        scheduler = DeviceScheduler(max_workers=2)
+
+        def run_dual(ios_job, android_job):
+            results = scheduler.gather({"iOS": ios_job, "Android": android_job})
+            for device, (_, error) in results.items():
+                if error is not None:
+                    print(f"❌ {device}: {error}")
+            return results["iOS"][0], results["Android"][0]
+
         def save_record():
             ios_elem = panel1.return_selected_elem()
             android_elem = panel2.return_selected_elem()
 
             if ios_elem is not None and android_elem is not None:
-                ios_img_b64 = panel1.replay_element_click(ios_elem)
-                android_img_b64 = panel2.replay_element_click(android_elem)
+                ios_result, android_result = run_dual(
+                    (panel1.replay_element_click_on_device, ios_elem),
+                    (panel2.replay_element_click_on_device, android_elem),
+                )
+                ios_img_b64, ios_screen = ios_result or (None, None)
+                android_img_b64, android_screen = android_result or (None, None)
+                if ios_screen is not None:
+                    panel1.apply_screen(ios_screen)
+                if android_screen is not None:
+                    panel2.apply_screen(android_screen)
+                if not ios_img_b64 or not android_img_b64:
+                    print("⚠ El paso falló en al menos un dispositivo, no se guarda.")
+                    return
+
                 save_base64_to_png(ios_img_b64, "ios_element.png")
                 save_base64_to_png(android_img_b64, "android_element.png")
 
-                recorder.record_dual_step(ios_elem, android_elem, ios_img_b64, android_img_b64)
+                recorder.record_dual_step(
+                    ios_elem, android_elem, ios_img_b64, android_img_b64, panel1.last_click, panel2.last_click
+                )
                 print("[✓] Paso sincronizado guardado.")
             else:
                 print("⚠ Debes seleccionar un elemento en ambos dispositivos.")
 
-        # def on_print_all():
-        #     iOSJSONvalues = panel1.print_all_ids()
-        #     androidJSONvalues = panel2.print_all_ids()
+        def on_print_all():
+            rows = panel1.print_all_ids() + panel2.print_all_ids()
+            write_report(rows, "locator_report.csv")
+            print(f"[✓] {len(rows)} locators exportados a locator_report.csv")
 
         def refresh_screenshots():
-            panel1.refresh_screenshot()
-            panel2.refresh_screenshot()
+            ios_screen, android_screen = run_dual((panel1.fetch_screen,), (panel2.fetch_screen,))
+            if ios_screen is not None:
+                panel1.apply_screen(ios_screen)
+            if android_screen is not None:
+                panel2.apply_screen(android_screen)
 
-        # print_btn.clicked.connect(on_print_all)
+        print_btn.clicked.connect(on_print_all)
         refresh_btn.clicked.connect(refresh_screenshots)
         take_a_shot.clicked.connect(save_record)
         save_recording.clicked.connect(lambda: recorder.save_to_file("Scanning.json"))
@@ -85,6 +114,7 @@ def launch_dual_inspector(caps1: dict, caps2: dict):
         window.resize(1200, 800)
         window.show()
         app.exec()
+        scheduler.shutdown(wait=False)
 
     except Exception as e:
         print(f"[ERROR] No se pudo lanzar el inspector dual: {e}")
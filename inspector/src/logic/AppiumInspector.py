@@ -2,17 +2,25 @@ import io
 import re
 from PySide6.QtWidgets import (
     QWidget, QTableWidget, QTableWidgetItem, QVBoxLayout, QSplitter,
-    QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QSizePolicy
+    QGraphicsView, QGraphicsScene, QGraphicsPixmapItem, QSizePolicy, QLabel
 )
 from PySide6.QtGui import QPixmap, QPen, QImage
 from PySide6.QtCore import Qt, QRectF, QEvent
 from PIL import Image, ImageQt
-from lxml import etree
 
 from selenium.webdriver.common.actions.interaction import POINTER
 import base64
 import time
 
+from .element_index import ElementIndex
+from .element_crops import crop_element_base64, crop_elements_base64
+from .full_page import capture_full_page
+from .locator_report import build_locator_report, write_report
+from .AppiumRecorder import build_xpath_from_hierarchy, generate_ios_locators, generate_android_locators
+from .StepToAction import StepCompiler, LocalFinder, click_step
+from .hover_coalescer import HoverCoalescer
+from .screen_index import ScreenIndex, fingerprint, to_hex
+
 class AppiumInspector(QWidget):
     def __init__(self, driver, platform):
         super().__init__()
@@ -29,11 +37,11 @@ class AppiumInspector(QWidget):
         logical = cropped_px.resize((self.vw, self.vh), Image.LANCZOS)
         self.original_image = logical
 
-        src = driver.page_source
-        parser = etree.XMLParser(recover=True)
-        root = etree.fromstring(src.encode('utf-8'), parser)
-        self.elements = []
-        _extract_bounds(root)
+        self.index = ElementIndex.from_page_source(driver.page_source)
+        self.elements = self.index.entries()
+        self.step_compiler = StepCompiler() # locator latencies measured on this device
+        self.screen_index = ScreenIndex() # screens clicked on so far, with the locator that worked there
+        self.last_click = None # screen, locator and bounds of the last replayed click, for the recording
 
         self.hovered_element = None
         self.current_clicked_element = None
@@ -93,6 +101,15 @@ class AppiumInspector(QWidget):
         self.attr_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.info_layout.addWidget(self.attr_table)
 
+        # One hit test per frame on the newest pointer position
+        self.hover = HoverCoalescer(lambda x, y: self.index.hit_test(x, y), parent=self)
+        self.hover.changed.connect(self.on_hover_changed)
+        self.hover_label = QLabel()
+        self.hover.flushed.connect(lambda received, coalesced: self.hover_label.setText(
+            f"hover: {received} eventos, {coalesced} agrupados"
+        ))
+        self.info_layout.addWidget(self.hover_label)
+
         splitter.addWidget(self.info_container)
         splitter.setSizes([self.original_image.width, 300])
 
@@ -137,103 +154,130 @@ class AppiumInspector(QWidget):
                 break
 
     def refresh_screenshot(self):
+        self.apply_screen(self.fetch_screen())
+
+    def fetch_screen(self):
+        """Device round trips, decoding and parsing of a refresh; touches no widget, safe off the GUI thread."""
         png = self.driver.get_screenshot_as_png()
         img_px = Image.open(io.BytesIO(png)).convert('RGB')
         px_w = int(self.vw * self.dpr)
         px_h = int(self.vh * self.dpr)
         cropped_px = img_px.crop((0, 0, px_w, px_h))
         logical = cropped_px.resize((self.vw, self.vh), Image.LANCZOS)
-        self.original_image = logical
+        return logical, ElementIndex.from_page_source(self.driver.page_source)
+
+    def apply_screen(self, screen):
+        """GUI side of a refresh: shows an (image, index) pair returned by fetch_screen."""
+        self.original_image, self.index = screen
 
         qt_image = ImageQt.ImageQt(self.original_image)
         pixmap = QPixmap.fromImage(qt_image)
         self.pixmap_item.setPixmap(pixmap)
 
-        src = self.driver.page_source
-        parser = etree.XMLParser(recover=True)
-        root = etree.fromstring(src.encode('utf-8'), parser)
-        self.elements.clear()
-        self._extract_bounds(root)
+        self.elements = self.index.entries()
 
         self.highlight_rect.setVisible(False)
         self.clicked_rect.setVisible(False)
-
-    def print_all_ids(self):
-        qt_image = ImageQt.ImageQt(self.original_image)
-        device_image = QImage(qt_image)
-        #generator = AppiumIDPrinter(device_image, self.elements)
-        #return generator.export_html_overlay()
-
-    def calculate_bounds(self, e):
+        self.hover.reset()
+
+    def print_all_ids(self, output_path=None):
+        """Every locator of every element on screen, with match counts and scores (CSV or JSON when output_path)."""
+        rows = build_locator_report(self.index, self.platform)
+        if output_path:
+            write_report(rows, output_path)
+        return rows
+
+    def calculate_bounds(self, e, index=None):
+        bounds = (index or self.index).bounds_of(e)
+        if bounds is None:
+            print("⚠️ El elemento no tiene bounds en el snapshot actual.")
+            return None
+        x, y, w, h = bounds
         if self.platform == 'iOS':
-            try:
-                rect = e.rect  # WebElement.rect ya extrae x, y, width, height en dict
-                x = rect.get("x", 0)
-                y = rect.get("y", 0)
-                w = rect.get("width", 0)
-                h = rect.get("height", 0)
-                return [[int(x), int(x + w - 1)], [int(y), int(y + h - 1)]]
-            except Exception as e:
-                print(f"⚠️ Error al calcular bounds para iOS: {e}")
-                return None
-        elif self.platform == 'Android':
-            try:
-                bounds_str = e.get_attribute("bounds")
-                nums = list(map(int, re.findall(r'\d+', bounds_str)))
-                if len(nums) == 4:
-                    x1, y1, x2, y2 = nums
-                    return [[x1, x2], [y1, y2]]
-            except Exception as e:
-                print(f"❌ Error al parsear bounds Android: {e}")
-        return None
+            return [[int(x), int(x + w - 1)], [int(y), int(y + h - 1)]]
+        return [[int(x), int(x + w)], [int(y), int(y + h)]]
 
     def replay_element_click(self, elem):
+        image, screen = self.replay_element_click_on_device(elem)
+        if screen is not None:
+            self.apply_screen(screen)
+        return image
+
+    def replay_element_click_on_device(self, elem):
+        """
+        Device side of replay_element_click, safe off the GUI thread: returns the element
+        crop (None on failure) and the refreshed screen for apply_screen (None if unchanged).
+        """
         visible = False
         xpath = ''
         image = ''
+        screen = None
+        self.last_click = None
 
         if self.platform == 'iOS':
             xpath = build_xpath_from_hierarchy(elem, 'iOS')
         else:
             xpath = build_xpath_from_hierarchy(elem, 'android')
 
-        phone_size = self.driver.get_window_size()
-        phone_w = phone_size['width']
-        phone_h = phone_size['height'] * 0.94
-
-        for i in range(3):
-            try: 
-                elem = self.driver.find_element("xpath", xpath)
-            except:
-                visible = False
-                self.scroll_down()
-                self.refresh_screenshot()
-                time.sleep(2)
-
-            bounds = self.calculate_bounds(elem)
-            
-            if not bounds:
-                print("❌ No se pudieron determinar los bounds del elemento.")
-                return
-            
-            [x1, x2], [y1, y2] = bounds
-        
-            if 0 <= x1 < phone_w and 0 <= y1 < phone_h and x2 <= phone_w and y2 <= phone_h:
-                visible = True
-                image = self.capture_element_base64(elem)
-                print(image)
-                break
-            else:
-                visible = False
-                self.scroll_down()
-                self.refresh_screenshot()
-                time.sleep(2)
+        phone_w = self.vw
+        phone_h = self.vh * 0.94
+
+        # Resolve against the cached snapshot instead of asking the device
+        screen_image, index = self.original_image, self.index
+        matches = index.find_xpath(xpath)
+        if not matches or not self._fits_on_screen(index.elements[matches[0]], phone_w, phone_h, index):
+            # One stitched capture tells exactly how far to scroll, no blind scroll-and-check
+            page = capture_full_page(self.driver, stop_xpath=xpath)
+            page_ids = page.element_index.find_xpath(xpath)
+            if not page_ids:
+                print("❌ El elemento no existe en la página completa.")
+                return None, None
+            page.scroll_into_view(self.driver, page_ids[0])
+            screen = self.fetch_screen()
+            screen_image, index = screen
+            matches = index.find_xpath(xpath)
+
+        if matches:
+            elem = index.elements[matches[0]]
+            visible = self._fits_on_screen(elem, phone_w, phone_h, index)
 
         if visible:
-            self.driver.find_element("xpath", xpath).click()
+            image = self._crop_base64(screen_image, index, elem)
+            print(image)
+            signature = fingerprint(index)
+            screen_id, score = self.screen_index.match(signature)
+            cached = self.screen_index.cached_element(screen_id, xpath)
+            if cached and "locator" in cached:
+                # Known screen, this element was already clicked here: no need to rank locators again
+                compiled = cached["locator"]
+                print(f"🧭 Pantalla conocida #{screen_id} ({score:.2f}), locator en caché.")
+            else:
+                # Fastest locator that is unique in the snapshot, XPath only as the last fallback
+                locators = generate_ios_locators(elem) if self.platform == 'iOS' else generate_android_locators(elem)
+                compiled = self.step_compiler.compile_step(locators, LocalFinder(index, self.platform))
+                if compiled is None:
+                    compiled = {"locator": {"strategy": "xpath", "by": "xpath", "value": xpath}, "fallbacks": []}
+            click_step(self.driver, compiled, self.step_compiler.stats, self.platform)
+            bounds = index.bounds_of(elem)
+            self.screen_index.learn(signature, xpath, compiled, bounds)
+            self.last_click = {"signature": to_hex(signature), "locator": compiled, "bounds": list(bounds)}
             time.sleep(2)
-            self.refresh_screenshot()
-            return image
+            return image, self.fetch_screen()
+        print("❌ No se pudo llevar el elemento a la pantalla.")
+        return None, screen
+
+    def _fits_on_screen(self, elem, phone_w, phone_h, index=None):
+        bounds = self.calculate_bounds(elem, index)
+        if not bounds:
+            return False
+        [x1, x2], [y1, y2] = bounds
+        return 0 <= x1 < phone_w and 0 <= y1 < phone_h and x2 <= phone_w and y2 <= phone_h
+
+    def capture_full_page(self, max_scrolls=10):
+        """Scrolls the main container to the end and returns the stitched FullPageCapture."""
+        page = capture_full_page(self.driver, max_scrolls)
+        self.refresh_screenshot()
+        return page
 
     def tap_element_center(self, bounds):
         try:
@@ -252,25 +296,7 @@ class AppiumInspector(QWidget):
             if event.type() == QEvent.MouseMove:
                 pos = event.position() if hasattr(event, 'position') else event.localPos()
                 scene_pos = self.view.mapToScene(int(pos.x()), int(pos.y()))
-                mx, my = int(scene_pos.x()), int(scene_pos.y())
-
-                hit = None
-                min_area = None
-                for x, y, w, h, el in self.elements:
-                    if x <= mx <= x + w and y <= my <= y + h:
-                        area = w * h
-                        if min_area is None or area < min_area:
-                            min_area = area
-                            hit = (x, y, w, h, el)
-
-                if hit:
-                    x, y, w, h, el = hit
-                    self.highlight_rect.setRect(x, y, w, h)
-                    self.highlight_rect.setVisible(True)
-                    self.hovered_element = el
-                else:
-                    self.highlight_rect.setVisible(False)
-                    self.hovered_element = None
+                self.hover.push(scene_pos.x(), scene_pos.y())
 
             elif event.type() == QEvent.MouseButtonPress:
                 if self.hovered_element is not None:
@@ -287,51 +313,47 @@ class AppiumInspector(QWidget):
 
         return super().eventFilter(obj, event)
 
+    def on_hover_changed(self, node_id):
+        # Only runs when the element under the pointer changes; setRect repaints just the old and new rect
+        if node_id is None:
+            self.highlight_rect.setVisible(False)
+            self.hovered_element = None
+            return
+        x, y, w, h = self.index.bounds[node_id]
+        self.highlight_rect.setRect(x, y, w, h)
+        self.highlight_rect.setVisible(True)
+        self.hovered_element = self.index.elements[node_id]
+
     def return_selected_elem(self):
         return self.current_selected_element
     
     def capture_element_base64(self, elem):
-        try:
-            if self.platform == "Android":
-                bounds_str = elem.get_attribute("bounds")
-                if bounds_str:
-                    match = re.match(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]", bounds_str)
-                    if match:
-                        x1, y1, x2, y2 = map(int, match.groups())
-                    else:
-                        print("[⚠] No se pudieron extraer las coordenadas de bounds.")
-                        return None
-                else:
-                    print("[⚠] El atributo 'bounds' no está disponible en el elemento.")
-                    return None
-
-            elif self.platform == "iOS":
-                rect = elem.rect
-                x = rect.get("x", 0)
-                y = rect.get("y", 0)
-                w = rect.get("width", 0)
-                h = rect.get("height", 0)
-
-                if w == 0 or h == 0:
-                    print("[⚠] Dimensiones inválidas para el rect de iOS.")
-                    return None
+        return self._crop_base64(self.original_image, self.index, elem)
 
-                x1, y1, x2, y2 = int(x), int(y), int(x + w), int(y + h)
-
-            else:
-                print("[⚠] Plataforma desconocida para captura de elemento.")
+    def _crop_base64(self, screen_image, index, elem):
+        try:
+            bounds = index.bounds_of(elem)
+            if bounds is None:
+                print("[⚠] El elemento no tiene bounds en el snapshot actual.")
                 return None
-
-            # Recortar imagen y convertir a base64
-            cropped = self.original_image.crop((x1, y1, x2, y2))
-            buffered = io.BytesIO()
-            cropped.save(buffered, format="PNG")
-            return base64.b64encode(buffered.getvalue()).decode("utf-8")
+            image = crop_element_base64(screen_image, bounds)
+            if image is None:
+                print("[⚠] Dimensiones inválidas para el recorte del elemento.")
+            return image
 
         except Exception as e:
             print(f"[⚠] Error capturando imagen del elemento: {e}")
             return None
 
+    def capture_elements_base64(self, elems=None, max_workers=None):
+        """Crops every element of the current snapshot (or only elems) in one pass: {elem: base64}."""
+        node_ids = None
+        if elems is not None:
+            node_ids = [self.index.id_of(elem) for elem in elems]
+            node_ids = [node_id for node_id in node_ids if node_id is not None]
+        crops = crop_elements_base64(self.original_image, self.index, node_ids, max_workers)
+        return {self.index.elements[node_id]: image for node_id, image in crops.items()}
+
     def scroll_down(self):
             try:
                 platform = self.driver.capabilities.get("platformName", "").lower()
@@ -458,22 +480,3 @@ def build_android_ui_automator(elem):
         return None
     
 
-
-def _extract_bounds(self, elem):
-    for child in elem:
-        _extract_bounds(child)
-
-    b = elem.get('bounds')
-    if b:
-        m = re.match(r"\[(\d+),(\d+)\]\[(\d+),(\d+)\]", b)
-        if m:
-            x1, y1, x2, y2 = map(int, m.groups())
-            self.elements.append((x1, y1, x2 - x1, y2 - y1, elem))
-    else:
-        coords = (elem.get('x'), elem.get('y'), elem.get('width'), elem.get('height'))
-        if all(coords):
-            try:
-                x, y, w, h = map(float, coords)
-                self.elements.append((int(x), int(y), int(w), int(h), elem))
-            except ValueError:
-                pass
\ No newline at end of file
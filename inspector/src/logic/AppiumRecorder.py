@@ -1,6 +1,5 @@
 import json
 import uuid
-from lxml import etree
 
 class AppiumRecorder:
     def __init__(self):
@@ -11,7 +10,7 @@ class AppiumRecorder:
     def setRecordingOn(self, state):
         self.recordingOn = state
 
-    def record_dual_step(self, ios_elem, android_elem, ios_img_b64, android_img_b64):
+    def record_dual_step(self, ios_elem, android_elem, ios_img_b64, android_img_b64, ios_screen=None, android_screen=None):
         record = {
             "stepNumber": self.step_counter,
             "iOS_ids": generate_ios_locators(ios_elem),
@@ -19,6 +18,11 @@ class AppiumRecorder:
             "iOS_img_base64": ios_img_b64,
             "android_img_base64": android_img_b64
         }
+        # Fingerprint, locator and bounds of the screen each click happened on (see ScreenIndex)
+        if ios_screen:
+            record["iOS_screen"] = ios_screen
+        if android_screen:
+            record["android_screen"] = android_screen
 
         self.click_records.append(record)
         self.step_counter += 1
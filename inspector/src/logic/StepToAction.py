@@ -0,0 +1,251 @@
+import json
+import time
+
+from .element_index import ElementIndex
+from .locator_report import MatchCounter, find_locator
+from .screen_index import RECORD_SCREEN_KEYS, fingerprint
+
+# Recorded locator keys that are not Appium `by` strategies as they are
+APPIUM_BY = {"resource-id": "id"}
+
+# Rough per-lookup cost in ms until real timings exist; native ids beat predicates, XPath is last
+DEFAULT_COSTS = {
+    "accessibility id": 150, "resource-id": 150, "-ios predicate string": 250,
+    "-ios class chain": 250, "-android uiautomator": 400, "xpath": 1500,
+}
+RECORD_KEYS = (("iOS", "iOS_ids"), ("Android", "android_ids"))
+BOUNDS_TOLERANCE = 2 # points an element may move and still be tapped at its recorded position
+
+
+class LocatorStats:
+    """
+    Lookup latency per (platform, strategy), measured on devices by DriverFinder and click_step.
+    Persisted as JSON between sessions; strategies never run on a device keep their default cost.
+    """
+
+    def __init__(self, samples: dict = None):
+        self._samples = samples or {} # "platform|strategy" -> [count, total seconds, min, max]
+
+
+    def record(self, platform: str, strategy: str, seconds: float):
+        entry = self._samples.setdefault(f"{platform}|{strategy}", [0, 0.0, seconds, seconds])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = min(entry[2], seconds)
+        entry[3] = max(entry[3], seconds)
+
+
+    def cost(self, platform: str, strategy: str):
+        """Mean device lookup time in ms, or the default estimate for strategies never measured."""
+        entry = self._samples.get(f"{platform}|{strategy}")
+        if entry:
+            return entry[1] / entry[0] * 1000
+        return DEFAULT_COSTS.get(strategy, 1000)
+
+
+    def summary(self):
+        return {
+            key: {"count": count, "mean_ms": total / count * 1000, "min_ms": low * 1000, "max_ms": high * 1000}
+            for key, (count, total, low, high) in self._samples.items()
+        }
+
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self._samples, f, indent=2)
+
+
+    @classmethod
+    def load(cls, path: str):
+        try:
+            with open(path, encoding="utf-8") as f:
+                samples = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        # Older files also held timings against the local index, which say nothing about devices
+        return cls({key: entry for key, entry in samples.items() if not key.endswith("|local")})
+
+
+class DriverFinder:
+    """Counts matches on the device, timing each lookup."""
+
+    def __init__(self, driver, platform: str, stats: LocatorStats):
+        self.driver = driver
+        self.platform = platform
+        self._stats = stats
+
+
+    def count(self, strategy: str, value: str):
+        start = time.perf_counter()
+        try:
+            found = self.driver.find_elements(APPIUM_BY.get(strategy, strategy), value)
+        except Exception as e:
+            print(f"⚠️ {strategy} falló: {e}")
+            return 0
+        self._stats.record(self.platform, strategy, time.perf_counter() - start)
+        return len(found)
+
+
+class LocalFinder:
+    """
+    Counts matches in a snapshot's element index, no device involved. Index lookups take
+    microseconds whatever the strategy, so they are not timed: ranking uses device costs.
+    """
+
+    def __init__(self, element_index: ElementIndex, platform: str):
+        self.platform = platform
+        self._counter = MatchCounter(element_index)
+
+
+    def count(self, strategy: str, value: str):
+        return self._counter.count(strategy, value)
+
+
+class StepCompiler:
+    """
+    Turns AppiumRecorder recordings into replay plans: every step keeps the cheapest
+    locator that selects exactly one element, plus the other unique ones as fallbacks.
+    """
+
+    def __init__(self, stats: LocatorStats = None):
+        self.stats = stats or LocatorStats()
+
+
+    def compile_step(self, locators: dict, finder):
+        """Plan entry for one element, or None when no recorded locator is unique."""
+        platform = finder.platform
+        candidates = []
+        for strategy, value in locators.items():
+            if not value:
+                continue
+            if finder.count(strategy, value) == 1:
+                candidates.append({"strategy": strategy, "by": APPIUM_BY.get(strategy, strategy), "value": value})
+
+        # Cheapest first by device timings; never-measured strategies keep their default rank
+        candidates.sort(key=lambda candidate: self.stats.cost(platform, candidate["strategy"]))
+        for candidate in candidates:
+            candidate["cost_ms"] = round(self.stats.cost(platform, candidate["strategy"]), 1)
+        if not candidates:
+            return None
+        return {"locator": candidates[0], "fallbacks": candidates[1:]}
+
+
+    def compile_recording(self, records: list, drivers: dict = None, element_indexes: dict = None, settle: float = 2.0):
+        """
+        Plan for a whole recording. With drivers ({"iOS": driver, "Android": driver}) every
+        locator is timed on the device and the chosen one is clicked to reach the next step;
+        with element_indexes ({"iOS": [index per step], ...}) uniqueness is checked offline.
+        """
+        plan = []
+        for step, record in enumerate(records):
+            entry = {"stepNumber": record.get("stepNumber", step + 1)}
+            for platform, ids_key in RECORD_KEYS:
+                locators = record.get(ids_key) or {}
+                if drivers and platform in drivers:
+                    finder = DriverFinder(drivers[platform], platform, self.stats)
+                elif element_indexes and platform in element_indexes:
+                    finder = LocalFinder(element_indexes[platform][step], platform)
+                else:
+                    continue
+
+                compiled = self.compile_step(locators, finder)
+                if compiled is None:
+                    print(f"⚠️ Paso {entry['stepNumber']} ({platform}): ningún locator es único.")
+                    continue
+                screen = record.get(RECORD_SCREEN_KEYS[platform][1])
+                if screen and screen.get("bounds"):
+                    compiled["bounds"] = screen["bounds"] # where the element was when recorded, for replay_plan(screens=...)
+                entry[platform] = compiled
+                if isinstance(finder, DriverFinder):
+                    click_step(finder.driver, compiled, self.stats, platform)
+            plan.append(entry)
+            if drivers:
+                time.sleep(settle)
+        return plan
+
+
+def click_step(driver, compiled: dict, stats: LocatorStats = None, platform: str = None):
+    """Clicks the compiled locator, falling back in order; returns the locator that worked."""
+    last_error = None
+    for locator in [compiled["locator"]] + compiled["fallbacks"]:
+        try:
+            start = time.perf_counter()
+            element = driver.find_element(locator["by"], locator["value"])
+            if stats is not None:
+                stats.record(platform, locator["strategy"], time.perf_counter() - start)
+            element.click()
+            return locator
+        except Exception as e:
+            last_error = e
+    raise last_error
+
+
+def current_element_index(driver):
+    """Hierarchy of the screen the driver is on, through its source profile when it has one."""
+    profile = getattr(driver, "source_profile", None)
+    if profile is None:
+        return ElementIndex.from_page_source(driver.page_source)
+    return profile.fetch(driver)[1]
+
+
+def tap_known_position(driver, screens, entry: dict, platform: str):
+    """
+    Fingerprints the live screen; when it is the one the step was recorded on and the step's
+    locator still resolves, in the same hierarchy, to the element at the recorded bounds, taps
+    there directly and returns True. False means: locate the element instead.
+    """
+    compiled = entry[platform]
+    element_index = current_element_index(driver)
+    screen_id, score = screens.match(fingerprint(element_index))
+    if screen_id is None:
+        print(f"⚠️ Paso {entry['stepNumber']} ({platform}): pantalla desconocida ({score:.2f}).")
+        return False
+    steps = screens.screens[screen_id]["steps"]
+    if entry["stepNumber"] not in steps:
+        print(f"⚠️ Paso {entry['stepNumber']} ({platform}): la pantalla es la del paso {steps}.")
+        return False
+    if not compiled.get("bounds"):
+        return False
+    # A scrolled list keeps the screen's token bag, so the fingerprint alone cannot tell the rows apart
+    locator = compiled["locator"]
+    node_ids = find_locator(element_index, locator["strategy"], locator["value"])
+    current = element_index.bounds[node_ids[0]] if len(node_ids) == 1 else None
+    if current is None or any(abs(a - b) > BOUNDS_TOLERANCE for a, b in zip(current, compiled["bounds"])):
+        print(f"⚠️ Paso {entry['stepNumber']} ({platform}): el elemento ya no está donde se grabó.")
+        return False
+    x, y, width, height = current
+    driver.tap([(int(x + width / 2), int(y + height / 2))], 100)
+    return True
+
+
+def replay_plan(plan: list, drivers: dict, settle: float = 1.0, stats: LocatorStats = None, screens: dict = None):
+    """
+    Clicks every step of a compiled plan on each platform's driver; returns seconds per step.
+    With screens ({"iOS": ScreenIndex, ...}, e.g. ScreenIndex.from_recording) each step first
+    checks it is on the recorded screen and then taps the recorded position, skipping the lookup.
+    """
+    timings = []
+    for entry in plan:
+        start = time.perf_counter()
+        for platform, driver in drivers.items():
+            compiled = entry.get(platform)
+            if compiled is None:
+                continue
+            if screens and platform in screens and tap_known_position(driver, screens[platform], entry, platform):
+                continue
+            locator = click_step(driver, compiled, stats, platform)
+            if locator is not compiled["locator"]:
+                print(f"⚠️ Paso {entry['stepNumber']} ({platform}): usado fallback {locator['strategy']}")
+        timings.append(time.perf_counter() - start)
+        time.sleep(settle)
+    return timings
+
+
+def save_plan(plan: list, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=4, ensure_ascii=False)
+
+
+def load_plan(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -1,3 +1,11 @@
 
-from .appium_driver import AppiumDriver
-from .AppiumRecorder import AppiumRecorder
+# Driver and recorder pull in appium/selenium, so they load on first use
+# and offline inspection never imports them
+def __getattr__(name):
+    if name == "AppiumDriver":
+        from .appium_driver import AppiumDriver
+        return AppiumDriver
+    if name == "AppiumRecorder":
+        from .AppiumRecorder import AppiumRecorder
+        return AppiumRecorder
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,6 +3,8 @@ from appium import webdriver
 from appium.options.common.base import AppiumOptions
 
 class AppiumDriver(webdriver.Remote):
+    source_profile = None # SourceProfile used for hierarchy fetches, None for the plain page source
+
     def __init__(self, url: str, capabilities: dict):
         options = AppiumOptions()
         options.load_capabilities(capabilities)
@@ -0,0 +1,268 @@
+import ssl
+import json
+import base64
+import asyncio
+from collections import deque
+from urllib.parse import urlparse
+
+W3C_ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+DEFAULT_TIMEOUT = 60.0
+IDEMPOTENT_METHODS = ("GET", "DELETE")
+W3C_CAPABILITIES = {
+    "platformName", "browserName", "browserVersion", "acceptInsecureCerts", "pageLoadStrategy", "proxy",
+    "setWindowRect", "timeouts", "strictFileInteractability", "unhandledPromptBehavior", "webSocketUrl",
+}
+
+
+class AppiumCommandError(Exception):
+    """Non-2xx answer of the Appium server, with the W3C error code and message."""
+
+    def __init__(self, status: int, error: str, message: str):
+        super().__init__(f"{status} {error}: {message}")
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection; a request is written and its response read whole."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self.reusable = True
+        self.answered = False # some of the current response arrived
+
+
+    @property
+    def closed(self):
+        """The server hung up while the connection sat idle."""
+        return self._reader.at_eof() or self._writer.is_closing()
+
+
+    async def request(self, method: str, path: str, host: str, body: bytes = None):
+        self.answered = False
+        head = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: keep-alive", "Accept: application/json"]
+        if body is not None:
+            head += ["Content-Type: application/json; charset=utf-8", f"Content-Length: {len(body)}"]
+        elif method in ("POST", "PUT"):
+            head.append("Content-Length: 0")
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Appium server closed the connection")
+        self.answered = True
+        version, status = status_line.split(b" ", 2)[:2]
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            payload = await self._read_chunked()
+        elif "content-length" in headers:
+            payload = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await self._reader.read()
+            self.reusable = False
+        if headers.get("connection", "").lower() == "close" or version == b"HTTP/1.0":
+            self.reusable = False
+        return int(status), payload
+
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self._reader.readline()
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readline()
+
+
+    def close(self):
+        self.reusable = False
+        self._writer.close()
+
+
+class ConnectionPool:
+    """
+    Keep-alive connections to one Appium server, shared by every session on it. At most
+    max_connections requests are in flight; idle connections are reused newest first.
+    """
+
+    def __init__(self, server_url: str, max_connections: int = 32):
+        parsed = urlparse(server_url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.base_path = parsed.path.rstrip("/")
+        self._ssl = ssl.create_default_context() if parsed.scheme == "https" else None
+        self._host_header = parsed.netloc
+        self._idle = deque()
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+
+    async def request(self, method: str, path: str, payload=None):
+        """`value` of the JSON answer; raises AppiumCommandError on an error status."""
+        body = None if payload is None else json.dumps(payload).encode("utf-8")
+        async with self._slots:
+            connection = self._idle_connection()
+            reused = connection is not None
+            if not reused:
+                connection = await self._open()
+            try:
+                status, raw = await connection.request(method, self.base_path + path, self._host_header, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection.close()
+                # A keep-alive connection the server dropped while idle fails before any answer. A POST
+                # may have run anyway (read, then dropped), so only idempotent commands are sent again
+                if not reused or connection.answered or method not in IDEMPOTENT_METHODS:
+                    raise
+                connection = await self._open()
+                try:
+                    status, raw = await connection.request(method, self.base_path + path, self._host_header, body)
+                except BaseException:
+                    connection.close()
+                    raise
+            except BaseException:
+                # Timeout or cancellation mid-response: the stream is out of sync, never reuse it
+                connection.close()
+                raise
+            if connection.reusable:
+                self._idle.append(connection)
+            else:
+                connection.close()
+
+        value = json.loads(raw).get("value") if raw else None
+        if status >= 300:
+            error = value if isinstance(value, dict) else {}
+            raise AppiumCommandError(status, error.get("error", "unknown error"), error.get("message", str(value)))
+        return value
+
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop().close()
+
+
+    def _idle_connection(self):
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.closed:
+                return connection
+            connection.close()
+        return None
+
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+
+class AsyncAppiumDriver:
+    """
+    asyncio counterpart of AppiumDriver for the commands the inspector uses. Sessions on
+    the same server share a ConnectionPool, so one event loop drives dozens of devices.
+    Every command takes a timeout (seconds); cancelling the awaiting task aborts it.
+    """
+
+    def __init__(self, pool: ConnectionPool, session_id: str, capabilities: dict = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.pool = pool
+        self.session_id = session_id
+        self.capabilities = capabilities or {}
+        self.timeout = timeout
+
+
+    @classmethod
+    async def create(cls, pool: ConnectionPool, capabilities: dict, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Starts a new session (session creation can take minutes, so it gets its own timeout).
+        Capabilities outside the W3C set get the `appium:` prefix unless they carry a vendor prefix.
+        """
+        always_match = {
+            name if name in W3C_CAPABILITIES or ":" in name else f"appium:{name}": value
+            for name, value in capabilities.items()
+        }
+        payload = {"capabilities": {"alwaysMatch": always_match, "firstMatch": [{}]}}
+        value = await asyncio.wait_for(pool.request("POST", "/session", payload), timeout)
+        return cls(pool, value["sessionId"], value.get("capabilities"))
+
+
+    @classmethod
+    def attach(cls, pool: ConnectionPool, session_id: str, capabilities: dict = None):
+        """Drives a session created elsewhere (for example by the blocking AppiumDriver)."""
+        return cls(pool, session_id, capabilities)
+
+
+    async def execute(self, method: str, path: str, payload=None, timeout: float = None):
+        return await asyncio.wait_for(
+            self.pool.request(method, f"/session/{self.session_id}{path}", payload),
+            self.timeout if timeout is None else timeout,
+        )
+
+
+    async def get_screenshot_as_png(self, timeout: float = None):
+        return base64.b64decode(await self.execute("GET", "/screenshot", timeout=timeout))
+
+
+    async def page_source(self, timeout: float = None):
+        return await self.execute("GET", "/source", timeout=timeout)
+
+
+    async def get_window_size(self, timeout: float = None):
+        rect = await self.execute("GET", "/window/rect", timeout=timeout)
+        return {"width": rect["width"], "height": rect["height"]}
+
+
+    async def find_element(self, by: str, value: str, timeout: float = None):
+        """Element id of the first match; `no such element` surfaces as AppiumCommandError."""
+        found = await self.execute("POST", "/element", {"using": by, "value": value}, timeout)
+        return _element_id(found)
+
+
+    async def find_elements(self, by: str, value: str, timeout: float = None):
+        found = await self.execute("POST", "/elements", {"using": by, "value": value}, timeout)
+        return [_element_id(element) for element in found]
+
+
+    async def click(self, element_id: str, timeout: float = None):
+        await self.execute("POST", f"/element/{element_id}/click", {}, timeout)
+
+
+    async def tap(self, x: int, y: int, duration_ms: int = 100, timeout: float = None):
+        await self.swipe(x, y, x, y, duration_ms, timeout)
+
+
+    async def swipe(self, start_x: int, start_y: int, end_x: int, end_y: int, duration_ms: int = 300,
+                    timeout: float = None):
+        actions = [{
+            "type": "pointer", "id": "finger", "parameters": {"pointerType": "touch"},
+            "actions": [
+                {"type": "pointerMove", "duration": 0, "x": int(start_x), "y": int(start_y)},
+                {"type": "pointerDown", "button": 0},
+                {"type": "pointerMove", "duration": int(duration_ms), "x": int(end_x), "y": int(end_y)},
+                {"type": "pointerUp", "button": 0},
+            ],
+        }]
+        await self.execute("POST", "/actions", {"actions": actions}, timeout)
+
+
+    async def execute_script(self, script: str, *args, timeout: float = None):
+        return await self.execute("POST", "/execute/sync", {"script": script, "args": list(args)}, timeout)
+
+
+    async def quit(self, timeout: float = None):
+        await self.execute("DELETE", "", timeout=timeout)
+
+
+def _element_id(element: dict):
+    return element.get(W3C_ELEMENT_KEY) or element.get("ELEMENT")
@@ -0,0 +1,232 @@
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from .dataset_files import image_names
+
+HASH_SIZE = 16 # 16x16 gradient bits; 64-bit hashes cannot tell apart most screens of one app
+DEFAULT_THRESHOLD = 12 # differing bits still considered the same screen
+
+
+def dhash_array(gray, hash_size: int = HASH_SIZE):
+    """Difference hash of a 2-D grayscale array: area-average downscale, then left > right per row."""
+    import numpy as np
+
+    rows, cols = hash_size, hash_size + 1
+    height, width = gray.shape
+    if height < rows or width < cols:
+        raise ValueError("Image too small to hash")
+    gray = gray[:height - height % rows, :width - width % cols].astype(np.float32)
+    small = gray.reshape(rows, height // rows, cols, width // cols).mean(axis=(1, 3))
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def dhash_pixels(pixels, size: tuple, hash_size: int = HASH_SIZE):
+    """dHash of packed RGB rows (a Snapshot's pixels), without going through PNG."""
+    import numpy as np
+
+    width, height = size
+    rgb = np.frombuffer(pixels, dtype=np.uint8, count=width * height * 3).reshape(height, width, 3)
+    gray = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+    return dhash_array(gray, hash_size)
+
+
+def dhash_file(path: str, hash_size: int = HASH_SIZE):
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.draft("L", (image.width // 4, image.height // 4)) # JPEG decodes at reduced size, PNG ignores it
+        return dhash_array(np.asarray(image.convert("L")), hash_size)
+
+
+class HashIndex:
+    """
+    Multi-index hashing over Hamming distance. A hash is cut into radius + 1 bands; two hashes
+    within radius bits agree exactly on at least one band (pigeonhole), so a search only
+    checks the entries sharing a band with the query instead of walking a metric tree.
+    """
+
+    def __init__(self, radius: int = DEFAULT_THRESHOLD, bits: int = HASH_SIZE * HASH_SIZE):
+        self.radius = radius
+        count = radius + 1
+        width, extra = divmod(bits, count)
+        self._bands = [] # (shift, mask) per band, widths differ by at most one bit
+        shift = 0
+        for band in range(count):
+            band_width = width + (band < extra)
+            self._bands.append((shift, (1 << band_width) - 1))
+            shift += band_width
+        self._buckets = [{} for _ in self._bands] # band value -> [entry id]
+        self._entries = [] # (hash, value)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def add(self, hash_value: int, value):
+        entry_id = len(self._entries)
+        self._entries.append((hash_value, value))
+        for buckets, (shift, mask) in zip(self._buckets, self._bands):
+            buckets.setdefault((hash_value >> shift) & mask, []).append(entry_id)
+
+
+    def search(self, hash_value: int, radius: int = None):
+        """(distance, value) of every entry within radius (at most the index's), nearest first."""
+        radius = self.radius if radius is None else radius
+        if radius > self.radius:
+            raise ValueError(f"Index built for radius {self.radius}, not {radius}")
+        candidates = set()
+        for buckets, (shift, mask) in zip(self._buckets, self._bands):
+            candidates.update(buckets.get((hash_value >> shift) & mask, ()))
+        found = []
+        for entry_id in sorted(candidates):
+            entry_hash, value = self._entries[entry_id]
+            distance = (entry_hash ^ hash_value).bit_count()
+            if distance <= radius:
+                found.append((distance, value))
+        found.sort(key=lambda item: item[0])
+        return found
+
+
+def merge_labels(label_path: str, lines: list):
+    """Appends the YOLO label lines that the file does not already hold."""
+    existing = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            existing = [line.strip() for line in f if line.strip()]
+    new_lines = [line.strip() for line in lines if line.strip() and line.strip() not in existing]
+    if new_lines:
+        with open(label_path, "w") as f:
+            f.write("\n".join(existing + new_lines) + "\n")
+    return len(new_lines)
+
+
+class DatasetIndex:
+    """
+    Perceptual-hash index of a YOLO dataset split, stored next to it as `hashes_<split>.txt`
+    (one `hex name` line per image). A capture that is a near-duplicate of an image already
+    in the split only adds its label to that image.
+    """
+
+    def __init__(self, dataset_dir: str, split: str = "train", threshold: int = DEFAULT_THRESHOLD):
+        self.dataset_dir = dataset_dir
+        self.split = split
+        self.threshold = threshold
+        self.images_dir = os.path.join(dataset_dir, "images", split)
+        self.labels_dir = os.path.join(dataset_dir, "labels", split)
+        self.index_path = os.path.join(dataset_dir, f"hashes_{split}.txt")
+        self._hashes = HashIndex(threshold)
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    hex_hash, name = line.split()
+                    self._hashes.add(int(hex_hash, 16), name)
+        else:
+            self.rebuild()
+
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+    def find(self, hash_value: int):
+        """Name of the closest near-duplicate image, or None."""
+        matches = self._hashes.search(hash_value, self.threshold)
+        return matches[0][1] if matches else None
+
+
+    def add(self, snapshot, label_lines: list):
+        """(image name, merged): writes the capture, or only its labels when a near-duplicate exists."""
+        hash_value = dhash_pixels(snapshot.pixels, snapshot.size)
+        duplicate = self.find(hash_value)
+        if duplicate is not None:
+            merge_labels(self._label_path(duplicate), label_lines)
+            return duplicate, True
+
+        os.makedirs(self.images_dir, exist_ok=True)
+        os.makedirs(self.labels_dir, exist_ok=True)
+        name = f"img{uuid.uuid4()}.png"
+        image_path = os.path.join(self.images_dir, name)
+        if snapshot.screenshot is not None:
+            with open(image_path, "wb") as f:
+                f.write(snapshot.screenshot)
+        else:
+            snapshot.image.save(image_path)
+        merge_labels(self._label_path(name), label_lines)
+
+        self._hashes.add(hash_value, name)
+        with open(self.index_path, "a") as f:
+            f.write(f"{hash_value:x} {name}\n")
+        return name, False
+
+
+    def rebuild(self, max_workers: int = None):
+        """Hashes every image of the split (in parallel) and rewrites the index file."""
+        self._hashes = HashIndex(self.threshold)
+        names = image_names(self.images_dir)
+        hashes = _hash_files([os.path.join(self.images_dir, name) for name in names], max_workers)
+        for name, hash_value in zip(names, hashes):
+            self._hashes.add(hash_value, name)
+        _write_index(self.index_path, zip(hashes, names))
+
+
+    def _label_path(self, image_name: str):
+        return os.path.join(self.labels_dir, os.path.splitext(image_name)[0] + ".txt")
+
+
+def dedupe_dataset(dataset_dir: str, split: str = "train", threshold: int = DEFAULT_THRESHOLD,
+                   duplicates_dir: str = None, max_workers: int = None):
+    """
+    Batch pass over an existing split: hashes every image in parallel, keeps the first of
+    each near-duplicate group, merges the others' labels into it and moves their image and
+    label files to duplicates_dir (default `<dataset>/duplicates/<split>`). Returns (kept, moved).
+    """
+    images_dir = os.path.join(dataset_dir, "images", split)
+    labels_dir = os.path.join(dataset_dir, "labels", split)
+    duplicates_dir = duplicates_dir or os.path.join(dataset_dir, "duplicates", split)
+
+    names = image_names(images_dir)
+    hashes = _hash_files([os.path.join(images_dir, name) for name in names], max_workers)
+
+    tree = HashIndex(threshold)
+    kept = []
+    moved = 0
+    for name, hash_value in zip(names, hashes):
+        matches = tree.search(hash_value, threshold)
+        if not matches:
+            tree.add(hash_value, name)
+            kept.append((hash_value, name))
+            continue
+
+        keeper = matches[0][1]
+        os.makedirs(duplicates_dir, exist_ok=True)
+        label_path = os.path.join(labels_dir, os.path.splitext(name)[0] + ".txt")
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                merge_labels(os.path.join(labels_dir, os.path.splitext(keeper)[0] + ".txt"), f.readlines())
+            shutil.move(label_path, os.path.join(duplicates_dir, os.path.basename(label_path)))
+        shutil.move(os.path.join(images_dir, name), os.path.join(duplicates_dir, name))
+        moved += 1
+
+    _write_index(os.path.join(dataset_dir, f"hashes_{split}.txt"), kept)
+    return len(kept), moved
+
+
+def _hash_files(paths: list, max_workers: int = None):
+    if len(paths) < 64:
+        return [dhash_file(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(dhash_file, paths, chunksize=64))
+
+
+def _write_index(index_path: str, entries):
+    os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+    with open(index_path + ".tmp", "w") as f:
+        for hash_value, name in entries:
+            f.write(f"{hash_value:x} {name}\n")
+    os.replace(index_path + ".tmp", index_path)
@@ -0,0 +1,10 @@
+import os
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def image_names(images_dir: str):
+    """Sorted image file names of a dataset split directory, [] when it does not exist."""
+    if not os.path.isdir(images_dir):
+        return []
+    return sorted(name for name in os.listdir(images_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
@@ -0,0 +1,307 @@
+import os
+import time
+import zlib
+import hashlib
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .dataset_files import image_names
+
+SHARD_BYTES = 256 * 1024 * 1024
+VAL_FRACTION = 0.1
+READ_BUFFER = 16 * 1024 * 1024
+COMMIT_EVERY = 64 # samples per tar fsync; their index lines are written only after it
+_BLOCK = 512
+_TRAILER = b"\0" * (2 * _BLOCK)
+
+
+def split_of(key: str, val_fraction: float = VAL_FRACTION):
+    """train or val from a hash of the sample key: stable across runs, machines and appends."""
+    bucket = int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:4], "big") / 2 ** 32
+    return "val" if bucket < val_fraction else "train"
+
+
+def _label_stat(label_path: str):
+    """(size, mtime in ns) of a label file, (0, 0) when the image has none."""
+    try:
+        stat = os.stat(label_path)
+    except FileNotFoundError:
+        return 0, 0
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _read_label(label_path: str):
+    if not os.path.exists(label_path):
+        return b""
+    with open(label_path, "rb") as f:
+        return f.read()
+
+
+def _read_sample(image_path: str, label_path: str):
+    # Stat before reading: a label edited in between looks changed next time, never the other way
+    label_mtime = _label_stat(label_path)[1]
+    with open(image_path, "rb") as f:
+        return f.read(), _read_label(label_path), label_mtime
+
+
+class _Shard:
+    """
+    One uncompressed tar of `<key>.<ext>` image and `<key>.txt` label members (readable by any
+    tar / WebDataset loader, see DatasetPacker for relabelled keys) plus its `.idx` offset index, one TSV line per sample:
+    key, ext, image offset, image size, label offset, label size, label crc, end of sample,
+    label mtime (ns). Index lines only reach the file once the tar bytes they point to are
+    fsynced, so after a crash the index never points past what is on disk; a torn last
+    line is ignored and cut off on the next append.
+    """
+
+    def __init__(self, pack_dir: str, split: str, number: int):
+        self.name = f"{split}-{number:05d}"
+        self.tar_path = os.path.join(pack_dir, self.name + ".tar")
+        self.idx_path = os.path.join(pack_dir, self.name + ".idx")
+        self.end = 0 # where the next member header goes, the trailer is written past it
+        self.entries = []
+        self._idx_bytes = 0 # length of the complete lines of the index
+        if os.path.exists(self.idx_path):
+            with open(self.idx_path, "rb") as f:
+                for line in f:
+                    entry = _parse_entry(line)
+                    if entry is None:
+                        break # only a crash mid-write leaves one, and only as the last line
+                    self.entries.append(entry)
+                    self.end = entry[7]
+                    self._idx_bytes += len(line)
+        self._tar = None
+        self._idx = None
+        self._pending = [] # index lines waiting for the tar fsync
+
+
+    def append(self, key: str, ext: str, image: bytes, label: bytes, label_mtime: int = 0):
+        if self._tar is None:
+            # Anything past the last indexed sample (old trailer, interrupted write) is dropped
+            self._tar = open(self.tar_path, "r+b" if os.path.exists(self.tar_path) else "w+b")
+            self._tar.truncate(self.end)
+            self._tar.seek(self.end)
+            self._idx = open(self.idx_path, "a", encoding="utf-8")
+            self._idx.truncate(self._idx_bytes)
+        image_offset = self._write_member(f"{key}{ext}", image)
+        label_offset = self._write_member(f"{key}.txt", label)
+        self.end = self._tar.tell()
+        entry = [key, ext, image_offset, len(image), label_offset, len(label), zlib.crc32(label), self.end, label_mtime]
+        self.entries.append(entry)
+        self._pending.append("\t".join(map(str, entry)) + "\n")
+        if len(self._pending) >= COMMIT_EVERY:
+            self.commit()
+        return entry
+
+
+    def commit(self):
+        """Makes the appended samples durable: tar bytes first, then the index lines pointing at them."""
+        if not self._pending:
+            return
+        self._tar.flush()
+        os.fsync(self._tar.fileno())
+        self._idx.write("".join(self._pending))
+        self._idx.flush()
+        self._pending = []
+
+
+    def close(self):
+        if self._tar is None:
+            return
+        self.commit()
+        self._tar.write(_TRAILER)
+        self._tar.close()
+        self._idx.close()
+        self._tar = self._idx = None
+
+
+    def _write_member(self, name: str, data: bytes):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        self._tar.write(info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"))
+        offset = self._tar.tell()
+        self._tar.write(data)
+        self._tar.write(b"\0" * (-len(data) % _BLOCK))
+        return offset
+
+
+def _parse_entry(line: bytes):
+    """Index entry of one line, or None when the line is torn."""
+    if not line.endswith(b"\n"):
+        return None
+    fields = line.decode("utf-8", "replace").rstrip("\n").split("\t")
+    if len(fields) < 8:
+        return None
+    try:
+        return [fields[0], fields[1], *map(int, fields[2:])]
+    except ValueError:
+        return None
+
+
+def _shard_numbers(pack_dir: str, split: str):
+    if not os.path.isdir(pack_dir):
+        return []
+    prefix = split + "-"
+    return sorted(
+        int(name[len(prefix):-4]) for name in os.listdir(pack_dir)
+        if name.startswith(prefix) and name.endswith(".idx")
+    )
+
+
+class DatasetPacker:
+    """
+    Packs a YOLO dataset (images/<split>, labels/<split>) into fixed-size tar shards with an
+    offset index, split train/val by key hash. Packing again only appends what is new, or
+    a newer record for an image whose labels changed since (near-duplicate merges).
+
+    Tars are append-only, so the older record of a relabelled key stays in its shard. Only
+    PackedSplit, which reads the index, skips it; a plain tar or WebDataset loader sees both
+    samples once `updated` is non-zero. Repack into an empty directory to get unique keys.
+    """
+
+    def __init__(self, pack_dir: str, shard_bytes: int = SHARD_BYTES, val_fraction: float = VAL_FRACTION):
+        self.pack_dir = pack_dir
+        self.shard_bytes = shard_bytes
+        self.val_fraction = val_fraction
+        self._shards = {} # split -> open _Shard
+        self._packed = {} # key -> newest index entry
+        for split in ("train", "val"):
+            for number in _shard_numbers(pack_dir, split):
+                for entry in _Shard(pack_dir, split, number).entries:
+                    self._packed[entry[0]] = entry
+
+
+    def pack(self, dataset_dir: str, source_split: str = "train", workers: int = 8):
+        """Counts of samples appended per split, plus `updated` (labels changed since packed)."""
+        images_dir = os.path.join(dataset_dir, "images", source_split)
+        labels_dir = os.path.join(dataset_dir, "labels", source_split)
+        os.makedirs(self.pack_dir, exist_ok=True)
+
+        pending = []
+        updated = 0
+        for name in image_names(images_dir):
+            key, ext = os.path.splitext(name)
+            label_path = os.path.join(labels_dir, key + ".txt")
+            if key in self._packed:
+                # Only labels change after a capture is saved; a stat tells whether to look closer
+                if not self._label_changed(self._packed[key], label_path):
+                    continue
+                updated += 1
+            pending.append((key, ext, os.path.join(images_dir, name), label_path))
+
+        counts = {"train": 0, "val": 0, "updated": updated}
+        # Small-file reads overlap on threads, a bounded window ahead of the sequential writes
+        window = deque()
+        samples = iter(pending)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                for key, ext, image_path, label_path in samples:
+                    window.append((key, ext, executor.submit(_read_sample, image_path, label_path)))
+                    if len(window) >= workers * 4:
+                        break
+                if not window:
+                    break
+                key, ext, future = window.popleft()
+                image, label, label_mtime = future.result()
+                split = split_of(key, self.val_fraction)
+                self._packed[key] = self._shard_for(split, len(image) + len(label)).append(key, ext, image, label, label_mtime)
+                counts[split] += 1
+        self.close()
+        return counts
+
+
+    def close(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards = {}
+
+
+    def _label_changed(self, entry: list, label_path: str):
+        size, mtime = _label_stat(label_path)
+        if len(entry) > 8 and (size, mtime) == (entry[5], entry[8]):
+            return False
+        # Touched or packed before mtimes were indexed: compare the contents
+        return size != entry[5] or zlib.crc32(_read_label(label_path)) != entry[6]
+
+
+    def _shard_for(self, split: str, sample_bytes: int):
+        shard = self._shards.get(split)
+        if shard is None:
+            numbers = _shard_numbers(self.pack_dir, split)
+            shard = _Shard(self.pack_dir, split, numbers[-1] if numbers else 0)
+        if shard.entries and shard.end + sample_bytes + 4 * _BLOCK > self.shard_bytes:
+            shard.close()
+            shard = _Shard(self.pack_dir, split, int(shard.name.rsplit("-", 1)[1]) + 1)
+        self._shards[split] = shard
+        return shard
+
+
+class PackedSplit:
+    """
+    Reader of one packed split. Random access by key costs one positioned read per member;
+    iteration streams every shard front to back through a large buffer.
+    """
+
+    def __init__(self, pack_dir: str, split: str = "train"):
+        self.pack_dir = pack_dir
+        self.split = split
+        self._entries = {} # key -> (tar path, entry); later records win
+        for number in _shard_numbers(pack_dir, split):
+            shard = _Shard(pack_dir, split, number)
+            for entry in shard.entries:
+                self._entries[entry[0]] = (shard.tar_path, entry)
+        self._keys = list(self._entries)
+
+
+    def __len__(self):
+        return len(self._keys)
+
+
+    def keys(self):
+        return list(self._keys)
+
+
+    def read(self, key: str):
+        """(image bytes, label text) of one sample."""
+        tar_path, entry = self._entries[key]
+        _, _, image_offset, image_size, label_offset, label_size = entry[:6]
+        fd = os.open(tar_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            return _pread(fd, image_size, image_offset), _pread(fd, label_size, label_offset).decode("utf-8")
+        finally:
+            os.close(fd)
+
+
+    def __getitem__(self, position: int):
+        return self.read(self._keys[position])
+
+
+    def __iter__(self):
+        """(key, image bytes, label text) in shard order, skipping records superseded by a later one."""
+        by_shard = {}
+        for tar_path, entry in self._entries.values():
+            by_shard.setdefault(tar_path, []).append(entry)
+        for tar_path in sorted(by_shard):
+            with open(tar_path, "rb", buffering=READ_BUFFER) as f:
+                for key, _, image_offset, image_size, label_offset, label_size, *_ in sorted(by_shard[tar_path], key=lambda entry: entry[2]):
+                    f.seek(image_offset)
+                    image = f.read(image_size)
+                    f.seek(label_offset)
+                    yield key, image, f.read(label_size).decode("utf-8")
+
+
+def _pread(fd: int, size: int, offset: int):
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def pack_dataset(dataset_dir: str, pack_dir: str = None, shard_bytes: int = SHARD_BYTES,
+                 val_fraction: float = VAL_FRACTION):
+    """Packs (or tops up) `<dataset>/packed` from `<dataset>/images/train`; returns the counts."""
+    packer = DatasetPacker(pack_dir or os.path.join(dataset_dir, "packed"), shard_bytes, val_fraction)
+    return packer.pack(dataset_dir)
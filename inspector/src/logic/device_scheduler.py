@@ -0,0 +1,107 @@
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class DeviceScheduler:
+    """
+    One bounded worker pool shared by every device. Each device has its own FIFO and at
+    most one job in flight (a session serializes commands anyway), and devices are served
+    round-robin so a slow or busy device never starves the others.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="device")
+        self._lock = threading.Lock()
+        self._queues = {} # device -> deque[(future, fn, args, key)]
+        self._ready = deque() # devices with queued work and nothing in flight
+        self._busy = set()
+        self._in_flight = 0
+
+
+    def submit(self, device, fn, *args, key=None):
+        """
+        Queues fn(*args) for device. A job submitted with the key of one still queued for
+        the same device is coalesced into it and gets the same future.
+        """
+        with self._lock:
+            queue = self._queues.setdefault(device, deque())
+            if key is not None:
+                for future, _, _, queued_key in queue:
+                    if queued_key == key:
+                        return future
+
+            future = Future()
+            queue.append((future, fn, args, key))
+            if device not in self._busy and device not in self._ready:
+                self._ready.append(device)
+        self._dispatch()
+        return future
+
+
+    def gather(self, jobs: dict):
+        """
+        Runs {device: (fn, *args)} concurrently, one job per device, and waits for all of
+        them: {device: (result, exception)}. A failing device never stops the others.
+        """
+        futures = {device: self.submit(device, fn, *args) for device, (fn, *args) in jobs.items()}
+        results = {}
+        for device, future in futures.items():
+            try:
+                results[device] = (future.result(), None)
+            except Exception as e:
+                results[device] = (None, e)
+        return results
+
+
+    def pending(self, device=None):
+        with self._lock:
+            if device is not None:
+                return len(self._queues.get(device, ()))
+            return sum(len(queue) for queue in self._queues.values())
+
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            for queue in self._queues.values():
+                for future, _, _, _ in queue:
+                    future.cancel()
+                queue.clear()
+            self._ready.clear()
+        self._executor.shutdown(wait=wait)
+
+
+    def _dispatch(self):
+        jobs = []
+        with self._lock:
+            while self._ready and self._in_flight < self._max_workers:
+                device = self._ready.popleft()
+                queue = self._queues[device]
+                future, fn, args, _ = queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    if queue:
+                        self._ready.append(device)
+                    continue
+                self._busy.add(device)
+                self._in_flight += 1
+                jobs.append((device, future, fn, args))
+
+        for device, future, fn, args in jobs:
+            self._executor.submit(self._run, device, future, fn, args)
+
+
+    def _run(self, device, future: Future, fn, args):
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._busy.discard(device)
+                self._in_flight -= 1
+                if self._queues[device]:
+                    self._ready.append(device)
+            self._dispatch()
@@ -0,0 +1,277 @@
+import sys
+import math
+import struct
+import threading
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+from .element_index import ElementIndex
+from .snapshot import Snapshot, platform_of, device_of
+
+
+def _worker_main(server_url: str, capabilities: dict, connection, source_profile: str = None, profile_cache: str = None):
+    """
+    Worker process body: owns the Appium session, decodes and indexes every capture and
+    writes the pixels straight into the shared buffer named by the request.
+    """
+    from PIL import Image
+    import io
+
+    from .appium_driver import AppiumDriver
+    from .source_profiles import select_source_profile
+
+    try:
+        driver = AppiumDriver(server_url, capabilities)
+        driver.source_profile = select_source_profile(driver, platform_of(driver.capabilities), source_profile, profile_cache)
+    except Exception as e:
+        connection.send(("error", repr(e)))
+        return
+    connection.send(("ready", dict(driver.capabilities)))
+
+    buffers = {}
+    pending = None # decoded frame that did not fit the offered buffer
+    while True:
+        try:
+            command, *args = connection.recv()
+        except EOFError:
+            break
+
+        try:
+            if command == "capture":
+                buffer_name, capacity = args
+                if pending is None:
+                    png = driver.get_screenshot_as_png()
+                    element_index = _fetch_element_index(driver)
+                    window_size = driver.get_window_size()
+                    image = Image.open(io.BytesIO(png)).convert("RGB")
+                    pending = (image, window_size, element_index)
+
+                image, window_size, element_index = pending
+                needed = image.width * image.height * 3
+                if needed > capacity:
+                    connection.send(("resize", needed))
+                    continue
+
+                if buffer_name not in buffers:
+                    buffers[buffer_name] = shared_memory.SharedMemory(name=buffer_name)
+                buffers[buffer_name].buf[:needed] = image.tobytes()
+                connection.send(("snapshot", image.size, window_size, pack_table(element_index)))
+                pending = None
+            elif command == "index":
+                connection.send(("ok", pack_table(_fetch_element_index(driver))))
+            elif command == "release":
+                buffer = buffers.pop(args[0], None)
+                if buffer is not None:
+                    buffer.close()
+                connection.send(("ok", None))
+            elif command == "call":
+                name, call_args = args
+                connection.send(("ok", getattr(driver, name)(*call_args)))
+            elif command == "quit":
+                break
+        except Exception as e:
+            pending = None
+            connection.send(("error", repr(e)))
+
+    for buffer in buffers.values():
+        buffer.close()
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _fetch_element_index(driver):
+    if driver.source_profile is not None:
+        return driver.source_profile.fetch(driver)[1]
+    return ElementIndex.from_page_source(driver.page_source)
+
+
+_TABLE_HEADER = struct.Struct("<III") # nodes, strings, attribute pairs
+
+
+def _native(values: array):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def pack_table(element_index: ElementIndex):
+    """
+    Element table as one bytes object: every distinct string once, nodes as int32 ids into
+    it (tag, text, attribute key/value pairs with per-node offsets), int32 parents and
+    float32 bounds (NaN for none). Much smaller to send than pickled attribute dicts.
+    """
+    tags, attribs, texts = element_index.to_table()
+    strings = {}
+
+    def string_id(value):
+        if value is None:
+            return -1
+        return strings.setdefault(value, len(strings))
+
+    tag_ids = array("i", map(string_id, tags))
+    text_ids = array("i", map(string_id, texts))
+    offsets = array("I", [0])
+    pairs = array("i")
+    for attrib in attribs:
+        for key, value in attrib.items():
+            pairs.append(string_id(key))
+            pairs.append(string_id(value))
+        offsets.append(len(pairs) // 2)
+    bounds = array("f")
+    for node_bounds in element_index.bounds:
+        bounds.extend(node_bounds if node_bounds is not None else (math.nan,) * 4)
+
+    encoded = [value.encode("utf-8") for value in strings]
+    lengths = array("I", map(len, encoded))
+    sections = (lengths, tag_ids, text_ids, offsets, pairs, array("i", element_index.parents), bounds)
+    return b"".join([
+        _TABLE_HEADER.pack(len(tags), len(encoded), len(pairs) // 2),
+        *(_native(section).tobytes() for section in sections),
+        *encoded,
+    ])
+
+
+def unpack_table(data: bytes):
+    """ElementIndex of a pack_table result."""
+    node_count, string_count, pair_count = _TABLE_HEADER.unpack_from(data, 0)
+    position = _TABLE_HEADER.size
+
+    def take(typecode: str, count: int):
+        nonlocal position
+        values = array(typecode)
+        values.frombytes(data[position:position + count * values.itemsize])
+        position += count * values.itemsize
+        return _native(values)
+
+    lengths = take("I", string_count)
+    tag_ids = take("i", node_count)
+    text_ids = take("i", node_count)
+    offsets = take("I", node_count + 1)
+    pairs = take("i", pair_count * 2).tolist()
+    parents = take("i", node_count).tolist()
+    flat_bounds = take("f", node_count * 4)
+
+    strings = []
+    for length in lengths:
+        strings.append(data[position:position + length].decode("utf-8"))
+        position += length
+
+    attribs = []
+    for node_id in range(node_count):
+        start, end = offsets[node_id] * 2, offsets[node_id + 1] * 2
+        attribs.append({strings[pairs[i]]: strings[pairs[i + 1]] for i in range(start, end, 2)})
+    bounds = []
+    for node_id in range(node_count):
+        node_bounds = tuple(flat_bounds[node_id * 4:node_id * 4 + 4])
+        bounds.append(None if math.isnan(node_bounds[0]) else node_bounds)
+    tags = [strings[tag_id] for tag_id in tag_ids]
+    texts = [strings[text_id] if text_id >= 0 else None for text_id in text_ids]
+    return ElementIndex.from_table(tags, attribs, texts, parents, bounds)
+
+
+class DeviceProcess:
+    """
+    An Appium session living in its own process. The worker writes decoded pixels into a
+    pooled shared memory buffer and only the packed element table crosses the pipe; the
+    pixels are copied out once, so a buffer is free again as soon as the capture returns.
+    """
+
+    def __init__(self, server_url: str, capabilities: dict, source_profile: str = None, profile_cache: str = None):
+        context = multiprocessing.get_context("spawn") # forking a Qt process is not safe
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(
+            target=_worker_main, args=(server_url, capabilities, child_connection, source_profile, profile_cache),
+            daemon=True
+        )
+        self._process.start()
+        child_connection.close()
+        self._lock = threading.Lock()
+        self._free = [] # idle SharedMemory buffers
+        self._buffers = [] # every buffer, for cleanup
+        self._frame_bytes = 0
+
+        status, result = self._connection.recv()
+        if status == "error":
+            self._process.join()
+            raise RuntimeError(f"Device worker failed to open the session: {result}")
+        self.capabilities = result
+        self.platform = platform_of(result)
+        self.device = device_of(result) or device_of(capabilities)
+
+
+    def capture_snapshot(self):
+        with self._lock:
+            buffer = self._free.pop() if self._free else self._allocate(self._frame_bytes)
+            while True:
+                self._connection.send(("capture", buffer.name, buffer.size))
+                status, *result = self._connection.recv()
+                if status == "resize":
+                    # First frame, or the device resolution grew
+                    self._frame_bytes = result[0]
+                    buffer = self._replace(buffer, result[0])
+                    continue
+                if status == "error":
+                    self._free.append(buffer)
+                    raise RuntimeError(result[0])
+                break
+
+            # One memcpy: images, history entries and live copies may outlive any view of the buffer
+            size, window_size, table = result
+            pixels = bytes(buffer.buf[:size[0] * size[1] * 3])
+            self._free.append(buffer)
+
+        element_index = unpack_table(table)
+        return Snapshot(pixels, tuple(size), "", window_size, self.platform, element_index, device=self.device)
+
+
+    def fetch_element_index(self):
+        """Only the hierarchy, for live mirroring where the frames come from the MJPEG stream."""
+        return unpack_table(self._request("index"))
+
+
+    def call(self, name: str, *args):
+        """Runs a driver method inside the worker; arguments and result must be picklable."""
+        return self._request("call", name, args)
+
+
+    def close(self):
+        with self._lock:
+            try:
+                self._connection.send(("quit",))
+            except OSError:
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+            for buffer in self._buffers:
+                buffer.close()
+                buffer.unlink()
+            self._buffers = []
+            self._free = []
+
+
+    def _request(self, *message):
+        with self._lock:
+            self._connection.send(message)
+            status, result = self._connection.recv()
+        if status == "error":
+            raise RuntimeError(result)
+        return result
+
+
+    def _allocate(self, size: int):
+        buffer = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self._buffers.append(buffer)
+        return buffer
+
+
+    def _replace(self, buffer, needed: int):
+        self._connection.send(("release", buffer.name))
+        self._connection.recv()
+        self._buffers.remove(buffer)
+        buffer.close()
+        buffer.unlink()
+        return self._allocate(needed)
@@ -0,0 +1,49 @@
+import io
+import base64
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+def crop_box(image: Image.Image, bounds):
+    """Clamps (x, y, width, height) to the image, returns a PIL box or None if empty."""
+    x, y, width, height = bounds
+    x1, y1 = max(int(x), 0), max(int(y), 0)
+    x2, y2 = min(int(x + width), image.width), min(int(y + height), image.height)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return (x1, y1, x2, y2)
+
+
+def encode_png_base64(image: Image.Image):
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+def crop_element_base64(image: Image.Image, bounds):
+    box = crop_box(image, bounds)
+    if box is None:
+        return None
+    return encode_png_base64(image.crop(box))
+
+
+def crop_elements_base64(image: Image.Image, index, node_ids=None, max_workers=None):
+    """
+    Crops every bounded node of the index (or only node_ids) out of one decoded frame
+    and PNG-encodes the crops on a thread pool. Returns {node_id: base64}.
+    """
+    if node_ids is None:
+        node_ids = index.bounded_ids()
+
+    # Cropping copies pixels out of the shared frame, so it stays on the calling thread
+    crops = {}
+    for node_id in node_ids:
+        bounds = index.bounds[node_id]
+        box = crop_box(image, bounds) if bounds else None
+        if box is not None:
+            crops[node_id] = image.crop(box)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        encoded = pool.map(encode_png_base64, crops.values())
+        return dict(zip(crops.keys(), encoded))
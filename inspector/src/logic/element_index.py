@@ -0,0 +1,178 @@
+import re
+
+_ANDROID_BOUNDS = re.compile(r"\[(-?[\d.]+),(-?[\d.]+)\]\[(-?[\d.]+),(-?[\d.]+)\]")
+
+
+def parse_bounds(element):
+    """Returns (x, y, width, height) for an Android or iOS node, or None."""
+    bounds = element.get("bounds")
+    if bounds:
+        match = _ANDROID_BOUNDS.match(bounds)
+        if not match:
+            return None
+        x1, y1, x2, y2 = map(float, match.groups())
+        return (x1, y1, x2 - x1, y2 - y1)
+
+    coords = (element.get("x"), element.get("y"), element.get("width"), element.get("height"))
+    if not all(coords):
+        return None
+    try:
+        return tuple(map(float, coords))
+    except ValueError:
+        return None
+
+
+class IndexedElement:
+    """Stand-in for an lxml element when an index is loaded from a stored table."""
+
+    __slots__ = ("tag", "attrib", "text", "_index", "_parent_id")
+
+    def __init__(self, index, tag: str, attrib: dict, text, parent_id: int):
+        self.tag = tag
+        self.attrib = attrib
+        self.text = text
+        self._index = index
+        self._parent_id = parent_id
+
+
+    def get(self, key, default=None):
+        return self.attrib.get(key, default)
+
+
+    def getparent(self):
+        if self._parent_id < 0:
+            return None
+        return self._index.elements[self._parent_id]
+
+
+    def __iter__(self):
+        node_id = self._index.id_of(self)
+        return iter([self._index.elements[child_id] for child_id in self._index.children_of(node_id)])
+
+
+class ElementIndex:
+    """Flat table of the nodes of one page source, addressed by node id (document order)."""
+
+    def __init__(self, elements: list, bounds: list, root=None, parents: list = None):
+        self.elements = elements # id -> element
+        self.bounds = bounds # id -> (x, y, width, height) | None
+        self._root = root
+        self._ids = {element: node_id for node_id, element in enumerate(elements)}
+        if parents is None:
+            parents = [self._ids.get(element.getparent(), -1) for element in elements]
+        self.parents = parents # id -> parent id | -1
+        self._children = None
+
+
+    @classmethod
+    def from_page_source(cls, page_source: str):
+        from lxml import etree
+
+        parser = etree.XMLParser(recover=True)
+        root = etree.fromstring(page_source.encode("utf-8"), parser)
+        return cls.from_root(root)
+
+
+    @classmethod
+    def from_root(cls, root):
+        elements = [element for element in root.iter() if isinstance(element.tag, str)]
+        bounds = [parse_bounds(element) for element in elements]
+        return cls(elements, bounds, root)
+
+
+    @classmethod
+    def from_table(cls, tags: list, attribs: list, texts: list, parents: list, bounds: list):
+        index = cls([], bounds, parents=parents)
+        index.elements = [
+            IndexedElement(index, tag, attrib, text, parent_id)
+            for tag, attrib, text, parent_id in zip(tags, attribs, texts, parents)
+        ]
+        index._ids = {element: node_id for node_id, element in enumerate(index.elements)}
+        return index
+
+
+    def to_table(self):
+        """(tags, attribs, texts) columns; parents and bounds are already flat."""
+        tags = [element.tag for element in self.elements]
+        attribs = [dict(element.attrib) for element in self.elements]
+        texts = [element.text.strip() if element.text and element.text.strip() else None for element in self.elements]
+        return tags, attribs, texts
+
+
+    @property
+    def root(self):
+        # Stored indexes rebuild an lxml tree only when an XPath query needs one
+        if self._root is None and self.elements:
+            from lxml import etree
+
+            nodes = []
+            for element, parent_id in zip(self.elements, self.parents):
+                if parent_id < 0:
+                    node = etree.Element(element.tag, element.attrib)
+                else:
+                    node = etree.SubElement(nodes[parent_id], element.tag, element.attrib)
+                node.text = element.text
+                nodes.append(node)
+            self._root = nodes[0]
+            self._ids.update({node: node_id for node_id, node in enumerate(nodes)})
+        return self._root
+
+
+    def children_of(self, node_id: int):
+        if self._children is None:
+            self._children = [[] for _ in self.elements]
+            for child_id, parent_id in enumerate(self.parents):
+                if parent_id >= 0:
+                    self._children[parent_id].append(child_id)
+        return self._children[node_id]
+
+
+    def __len__(self):
+        return len(self.elements)
+
+
+    def id_of(self, element):
+        return self._ids.get(element)
+
+
+    def bounds_of(self, element):
+        node_id = self._ids.get(element)
+        if node_id is None:
+            return None
+        return self.bounds[node_id]
+
+
+    def bounded_ids(self):
+        return [node_id for node_id, bounds in enumerate(self.bounds) if bounds is not None]
+
+
+    def entries(self):
+        """(x, y, width, height, element) tuples for every node with bounds."""
+        return [(*self.bounds[node_id], self.elements[node_id]) for node_id in self.bounded_ids()]
+
+
+    def find_xpath(self, xpath: str):
+        root = self.root
+        if root is None:
+            return []
+        from lxml import etree
+
+        try:
+            matches = root.xpath(xpath)
+        except etree.XPathError:
+            return []
+        return [self._ids[match] for match in matches if match in self._ids]
+
+
+    def hit_test(self, x: float, y: float):
+        """Id of the smallest node containing the point, or None."""
+        best_id = None
+        min_area = float("inf")
+        for node_id, bounds in enumerate(self.bounds):
+            if bounds is None:
+                continue
+            bx, by, width, height = bounds
+            if bx <= x <= bx + width and by <= y <= by + height and width * height < min_area:
+                min_area = width * height
+                best_id = node_id
+        return best_id
@@ -0,0 +1,147 @@
+import io
+import time
+
+import numpy as np
+
+TILE_SIZE = 32
+NOISE_THRESHOLD = 12 # per-channel difference ignored, MJPEG and scaling noise stays below it
+
+
+def _as_array(pixels, size: tuple):
+    width, height = size
+    return np.frombuffer(pixels, dtype=np.uint8, count=width * height * 3).reshape(height, width, 3)
+
+
+def changed_tiles(previous: np.ndarray, current: np.ndarray, tile: int = TILE_SIZE, threshold: int = NOISE_THRESHOLD):
+    """Boolean (rows, cols) grid, True where any pixel of the tile moved by more than threshold."""
+    height, width = current.shape[:2]
+    # max - min never wraps, so it is |a - b| in uint8 without a wider copy; channels stay interleaved
+    difference = np.subtract(np.maximum(previous, current), np.minimum(previous, current)).reshape(height, width * 3)
+    rows = np.maximum.reduceat(difference, np.arange(0, height, tile), axis=0)
+    tiles = np.maximum.reduceat(rows, np.arange(0, width * 3, tile * 3), axis=1)
+    return tiles > threshold
+
+
+def tile_rects(mask: np.ndarray, size: tuple, tile: int = TILE_SIZE):
+    """Changed tiles merged into rectangles (x, y, width, height) in pixels: row runs, then equal runs stacked."""
+    width, height = size
+    open_runs = {} # (first col, last col) -> [x, y, width, height]
+    rects = []
+    for row in range(mask.shape[0]):
+        runs = set()
+        cols = np.flatnonzero(mask[row])
+        if cols.size:
+            breaks = np.flatnonzero(np.diff(cols) > 1)
+            starts = np.concatenate(([cols[0]], cols[breaks + 1]))
+            ends = np.concatenate((cols[breaks], [cols[-1]]))
+            runs = set(zip(starts.tolist(), ends.tolist()))
+
+        for run in list(open_runs):
+            if run not in runs:
+                rects.append(tuple(open_runs.pop(run)))
+        y = row * tile
+        row_height = min(tile, height - y)
+        for start, end in runs:
+            if (start, end) in open_runs:
+                open_runs[(start, end)][3] += row_height
+            else:
+                x = start * tile
+                open_runs[(start, end)] = [x, y, min((end + 1) * tile, width) - x, row_height]
+    rects.extend(tuple(rect) for rect in open_runs.values())
+    return rects
+
+
+class FrameDiff:
+    """What changed between two frames of the same size, in device pixels."""
+
+    def __init__(self, size: tuple, mask: np.ndarray = None, tile: int = TILE_SIZE):
+        self.size = size
+        self.mask = mask # None means everything (first frame or new resolution)
+        self.rects = [(0, 0, *size)] if mask is None else tile_rects(mask, size, tile)
+
+
+    @property
+    def full(self):
+        return self.mask is None
+
+
+    @property
+    def changed_fraction(self):
+        if self.mask is None:
+            return 1.0
+        width, height = self.size
+        return sum(w * h for _, _, w, h in self.rects) / float(width * height)
+
+
+    def intersects(self, region: tuple):
+        """True when a changed rect overlaps region (x, y, width, height, in pixels)."""
+        rx, ry, rw, rh = region
+        return any(x < rx + rw and rx < x + w and y < ry + rh and ry < y + h for x, y, w, h in self.rects)
+
+
+class FrameDiffer:
+    """Diffs every frame against the previous one it was given."""
+
+    def __init__(self, tile: int = TILE_SIZE, threshold: int = NOISE_THRESHOLD):
+        self.tile = tile
+        self.threshold = threshold
+        self._previous = None
+        self._size = None
+
+
+    def reset(self):
+        self._previous = None
+
+
+    def update(self, pixels, size: tuple):
+        current = _as_array(pixels, size)
+        if self._previous is None or self._size != tuple(size):
+            diff = FrameDiff(tuple(size))
+        else:
+            diff = FrameDiff(tuple(size), changed_tiles(self._previous, current, self.tile, self.threshold), self.tile)
+        # Shared and mapped buffers get reused, keep a private copy to diff against
+        self._previous = current if isinstance(pixels, bytes) else current.copy()
+        self._size = tuple(size)
+        return diff
+
+
+def _screen_pixels(driver):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(driver.get_screenshot_as_png())).convert("RGB")
+    return image.tobytes(), image.size
+
+
+def wait_for_change(driver, timeout: float = 10.0, interval: float = 0.3, region: tuple = None,
+                    min_fraction: float = 0.0):
+    """
+    Polls screenshots until the screen (or region, in pixels) changes; returns the FrameDiff
+    against the screen at call time, or None on timeout.
+    """
+    baseline, baseline_size = _screen_pixels(driver)
+    previous = _as_array(baseline, baseline_size)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        pixels, size = _screen_pixels(driver)
+        if size != baseline_size:
+            return FrameDiff(size)
+        diff = FrameDiff(size, changed_tiles(previous, _as_array(pixels, size)))
+        if diff.rects and diff.changed_fraction >= min_fraction and (region is None or diff.intersects(region)):
+            return diff
+    return None
+
+
+def wait_for_stable(driver, quiet: float = 1.0, timeout: float = 15.0, interval: float = 0.3):
+    """Polls until nothing changed for `quiet` seconds (spinners, transitions); False on timeout."""
+    differ = FrameDiffer()
+    differ.update(*_screen_pixels(driver))
+    deadline = time.monotonic() + timeout
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        if differ.update(*_screen_pixels(driver)).rects:
+            quiet_since = time.monotonic()
+        elif time.monotonic() - quiet_since >= quiet:
+            return True
+    return False
@@ -0,0 +1,273 @@
+import time
+from collections import Counter
+
+from PIL import Image
+
+from .element_index import ElementIndex
+from .snapshot import Snapshot
+
+SCROLLABLE_IOS_TYPES = (
+    "XCUIElementTypeScrollView", "XCUIElementTypeTable",
+    "XCUIElementTypeCollectionView", "XCUIElementTypeWebView",
+)
+IDENTITY_ATTRIBUTES = ("resource-id", "name", "label", "text", "content-desc", "value")
+
+
+def find_scroll_container(element_index: ElementIndex):
+    """Id of the largest scrollable node, or None."""
+    best_id = None
+    best_area = 0
+    for node_id in element_index.bounded_ids():
+        element = element_index.elements[node_id]
+        scrollable = element.get("scrollable") == "true" or element.tag in SCROLLABLE_IOS_TYPES
+        _, _, width, height = element_index.bounds[node_id]
+        if scrollable and width * height > best_area:
+            best_id = node_id
+            best_area = width * height
+    return best_id
+
+
+def row_signatures(image: Image.Image, box: tuple, columns: int = 32):
+    """One quantized byte string per pixel row of the box, robust to sub-pixel noise."""
+    x1, y1, x2, y2 = box
+    strip = image.crop(box).convert("L").resize((columns, y2 - y1), Image.BILINEAR)
+    data = strip.point(lambda value: value >> 3).tobytes()
+    return [data[row * columns:(row + 1) * columns] for row in range(y2 - y1)]
+
+
+def find_scroll_offset(previous_rows: list, current_rows: list, min_votes: int = 8, max_repeats: int = 4):
+    """
+    How many pixel rows the content moved up between two frames. Every distinctive row of
+    the current frame votes for the shift that lines it up with the same row in the previous one.
+    """
+    positions = {}
+    for row, signature in enumerate(previous_rows):
+        if len(set(signature)) > 2: # flat background rows match everywhere
+            positions.setdefault(signature, []).append(row)
+
+    votes = Counter()
+    for row, signature in enumerate(current_rows):
+        matches = positions.get(signature)
+        if not matches or len(matches) > max_repeats:
+            continue
+        for previous_row in matches:
+            if previous_row > row:
+                votes[previous_row - row] += 1
+
+    if not votes:
+        return 0
+    shift, count = votes.most_common(1)[0]
+    return shift if count >= min_votes else 0
+
+
+def scroll_by(driver, container_bounds: tuple, dy: float, duration: int = 800, settle: float = 0.5):
+    """Slow swipes inside the container that move its content up by dy points (down when negative)."""
+    x, y, width, height = container_bounds
+    center_x = int(x + width / 2)
+    step_limit = height * 0.7
+    remaining = dy
+    while abs(remaining) >= 1:
+        step = max(-step_limit, min(step_limit, remaining))
+        start_y = y + height / 2 + step / 2
+        driver.swipe(center_x, int(start_y), center_x, int(start_y - step), duration)
+        remaining -= step
+        time.sleep(settle)
+
+
+class FullPageCapture:
+    """
+    A scrolled-through container stitched into one tall snapshot. Element bounds in the
+    merged index are virtual: y is measured from the top of the first frame.
+    """
+
+    def __init__(self, snapshot: Snapshot, container_bounds: tuple, frame_offsets: list, fixed_ids: set = None):
+        self.snapshot = snapshot
+        self.fixed_ids = fixed_ids or set() # merged ids that do not scroll with the container
+        self.container_bounds = container_bounds # viewport coordinates, points
+        self.frame_offsets = frame_offsets # virtual scroll offset of every frame, points
+        self.scroll_position = frame_offsets[-1] # where the device was left
+
+
+    @property
+    def element_index(self):
+        return self.snapshot.element_index
+
+
+    def scroll_delta_for(self, node_id: int, margin: float = 0.1):
+        """Points to scroll from the current position so the node sits inside the container."""
+        node_bounds = self.element_index.bounds[node_id]
+        if node_bounds is None or node_id in self.fixed_ids:
+            return 0.0
+
+        _, y, _, height = node_bounds
+        _, container_y, _, container_height = self.container_bounds
+        top = y - self.scroll_position
+        if top >= container_y and top + height <= container_y + container_height:
+            return 0.0
+
+        target = y - container_y - container_height * margin
+        target = max(0.0, min(target, self.frame_offsets[-1]))
+        return target - self.scroll_position
+
+
+    def scroll_into_view(self, driver, node_id: int):
+        delta = self.scroll_delta_for(node_id)
+        if delta:
+            scroll_by(driver, self.container_bounds, delta)
+            self.scroll_position += delta
+        return delta
+
+
+def capture_full_page(driver, max_scrolls: int = 10, swipe_ratio: float = 0.6, stop_xpath: str = None):
+    """
+    Scrolls the main scrollable container to its end (or until stop_xpath is fully on screen)
+    and stitches every frame into one capture.
+    """
+    frames = [Snapshot.capture(driver)]
+    first = frames[0]
+    container_id = find_scroll_container(first.element_index)
+    if container_id is None:
+        return FullPageCapture(first, (0, 0, first.window_size["width"], first.window_size["height"]), [0.0])
+
+    container_bounds = first.element_index.bounds[container_id]
+    scale_x = first.size[0] / first.window_size["width"]
+    scale_y = first.size[1] / first.window_size["height"]
+    cx, cy, cw, ch = container_bounds
+    box = (int(cx * scale_x), int(cy * scale_y), int((cx + cw) * scale_x), min(int((cy + ch) * scale_y), first.size[1]))
+
+    shifts = [] # pixel rows each frame moved relative to the previous one
+    previous_rows = row_signatures(first.image, box)
+    for _ in range(max_scrolls):
+        scroll_by(driver, container_bounds, ch * swipe_ratio)
+        frame = Snapshot.capture(driver)
+        rows = row_signatures(frame.image, box)
+        shift = find_scroll_offset(previous_rows, rows)
+        if shift == 0:
+            break
+        frames.append(frame)
+        shifts.append(shift)
+        previous_rows = rows
+        if stop_xpath and _fully_visible(frame.element_index, stop_xpath, container_bounds):
+            break
+
+    return _stitch(frames, shifts, container_id, box, scale_y, container_bounds)
+
+
+def _fully_visible(element_index: ElementIndex, xpath: str, container_bounds: tuple):
+    _, container_y, _, container_height = container_bounds
+    for node_id in element_index.find_xpath(xpath):
+        node_bounds = element_index.bounds[node_id]
+        if node_bounds and node_bounds[1] >= container_y and node_bounds[1] + node_bounds[3] <= container_y + container_height:
+            return True
+    return False
+
+
+def _stitch(frames: list, shifts: list, container_id: int, box: tuple, scale_y: float, container_bounds: tuple):
+    first = frames[0]
+    width, height = first.size
+    _, box_top, _, box_bottom = box
+    total_shift = sum(shifts)
+
+    canvas = Image.new("RGB", (width, height + total_shift))
+    canvas.paste(first.image.crop((0, 0, width, box_bottom)), (0, 0))
+    offsets_px = [0]
+    for frame, shift in zip(frames[1:], shifts):
+        offsets_px.append(offsets_px[-1] + shift)
+        new_rows = frame.image.crop((0, box_bottom - shift, width, box_bottom))
+        canvas.paste(new_rows, (0, offsets_px[-1] + box_bottom - shift))
+    canvas.paste(frames[-1].image.crop((0, box_bottom, width, height)), (0, offsets_px[-1] + box_bottom))
+
+    offsets = [offset / scale_y for offset in offsets_px]
+    merged, fixed_ids = _merge_indexes(frames, offsets, container_id)
+    window_size = {"width": first.window_size["width"], "height": first.window_size["height"] + offsets[-1]}
+    snapshot = Snapshot.from_image(canvas, "", window_size, first.platform, merged, first.device)
+    return FullPageCapture(snapshot, container_bounds, offsets, fixed_ids)
+
+
+def _merge_indexes(frames: list, offsets: list, container_id: int):
+    """
+    Union of the frames' trees in virtual coordinates. Nodes inside the container are
+    shifted by their frame's offset and deduplicated against earlier frames by parent,
+    tag, identity attributes and vertical overlap; nodes outside it come from the first frame.
+    """
+    tags, attribs, texts, parents, bounds = [], [], [], [], []
+    fixed_ids = set()
+    candidates = {} # (parent, tag, identity) -> merged ids
+    total_offset = offsets[-1]
+
+    for frame_number, (frame, offset) in enumerate(zip(frames, offsets)):
+        element_index = frame.element_index
+        frame_container = container_id if frame_number == 0 else find_scroll_container(element_index)
+        inside = _descendants(element_index, frame_container)
+        container_bounds = element_index.bounds[frame_container] if frame_container is not None else None
+        mapping = {}
+
+        for node_id, element in enumerate(element_index.elements):
+            is_inside = node_id in inside
+            if frame_number > 0 and not is_inside and node_id != frame_container and not _is_ancestor(element_index, node_id, frame_container):
+                continue
+
+            node_bounds = element_index.bounds[node_id]
+            if node_bounds is not None:
+                x, y, width, height = node_bounds
+                if is_inside:
+                    y += offset
+                elif node_id == frame_container or _is_ancestor(element_index, node_id, frame_container):
+                    height += total_offset
+                elif container_bounds is not None and y >= container_bounds[1] + container_bounds[3]:
+                    y += total_offset
+                node_bounds = (x, y, width, height)
+
+            parent_id = mapping.get(element_index.parents[node_id], -1)
+            key = (parent_id, element.tag, tuple(element.get(name, "") for name in IDENTITY_ATTRIBUTES))
+            merged_id = _match(candidates.get(key, []), bounds, node_bounds)
+            if merged_id is None:
+                merged_id = len(tags)
+                tags.append(element.tag)
+                attribs.append(dict(element.attrib))
+                texts.append(element.text.strip() if element.text and element.text.strip() else None)
+                parents.append(parent_id)
+                bounds.append(node_bounds)
+                candidates.setdefault(key, []).append(merged_id)
+                if not is_inside:
+                    fixed_ids.add(merged_id)
+            elif node_bounds is not None and (bounds[merged_id] is None or node_bounds[3] > bounds[merged_id][3]):
+                # Edge nodes are clipped, keep the most complete rect seen
+                bounds[merged_id] = node_bounds
+            mapping[node_id] = merged_id
+
+    return ElementIndex.from_table(tags, attribs, texts, parents, bounds), fixed_ids
+
+
+def _descendants(element_index: ElementIndex, node_id):
+    if node_id is None:
+        return set()
+    found = set()
+    stack = list(element_index.children_of(node_id))
+    while stack:
+        child_id = stack.pop()
+        found.add(child_id)
+        stack.extend(element_index.children_of(child_id))
+    return found
+
+
+def _is_ancestor(element_index: ElementIndex, node_id: int, descendant_id):
+    while descendant_id is not None and descendant_id >= 0:
+        descendant_id = element_index.parents[descendant_id]
+        if descendant_id == node_id:
+            return True
+    return False
+
+
+def _match(candidate_ids: list, bounds: list, node_bounds):
+    if node_bounds is None:
+        return candidate_ids[0] if candidate_ids else None
+    _, y, _, height = node_bounds
+    for candidate_id in candidate_ids:
+        existing = bounds[candidate_id]
+        if existing is None:
+            continue
+        overlap = min(y + height, existing[1] + existing[3]) - max(y, existing[1])
+        if overlap >= 0.5 * min(height, existing[3]):
+            return candidate_id
+    return None
@@ -0,0 +1,60 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+
+_NOTHING = object()
+
+
+class HoverCoalescer(QObject):
+    """
+    Turns a flood of mouse moves into at most one hit test per display frame. Only the
+    newest pointer position is kept, and `changed` fires only when the element under the
+    pointer is a different one.
+    """
+
+    changed = Signal(object) # whatever hit_test returned, None when nothing is under the pointer
+    flushed = Signal(int, int) # events received, events coalesced away
+
+    def __init__(self, hit_test, fps: int = 60, parent=None):
+        super().__init__(parent)
+        self._hit_test = hit_test
+        self._position = None
+        self._last_hit = _NOTHING
+        self.received = 0
+        self.processed = 0
+        self.unchanged = 0 # processed positions that landed on the same element
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(max(1, int(1000 / fps)))
+        self._timer.timeout.connect(self._flush)
+
+
+    @property
+    def coalesced(self):
+        return self.received - self.processed
+
+
+    def push(self, x: float, y: float):
+        self._position = (x, y)
+        self.received += 1
+        if not self._timer.isActive():
+            self._timer.start()
+
+
+    def reset(self):
+        """Forgets the last hit, e.g. after the element index changed under the pointer."""
+        self._last_hit = _NOTHING
+        if self._position is not None and not self._timer.isActive():
+            self._timer.start()
+
+
+    def _flush(self):
+        if self._position is None:
+            return
+        self.processed += 1
+        hit = self._hit_test(*self._position)
+        if hit == self._last_hit:
+            self.unchanged += 1
+        else:
+            self._last_hit = hit
+            self.changed.emit(hit)
+        self.flushed.emit(self.received, self.coalesced)
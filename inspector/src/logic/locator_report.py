@@ -0,0 +1,200 @@
+import re
+import csv
+import json
+from collections import Counter
+
+from .element_index import ElementIndex
+from .AppiumRecorder import generate_ios_locators, generate_android_locators
+
+REPORT_FIELDS = ("platform", "node_id", "class", "x", "y", "width", "height", "strategy", "value", "matches", "score")
+TEXT_ATTRIBUTES = ("text", "label", "value")
+
+_XPATH_STEP = re.compile(r"^([^\[/]+)(?:\[@([\w:-]+)='([^']*)'\])?$")
+_XPATH_STEPS = re.compile(r"(?:[^/\[]|\[[^\]]*\])+")
+_PREDICATE = re.compile(r"^(\w+) == '(.*)'$")
+_CLASS_CHAIN = re.compile(r"^\*\*/([^\[]+)(?:\[`(\w+) == '(.*)'`\])?$")
+_UI_SELECTOR = re.compile(r'^new UiSelector\(\)\.(resourceId|text|className)\("(.*)"\)$')
+_UI_SELECTOR_ATTRIBUTES = {"resourceId": "resource-id", "text": "text", "className": "class"}
+
+# Starting score per strategy; lookups by stable ids beat text, text beats structure
+_BASE_SCORES = {
+    "accessibility id": 95, "resource-id": 95, "-ios predicate string": 85,
+    "-ios class chain": 85, "-android uiautomator": 85, "xpath": 75,
+}
+
+
+def split_xpath(xpath: str):
+    """Steps of a //a/b/c path, ignoring slashes inside predicates such as resource ids."""
+    return _XPATH_STEPS.findall(xpath[2:] if xpath.startswith("//") else xpath)
+
+
+def find_locator(element_index: ElementIndex, strategy: str, value: str):
+    """Ids of the nodes a recorded locator selects in an index, without asking the device."""
+    if strategy == "xpath":
+        return element_index.find_xpath(value)
+    test = _locator_test(strategy, value)
+    if test is None:
+        return []
+    return [node_id for node_id, element in enumerate(element_index.elements) if test(element)]
+
+
+def _locator_test(strategy: str, value: str):
+    value = value.strip()
+    if strategy == "accessibility id":
+        return lambda element: value in (_stripped(element, "name"), _stripped(element, "content-desc"))
+    if strategy == "resource-id":
+        return lambda element: _stripped(element, "resource-id") == value
+    if strategy == "-ios predicate string":
+        match = _PREDICATE.match(value)
+        if match:
+            attribute, expected = match.groups()
+            return lambda element: _stripped(element, attribute) == expected
+    elif strategy == "-ios class chain":
+        match = _CLASS_CHAIN.match(value)
+        if match:
+            tag, attribute, expected = match.groups()
+            return lambda element: element.tag == tag and (attribute is None or _stripped(element, attribute) == expected)
+    elif strategy == "-android uiautomator":
+        match = _UI_SELECTOR.match(value)
+        if match:
+            method, expected = match.groups()
+            return lambda element: _stripped(element, _UI_SELECTOR_ATTRIBUTES[method]) == expected
+    return None
+
+
+def _stripped(element, attribute: str):
+    # The recorder strips the values it puts in locators; XPath predicates keep them as they are
+    value = element.get(attribute)
+    return value.strip() if value else value
+
+
+class MatchCounter:
+    """Counts how many nodes a generated locator selects, from attribute tallies instead of queries."""
+
+    def __init__(self, element_index: ElementIndex):
+        self._index = element_index
+        self._by_attribute = Counter() # stripped values, like the recorder's locators
+        self._by_tag_attribute = Counter()
+        self._accessibility = Counter() # iOS name or Android content-desc, once per node
+        self._anchors = {} # (tag, attribute, raw value) -> ids, attribute None for tag only
+        self._xpath_cache = {}
+        for node_id, element in enumerate(element_index.elements):
+            self._anchors.setdefault((element.tag, None, None), []).append(node_id)
+            self._by_tag_attribute[(element.tag, None, None)] += 1
+            for attribute, value in element.attrib.items():
+                self._by_attribute[(attribute, value.strip())] += 1
+                self._by_tag_attribute[(element.tag, attribute, value.strip())] += 1
+                self._anchors.setdefault((element.tag, attribute, value), []).append(node_id)
+            for value in {_stripped(element, "name"), _stripped(element, "content-desc")} - {None, ""}:
+                self._accessibility[value] += 1
+
+
+    def count(self, strategy: str, value: str):
+        value = value.strip()
+        if strategy == "accessibility id":
+            return self._accessibility[value]
+        if strategy == "resource-id":
+            return self._by_attribute[("resource-id", value)]
+        if strategy == "-ios predicate string":
+            match = _PREDICATE.match(value)
+            return self._by_attribute[match.groups()] if match else None
+        if strategy == "-ios class chain":
+            match = _CLASS_CHAIN.match(value)
+            return self._by_tag_attribute[match.groups()] if match else None
+        if strategy == "-android uiautomator":
+            match = _UI_SELECTOR.match(value)
+            if not match:
+                return None
+            method, argument = match.groups()
+            return self._by_attribute[(_UI_SELECTOR_ATTRIBUTES[method], argument)]
+        if strategy == "xpath":
+            return self._count_xpath(value)
+        return None
+
+
+    def _count_xpath(self, xpath: str):
+        if xpath in self._xpath_cache:
+            return self._xpath_cache[xpath]
+
+        # Builder shape: //Anchor[@attr='value']/Child/Child; anything else goes to lxml
+        steps = split_xpath(xpath) if xpath.startswith("//") else None
+        parsed = [_XPATH_STEP.match(step) for step in steps] if steps else None
+        if not parsed or not all(parsed) or any(step.group(2) for step in parsed[1:]):
+            count = len(self._index.find_xpath(xpath))
+        else:
+            nodes = self._anchors.get(parsed[0].groups(), [])
+            for step in parsed[1:]:
+                tag = step.group(1)
+                nodes = [
+                    child_id for node_id in nodes for child_id in self._index.children_of(node_id)
+                    if self._index.elements[child_id].tag == tag
+                ]
+            count = len(nodes)
+        self._xpath_cache[xpath] = count
+        return count
+
+
+def score_locator(strategy: str, value: str, matches):
+    """0-100 robustness estimate: uniqueness first, then how brittle the selector is."""
+    if not matches:
+        return 0
+    score = _BASE_SCORES.get(strategy, 50)
+
+    if strategy == "xpath":
+        steps = split_xpath(value)
+        anchor = _XPATH_STEP.match(steps[0])
+        if not anchor or not anchor.group(2):
+            score -= 30 # no anchor at all: pure structure
+        elif anchor.group(2) in TEXT_ATTRIBUTES:
+            score -= 15
+        score -= 10 * (len(steps) - 1) # every index-only hop breaks on layout changes
+    elif any(f"{attribute} ==" in value or f'.{attribute}(' in value for attribute in TEXT_ATTRIBUTES):
+        score -= 15 # visible text changes with copy and locale
+    elif "className(" in value or (strategy == "-ios class chain" and "==" not in value):
+        score -= 40
+
+    if matches > 1:
+        score = score * 0.4 / matches ** 0.5
+    return max(0, min(100, round(score)))
+
+
+def build_locator_report(element_index: ElementIndex, platform: str, locators: list = None):
+    """Every locator strategy for every bounded node, with match counts and robustness scores."""
+    if locators is None:
+        generate = generate_ios_locators if platform == "iOS" else generate_android_locators
+        locators = [None] * len(element_index)
+        for node_id in element_index.bounded_ids():
+            locators[node_id] = generate(element_index.elements[node_id])
+
+    counter = MatchCounter(element_index)
+    rows = []
+    for node_id in element_index.bounded_ids():
+        element = element_index.elements[node_id]
+        x, y, width, height = element_index.bounds[node_id]
+        for strategy, value in (locators[node_id] or {}).items():
+            if not value:
+                continue
+            matches = counter.count(strategy, value)
+            rows.append({
+                "platform": platform,
+                "node_id": node_id,
+                "class": element.get("class") or element.tag,
+                "x": x, "y": y, "width": width, "height": height,
+                "strategy": strategy,
+                "value": value,
+                "matches": matches,
+                "score": score_locator(strategy, value, matches),
+            })
+    return rows
+
+
+def write_report(rows: list, output_path: str):
+    """CSV when the path ends in .csv, JSON otherwise."""
+    if output_path.endswith(".csv"):
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
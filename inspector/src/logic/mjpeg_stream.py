@@ -0,0 +1,239 @@
+import io
+import threading
+import urllib.request
+from urllib.parse import urlparse
+
+from PIL import Image, ImageChops, ImageStat
+
+_SOI = b"\xff\xd8"
+_EOI = b"\xff\xd9"
+
+
+def mjpeg_url_from_capabilities(capabilities: dict, server_url: str = "http://localhost:4723"):
+    """
+    Resolves the MJPEG screenshot stream of a session. `mjpegScreenshotUrl` wins,
+    otherwise `mjpegServerPort` is assumed to be forwarded to the Appium host.
+    """
+    def cap(name):
+        return capabilities.get(f"appium:{name}", capabilities.get(name))
+
+    url = cap("mjpegScreenshotUrl")
+    if url:
+        return url
+
+    port = cap("mjpegServerPort")
+    if not port:
+        return None
+    host = urlparse(server_url).hostname or "localhost"
+    return f"http://{host}:{port}"
+
+
+class MjpegStream:
+    """
+    Reads a multipart MJPEG stream on one thread and decodes frames on another.
+    Only the newest undecoded frame is kept, so a slow consumer drops stale frames
+    instead of queueing them.
+    """
+
+    def __init__(self, url: str, timeout: float = 10.0, chunk_size: int = 64 * 1024):
+        self.url = url
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        self.frames_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.error = None
+
+        self._lock = threading.Condition()
+        self._pending = None # newest raw JPEG not yet decoded
+        self._latest = None # (sequence, PIL image)
+        self._consumed_seq = 0
+        self._running = False
+        self._response = None
+        self._threads = []
+
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self.error = None
+        self._threads = [
+            threading.Thread(target=self._read_loop, name="mjpeg-reader", daemon=True),
+            threading.Thread(target=self._decode_loop, name="mjpeg-decoder", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=self.timeout)
+        self._threads = []
+
+
+    @property
+    def running(self):
+        return self._running
+
+
+    def latest_frame(self):
+        """Newest decoded frame not yet returned, or None."""
+        with self._lock:
+            if self._latest is None or self._latest[0] == self._consumed_seq:
+                return None
+            self._consumed_seq = self._latest[0]
+            return self._latest[1]
+
+
+    def _read_loop(self):
+        try:
+            self._response = urllib.request.urlopen(self.url, timeout=self.timeout)
+            for frame in self._iter_jpeg_frames(self._response):
+                if not self._running:
+                    break
+                with self._lock:
+                    if self._pending is not None:
+                        self.frames_dropped += 1
+                    self._pending = frame
+                    self.frames_received += 1
+                    self._lock.notify_all()
+        except Exception as e:
+            if self._running:
+                self.error = e
+        finally:
+            with self._lock:
+                self._running = False
+                self._lock.notify_all()
+
+
+    def _iter_jpeg_frames(self, response):
+        read = response.read1 if hasattr(response, "read1") else response.read
+        chunks = iter(lambda: read(self.chunk_size) if self._running else b"", b"")
+        boundary = response.headers.get_param("boundary") if hasattr(response, "headers") else None
+        if boundary:
+            return iter_multipart_frames(chunks, boundary)
+        return iter_marker_frames(chunks)
+
+
+    def _decode_loop(self):
+        sequence = 0
+        while True:
+            with self._lock:
+                while self._running and self._pending is None:
+                    self._lock.wait()
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+
+            try:
+                image = Image.open(io.BytesIO(frame)).convert("RGB")
+            except Exception:
+                continue
+
+            sequence += 1
+            with self._lock:
+                if self._latest is not None and self._latest[0] != self._consumed_seq:
+                    self.frames_dropped += 1
+                self._latest = (sequence, image)
+                self.frames_decoded += 1
+
+
+def iter_multipart_frames(chunks, boundary: str):
+    """
+    Bodies of a multipart/x-mixed-replace stream. A part is cut at its Content-Length when
+    it has one, else at the next delimiter, so JPEGs carrying an embedded thumbnail (a
+    second SOI/EOI pair in their EXIF) stay whole. WDA and uiautomator2 disagree on
+    whether the announced boundary already has the leading dashes; both are accepted.
+    """
+    delimiter = b"--" + boundary.strip('"').lstrip("-").encode("latin-1")
+    buffer = bytearray()
+    chunks = iter(chunks)
+
+    def fill():
+        chunk = next(chunks, b"")
+        if not chunk:
+            return False
+        buffer.extend(chunk)
+        return True
+
+    while True:
+        start = buffer.find(delimiter)
+        while start < 0:
+            del buffer[:max(0, len(buffer) - len(delimiter))]
+            if not fill():
+                return
+            start = buffer.find(delimiter)
+        header_end = buffer.find(b"\r\n\r\n", start)
+        while header_end < 0:
+            if not fill():
+                return
+            header_end = buffer.find(b"\r\n\r\n", start)
+
+        headers = {}
+        for line in bytes(buffer[start + len(delimiter):header_end]).split(b"\r\n"):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body_start = header_end + 4
+
+        length = headers.get("content-length")
+        if length and length.isdigit():
+            body_end = body_start + int(length)
+            while len(buffer) < body_end:
+                if not fill():
+                    return
+            next_start = body_end
+        else:
+            body_end = buffer.find(delimiter, body_start)
+            while body_end < 0:
+                if not fill():
+                    # Stream ended without a closing delimiter: the last part is complete
+                    body_end = len(buffer)
+                    break
+                body_end = buffer.find(delimiter, body_start)
+            next_start = body_end
+            while body_end > body_start and buffer[body_end - 1] in b"\r\n":
+                body_end -= 1
+
+        frame = bytes(buffer[body_start:body_end])
+        del buffer[:next_start]
+        if frame:
+            yield frame
+
+
+def iter_marker_frames(chunks):
+    """JPEGs cut on start/end markers, for streams that announce no multipart boundary."""
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            start = buffer.find(_SOI)
+            if start < 0:
+                buffer = buffer[-1:]
+                break
+            end = buffer.find(_EOI, start + 2)
+            if end < 0:
+                buffer = buffer[start:]
+                break
+            yield buffer[start:end + 2]
+            buffer = buffer[end + 2:]
+
+
+def frames_differ(previous: Image.Image, current: Image.Image, threshold: float = 3.0, sample_size=(48, 96)):
+    """Cheap meaningful-change test: mean absolute difference of small grayscale thumbnails."""
+    if previous is None or current is None:
+        return True
+    a = previous.convert("L").resize(sample_size, Image.BILINEAR)
+    b = current.convert("L").resize(sample_size, Image.BILINEAR)
+    return ImageStat.Stat(ImageChops.difference(a, b)).mean[0] > threshold
@@ -0,0 +1,180 @@
+import re
+import json
+import zlib
+
+import numpy as np
+
+from .element_index import ElementIndex
+
+NUM_PERM = 64
+BANDS = 16 # 4 rows per band: screens above ~0.7 similarity almost always share a bucket
+DEFAULT_THRESHOLD = 0.8
+MAX_REPEATS = 4 # list rows repeat their tokens; past a few copies the count is content, not layout
+MAX_TEXT_LENGTH = 40
+
+IDENTITY_ATTRIBUTES = ("resource-id", "name", "label", "content-desc")
+_PRIME = 4294967291 # largest prime below 2**32, keeps every permuted hash in uint32
+_DIGITS = re.compile(r"\d+")
+
+# AppiumRecorder record keys per platform: (locators, screen the click happened on)
+RECORD_SCREEN_KEYS = {"iOS": ("iOS_ids", "iOS_screen"), "Android": ("android_ids", "android_screen")}
+
+_rng = np.random.default_rng(0x5C4EE7)
+_A = _rng.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+
+def screen_tokens(element_index: ElementIndex):
+    """
+    Bag of structural tokens of a hierarchy: tag, tag+id and tag+text per node, with digits
+    folded so clocks and counters do not make a new screen. Repeats are numbered (capped)
+    so the bag keeps some of the layout's multiplicity.
+    """
+    counts = {}
+    for element in element_index.elements:
+        tag = element.tag
+        tokens = [tag]
+        for attribute in IDENTITY_ATTRIBUTES:
+            value = element.get(attribute)
+            if value:
+                tokens.append(f"{tag}@{attribute}={value}")
+        text = element.get("text") or element.get("value")
+        if text and len(text) <= MAX_TEXT_LENGTH:
+            tokens.append(f"{tag}~{_DIGITS.sub('#', text.strip().lower())}")
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+    return [f"{token}:{n}" for token, count in counts.items() for n in range(min(count, MAX_REPEATS))]
+
+
+def minhash(tokens: list):
+    """NUM_PERM-wide MinHash signature (uint32) of a token bag."""
+    if not tokens:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(token.encode("utf-8")) for token in tokens), dtype=np.uint64, count=len(tokens))
+    permuted = (hashes[:, None] * _A + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def fingerprint(element_index: ElementIndex):
+    return minhash(screen_tokens(element_index))
+
+
+def similarity(first: np.ndarray, second: np.ndarray):
+    """Estimated Jaccard similarity of the two token bags."""
+    return float(np.count_nonzero(first == second)) / NUM_PERM
+
+
+def to_hex(signature: np.ndarray):
+    return signature.astype(">u4").tobytes().hex()
+
+
+def from_hex(text: str):
+    return np.frombuffer(bytes.fromhex(text), dtype=">u4").astype(np.uint32)
+
+
+class ScreenIndex:
+    """
+    Known screens of one platform, looked up by fingerprint through LSH buckets. Each
+    screen remembers the recording steps seen on it and, per element xpath, the compiled
+    locator and bounds that worked there, so replay can skip straight to them.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.screens = [] # screen id -> {"signature", "steps", "elements"}
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self._buckets = {} # (band, band bytes) -> [screen id]
+
+
+    def __len__(self):
+        return len(self.screens)
+
+
+    def match(self, signature: np.ndarray):
+        """(screen id, similarity) of the closest known screen above threshold, or (None, best similarity)."""
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates.update(self._buckets.get(key, ()))
+        if not candidates:
+            return None, 0.0
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        scores = np.count_nonzero(self._signatures[ids] == signature, axis=1) / NUM_PERM
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None, float(scores[best])
+        return int(ids[best]), float(scores[best])
+
+
+    def add(self, signature: np.ndarray):
+        """Id of the matching screen, or of a new one for this signature."""
+        screen_id, _ = self.match(signature)
+        if screen_id is not None:
+            return screen_id
+        screen_id = len(self.screens)
+        self.screens.append({"signature": signature, "steps": [], "elements": {}})
+        self._signatures = np.vstack([self._signatures, signature[None, :]])
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(screen_id)
+        return screen_id
+
+
+    def learn(self, signature: np.ndarray, xpath: str, locator: dict = None, bounds=None, step: int = None):
+        """Remembers what was clicked on this screen; returns the screen id."""
+        screen_id = self.add(signature)
+        screen = self.screens[screen_id]
+        if step is not None and step not in screen["steps"]:
+            screen["steps"].append(step)
+        cached = screen["elements"].setdefault(xpath, {})
+        if locator is not None:
+            cached["locator"] = locator
+        if bounds is not None:
+            cached["bounds"] = [float(value) for value in bounds]
+        return screen_id
+
+
+    def cached_element(self, screen_id: int, xpath: str):
+        """{"locator", "bounds"} remembered for xpath on that screen, or None."""
+        if screen_id is None:
+            return None
+        return self.screens[screen_id]["elements"].get(xpath)
+
+
+    @classmethod
+    def from_recording(cls, records: list, platform: str, threshold: float = DEFAULT_THRESHOLD):
+        """Index of every screen an AppiumRecorder recording clicked on (steps recorded with a screen)."""
+        ids_key, screen_key = RECORD_SCREEN_KEYS[platform]
+        index = cls(threshold)
+        for step, record in enumerate(records):
+            screen = record.get(screen_key)
+            if not screen:
+                continue
+            locators = record.get(ids_key) or {}
+            index.learn(
+                from_hex(screen["signature"]), locators.get("xpath", ""), screen.get("locator"),
+                screen.get("bounds"), record.get("stepNumber", step + 1),
+            )
+        return index
+
+
+    def save(self, path: str):
+        screens = [{**screen, "signature": to_hex(screen["signature"])} for screen in self.screens]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "screens": screens}, f, indent=2, ensure_ascii=False)
+
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(data.get("threshold", DEFAULT_THRESHOLD))
+        for screen in data["screens"]:
+            screen_id = index.add(from_hex(screen["signature"]))
+            index.screens[screen_id]["steps"].extend(screen["steps"])
+            index.screens[screen_id]["elements"].update(screen["elements"])
+        return index
+
+
+    def _band_keys(self, signature: np.ndarray):
+        rows = NUM_PERM // BANDS
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
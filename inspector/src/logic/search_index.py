@@ -0,0 +1,124 @@
+import re
+from bisect import bisect_left
+
+from .element_index import ElementIndex
+
+SEARCH_ATTRIBUTES = ("text", "resource-id", "name", "label", "value", "content-desc", "class", "type")
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(value: str):
+    """Lowercase alphanumeric runs; `brand_card` and `brandCard` both give `brand` + `card`."""
+    value = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", value)
+    return _TOKEN.findall(value.lower())
+
+
+class SearchIndex:
+    """
+    Inverted index over one snapshot, built once. Plain terms match token prefixes,
+    `*term` matches anywhere inside a value and `attr:term` restricts either form
+    to one attribute (e.g. `resource-id:brand_card`); any other `a:b` is searched whole,
+    so pasted ids like `com.shop:id/title` work. Terms are ANDed.
+    """
+
+    def __init__(self, element_index: ElementIndex):
+        self._postings = {} # (attribute, token) -> set(ids)
+        self._values = {} # (attribute, lowercase value) -> set(ids)
+        self._grams = None # trigram -> set of (attribute, lowercase value), built on first substring query
+        self._tokens = [] # sorted (token, attribute) for prefix scans
+
+        tokens = set()
+        for node_id, element in enumerate(element_index.elements):
+            attrib = element.attrib
+            fields = [(name, attrib.get(name)) for name in SEARCH_ATTRIBUTES]
+            fields.append(("tag", element.tag))
+            if element.text and element.text.strip():
+                fields.append(("text", element.text.strip()))
+
+            for attribute, value in fields:
+                if not value:
+                    continue
+                tokens_of_value = tokenize(value) # before lowercasing, camelCase needs the capitals
+                value = value.lower()
+                self._values.setdefault((attribute, value), set()).add(node_id)
+                for token in tokens_of_value + [value]:
+                    self._postings.setdefault((attribute, token), set()).add(node_id)
+                    tokens.add((token, attribute))
+
+        self._tokens = sorted(tokens)
+
+
+    def search(self, query: str):
+        """Sorted ids of the nodes matching every term of the query."""
+        result = None
+        for term in query.split():
+            attribute = None
+            if ":" in term and not term.startswith("*"):
+                # Only known attributes qualify; `com.shop:id/brand_card` is a whole resource id
+                qualifier, rest = term.split(":", 1)
+                if qualifier in SEARCH_ATTRIBUTES or qualifier == "tag":
+                    attribute, term = qualifier, rest
+            ids = self._match(attribute, term.lower())
+            result = ids if result is None else result & ids
+            if not result:
+                return []
+        return sorted(result or ())
+
+
+    def _match(self, attribute, term: str):
+        if term.startswith("*"):
+            return self._substring(attribute, term.lstrip("*"))
+        return self._prefix(attribute, term)
+
+
+    def _prefix(self, attribute, term: str):
+        # Falls back to `brand` AND `card` for `brand_card`, so ids need not be typed whole
+        ids = self._token_prefix(attribute, term)
+        parts = tokenize(term)
+        if not ids and len(parts) > 1:
+            part_ids = None
+            for part in parts:
+                matches = self._token_prefix(attribute, part)
+                part_ids = matches if part_ids is None else part_ids & matches
+            ids |= part_ids
+        return ids
+
+
+    def _token_prefix(self, attribute, term: str):
+        ids = set()
+        if not term:
+            return ids
+        position = bisect_left(self._tokens, (term, ""))
+        while position < len(self._tokens) and self._tokens[position][0].startswith(term):
+            token, token_attribute = self._tokens[position]
+            if attribute is None or token_attribute == attribute:
+                ids |= self._postings[(token_attribute, token)]
+            position += 1
+        return ids
+
+
+    def _substring(self, attribute, term: str):
+        if not term:
+            return set()
+        if self._grams is None:
+            self._grams = {}
+            for value_attribute, value in self._values:
+                for start in range(max(len(value) - 2, 1)):
+                    self._grams.setdefault(value[start:start + 3], set()).add((value_attribute, value))
+
+        if len(term) < 3:
+            candidates = self._values.keys()
+        else:
+            # Values holding every trigram of the term, then a real containment check
+            candidates = None
+            for start in range(len(term) - 2):
+                values = self._grams.get(term[start:start + 3], set())
+                candidates = values if candidates is None else candidates & values
+                if not candidates:
+                    return set()
+
+        ids = set()
+        for value_attribute, value in candidates:
+            if (attribute is None or value_attribute == attribute) and term in value:
+                ids |= self._values[(value_attribute, value)]
+        return ids
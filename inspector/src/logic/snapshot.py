@@ -0,0 +1,152 @@
+import io
+import base64
+import hashlib
+
+from .element_index import ElementIndex
+from .AppiumRecorder import generate_ios_locators, generate_android_locators
+
+
+def platform_of(capabilities: dict):
+    name = capabilities.get("platformName", capabilities.get("appium:platformName", ""))
+    return "iOS" if str(name).lower() == "ios" else "Android"
+
+
+def device_of(capabilities: dict):
+    """udid, else device name of a session; None when the capabilities carry neither."""
+    for name in ("udid", "deviceName"):
+        value = capabilities.get(name, capabilities.get(f"appium:{name}"))
+        if value:
+            return str(value)
+    return None
+
+
+class Snapshot:
+    """One capture of a device: decoded screenshot pixels, page source and the derived element index."""
+
+    def __init__(self, pixels, size: tuple, page_source: str, window_size: dict, platform: str,
+                 element_index: ElementIndex = None, key: str = None, locators: list = None, device: str = None):
+        self._pixels = pixels # packed RGB rows, bytes or memoryview
+        self.size = size # (width, height) in device pixels
+        self.page_source = page_source
+        self.window_size = window_size
+        self.platform = platform
+        self.device = device # udid or device name, None when unknown (recordings, old stores)
+        self.screenshot = None # PNG as returned by the device, when captured live
+        self._element_index = element_index
+        self._key = key
+        self._locators = locators
+        self._image = None
+
+
+    @classmethod
+    def capture(cls, driver):
+        png = driver.get_screenshot_as_png()
+        profile = getattr(driver, "source_profile", None)
+        if profile is None:
+            page_source, element_index = driver.page_source, None
+        else:
+            page_source, element_index = profile.fetch(driver)
+        window_size = driver.get_window_size()
+        capabilities = driver.capabilities
+        return cls.from_png(png, page_source, window_size, platform_of(capabilities), element_index, device_of(capabilities))
+
+
+    @classmethod
+    def from_png(cls, png: bytes, page_source: str, window_size: dict, platform: str,
+                 element_index: ElementIndex = None, device: str = None):
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(png)).convert("RGB")
+        snapshot = cls.from_image(image, page_source, window_size, platform, element_index, device)
+        snapshot.screenshot = png
+        return snapshot
+
+
+    @classmethod
+    def from_image(cls, image, page_source: str, window_size: dict, platform: str,
+                   element_index: ElementIndex = None, device: str = None):
+        snapshot = cls(None, image.size, page_source, window_size, platform, element_index, device=device)
+        snapshot._image = image
+        return snapshot
+
+
+    @property
+    def pixels(self):
+        if self._pixels is None:
+            self._pixels = self._image.tobytes()
+        return self._pixels
+
+
+    @property
+    def dpr(self):
+        return self.size[0] / self.window_size["width"]
+
+
+    @property
+    def key(self):
+        """Content hash of pixels and page source."""
+        if self._key is None:
+            digest = hashlib.sha256()
+            digest.update(f"{self.size[0]}x{self.size[1]}".encode())
+            digest.update(self.pixels)
+            digest.update(self.page_source.encode("utf-8"))
+            self._key = digest.hexdigest()
+        return self._key
+
+
+    @property
+    def image(self):
+        if self._image is None:
+            from PIL import Image
+
+            self._image = Image.frombuffer("RGB", self.size, self.pixels, "raw", "RGB", 0, 1)
+        return self._image
+
+
+    @property
+    def element_index(self):
+        if self._element_index is None:
+            self._element_index = ElementIndex.from_page_source(self.page_source)
+        return self._element_index
+
+
+    @property
+    def locators(self):
+        """Locator dict per node id, as AppiumRecorder would record it."""
+        if self._locators is None:
+            generate = generate_ios_locators if self.platform == "iOS" else generate_android_locators
+            self._locators = [generate(element) for element in self.element_index.elements]
+        return self._locators
+
+
+def snapshots_from_recording(records: list):
+    """
+    Offline view of an AppiumRecorder recording: one snapshot per step and platform,
+    showing the recorded element crop as a single element carrying its locators.
+    """
+    from PIL import Image
+
+    snapshots = {"iOS": [], "Android": []}
+    for record in records:
+        for platform, ids_key, img_key, id_attr in (
+            ("iOS", "iOS_ids", "iOS_img_base64", "name"),
+            ("Android", "android_ids", "android_img_base64", "resource-id"),
+        ):
+            image_b64 = record.get(img_key)
+            if not image_b64:
+                continue
+            png = base64.b64decode(image_b64)
+            image = Image.open(io.BytesIO(png)).convert("RGB")
+            locators = record.get(ids_key) or {}
+            xpath = locators.get("xpath") or ""
+            tag = xpath.rsplit("/", 1)[-1].split("[", 1)[0] or "element"
+            attrib = {id_attr: locators.get("accessibility id") or locators.get("resource-id") or ""}
+
+            element_index = ElementIndex.from_table([tag], [attrib], [None], [-1], [(0.0, 0.0, *map(float, image.size))])
+            snapshot = Snapshot.from_image(
+                image, "", {"width": image.width, "height": image.height}, platform, element_index
+            )
+            snapshot.screenshot = png
+            snapshot._locators = [locators]
+            snapshots[platform].append(snapshot)
+    return snapshots
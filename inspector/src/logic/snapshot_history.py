@@ -0,0 +1,231 @@
+import json
+import zlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .element_index import ElementIndex
+from .snapshot import Snapshot
+from .snapshot_store import SnapshotStore
+
+
+class _Entry:
+    def __init__(self, snapshot: Snapshot):
+        self.key = snapshot.key
+        self.size = snapshot.size
+        self.window_size = snapshot.window_size
+        self.platform = snapshot.platform
+        self.device = snapshot.device
+        self.snapshot = snapshot # until compressed
+        self.frame = None # zlib RGB pixels
+        self.table = None # zlib JSON element table
+        self.stored = False # evicted to the store
+        self.dropped = False # evicted with nowhere to go; its position stays, empty
+
+
+    @property
+    def nbytes(self):
+        if self.snapshot is not None:
+            return self.size[0] * self.size[1] * 3 # raw pixels until compressed
+        return len(self.frame or b"") + len(self.table or b"")
+
+
+class SnapshotHistory:
+    """
+    Timeline of the snapshots a panel has shown, held under a memory budget. Frames are
+    kept zlib-compressed with the element table instead of PNG, PIL image and lxml tree;
+    past the budget the least recently viewed ones are evicted to the store (or dropped
+    when there is none). Compression runs off the GUI thread, unless frames waiting for it
+    already exceed the budget: then append compresses them itself before returning.
+
+    Positions never shift: a dropped snapshot leaves a gap, and past max_entries the oldest
+    positions fall off the front, so first_position grows instead.
+    """
+
+    def __init__(self, capacity_bytes: int = 64 * 1024 * 1024, store: SnapshotStore = None, max_entries: int = 1000):
+        self.capacity_bytes = capacity_bytes
+        self.max_entries = max_entries
+        self._store = store
+        self._entries = deque()
+        self._base = 0 # position of self._entries[0]
+        self._resident = OrderedDict() # compressed entry -> None, least recently viewed first
+        self._memory = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+
+
+    def __len__(self):
+        """Snapshots that can still be shown."""
+        with self._lock:
+            return sum(1 for entry in self._entries if not entry.dropped)
+
+
+    def __contains__(self, position: int):
+        with self._lock:
+            entry = self._entry_at(position)
+            return entry is not None and not entry.dropped
+
+
+    @property
+    def first_position(self):
+        return self._base
+
+
+    @property
+    def last_position(self):
+        """Newest position; first_position - 1 while empty."""
+        return self._base + len(self._entries) - 1
+
+
+    @property
+    def memory_bytes(self):
+        return self._memory
+
+
+    def append(self, snapshot: Snapshot):
+        """Position of the snapshot in the timeline; an unchanged screen is not added twice."""
+        forgotten = []
+        with self._lock:
+            if self._entries and not self._entries[-1].dropped and self._entries[-1].key == snapshot.key:
+                return self.last_position
+            entry = _Entry(snapshot)
+            self._entries.append(entry)
+            self._memory += entry.nbytes
+            while len(self._entries) > self.max_entries:
+                forgotten.append(self._drop(self._entries[0]))
+                self._trim()
+            position = self.last_position
+            backlog = []
+            if self._memory > self.capacity_bytes:
+                backlog = [pending for pending in self._entries if pending.snapshot is not None]
+        self._forget(forgotten)
+        # A raw frame weighs megabytes: when the worker falls behind, compress (and evict) here,
+        # oldest first, rather than let queued frames pile up past the budget
+        for pending in backlog:
+            if self._memory <= self.capacity_bytes:
+                break
+            self._compress(pending)
+        self._executor.submit(self._compress, entry)
+        return position
+
+
+    def get(self, position: int):
+        """Snapshot at position; KeyError once it was dropped or fell off the front."""
+        with self._lock:
+            entry = self._entry_at(position)
+            if entry is None or entry.dropped:
+                raise KeyError(f"Snapshot {position} is no longer in the history")
+            if entry.snapshot is not None:
+                return entry.snapshot
+            if entry.stored:
+                return self._store.load(entry.key)
+            if entry in self._resident:
+                self._resident.move_to_end(entry)
+            frame, table = entry.frame, entry.table
+        return self._decode(entry, frame, table)
+
+
+    def nearest(self, position: int):
+        """Closest position that can still be shown (the newer one on ties), or None."""
+        with self._lock:
+            available = [self._base + offset for offset, entry in enumerate(self._entries) if not entry.dropped]
+        if not available:
+            return None
+        return min(available, key=lambda candidate: (abs(candidate - position), -candidate))
+
+
+    def close(self):
+        """Stops compressing and removes what this timeline evicted to the store."""
+        self._executor.shutdown(wait=False)
+        with self._lock:
+            forgotten = [self._drop(entry) for entry in self._entries]
+            self._entries.clear()
+        self._forget(forgotten)
+
+
+    def _entry_at(self, position: int):
+        offset = position - self._base
+        if 0 <= offset < len(self._entries):
+            return self._entries[offset]
+        return None
+
+
+    def _drop(self, entry: _Entry):
+        """Empties entry (lock held); returns its key when the store holds a copy to remove."""
+        if entry in self._resident:
+            del self._resident[entry]
+            self._memory -= entry.nbytes
+        elif entry.snapshot is not None:
+            self._memory -= entry.nbytes # still queued; _compress skips dropped entries
+        stored = entry.stored
+        entry.dropped = True
+        entry.stored = False
+        entry.snapshot = entry.frame = entry.table = None
+        return entry.key if stored else None
+
+
+    def _trim(self):
+        while self._entries and self._entries[0].dropped:
+            self._entries.popleft()
+            self._base += 1
+
+
+    def _forget(self, keys: list):
+        if self._store is None:
+            return
+        with self._lock:
+            # The store is content-addressed: an identical screen later in the timeline shares the file
+            shared = {entry.key for entry in self._entries if entry.stored}
+        for key in keys:
+            if key is not None and key not in shared:
+                self._store.delete(key)
+
+
+    def _compress(self, entry: _Entry):
+        with self._lock:
+            snapshot = entry.snapshot
+        if snapshot is None:
+            return
+        element_index = snapshot.element_index
+        table = [*element_index.to_table(), element_index.parents, element_index.bounds]
+        frame = zlib.compress(snapshot.pixels, 1)
+        table = zlib.compress(json.dumps(table, ensure_ascii=False).encode("utf-8"), 6)
+
+        evicted = []
+        with self._lock:
+            if entry.dropped or entry.snapshot is None: # append and the worker can race for it
+                return
+            self._memory -= entry.nbytes
+            entry.frame, entry.table = frame, table
+            entry.snapshot = None
+            self._resident[entry] = None
+            self._memory += entry.nbytes
+            while self._memory > self.capacity_bytes and len(self._resident) > 1:
+                old = next(iter(self._resident))
+                if self._store is None:
+                    self._drop(old)
+                else:
+                    del self._resident[old]
+                    self._memory -= old.nbytes
+                    evicted.append(old)
+            self._trim()
+
+        for old in evicted:
+            # Rebuilt outside the lock; get() keeps serving it from memory until stored
+            self._store.save(self._decode(old, old.frame, old.table))
+            with self._lock:
+                if not old.dropped:
+                    old.stored = True
+                    old.frame = old.table = None
+                    continue
+            self._forget([old.key])
+
+
+    def _decode(self, entry: _Entry, frame: bytes, table: bytes):
+        tags, attribs, texts, parents, bounds = json.loads(zlib.decompress(table))
+        bounds = [tuple(node_bounds) if node_bounds else None for node_bounds in bounds]
+        element_index = ElementIndex.from_table(tags, attribs, texts, parents, bounds)
+        return Snapshot(
+            zlib.decompress(frame), entry.size, "", entry.window_size, entry.platform, element_index,
+            key=entry.key, device=entry.device
+        )
@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import mmap
+import zlib
+import math
+import struct
+from array import array
+
+from .element_index import ElementIndex
+from .snapshot import Snapshot
+
+_MAGIC = b"BRGSNAP\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sII") # magic, version, section count
+_SECTION = struct.Struct("<QQ") # offset, length
+_SECTIONS = ("meta", "bounds", "parents", "table", "source", "pixels")
+_ALIGN = 64
+_EXTENSION = ".snap"
+
+
+def _little_endian(values: array):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class SnapshotStore:
+    """
+    Content-addressed directory of snapshots. Each file is a header, a section table
+    and the sections below; the pixel section is raw RGB so reopening is an mmap:
+
+        meta     JSON: size, window size, platform, device, node count
+        bounds   float32 x, y, width, height per node (NaN when the node has none)
+        parents  int32 parent id per node (-1 for the root)
+        table    zlib JSON: tags, attribs, texts and derived locators per node
+        source   zlib page source
+        pixels   packed RGB rows
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+
+    def path(self, key: str):
+        return os.path.join(self.root_dir, key[:2], key + _EXTENSION)
+
+
+    def __contains__(self, key: str):
+        return os.path.exists(self.path(key))
+
+
+    def keys(self):
+        """Stored keys, oldest capture first."""
+        paths = []
+        for prefix in os.listdir(self.root_dir):
+            directory = os.path.join(self.root_dir, prefix)
+            if os.path.isdir(directory):
+                paths.extend(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(_EXTENSION))
+        paths.sort(key=os.path.getmtime)
+        return [os.path.basename(path)[:-len(_EXTENSION)] for path in paths]
+
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+    def prune(self, max_bytes: int):
+        """Deletes the oldest snapshots until the directory holds at most max_bytes; returns how many."""
+        sizes = [(key, os.path.getsize(self.path(key))) for key in self.keys()]
+        total = sum(size for _, size in sizes)
+        deleted = 0
+        for key, size in sizes:
+            if total <= max_bytes:
+                break
+            self.delete(key)
+            total -= size
+            deleted += 1
+        return deleted
+
+
+    def save(self, snapshot: Snapshot):
+        key = snapshot.key
+        path = self.path(key)
+        if os.path.exists(path):
+            return key
+
+        element_index = snapshot.element_index
+        tags, attribs, texts = element_index.to_table()
+        bounds = array("f")
+        for node_bounds in element_index.bounds:
+            bounds.extend(node_bounds if node_bounds is not None else (math.nan,) * 4)
+
+        meta = {
+            "key": key,
+            "size": list(snapshot.size),
+            "window_size": snapshot.window_size,
+            "platform": snapshot.platform,
+            "device": snapshot.device,
+            "node_count": len(element_index),
+        }
+        table = {"tags": tags, "attribs": attribs, "texts": texts, "locators": snapshot.locators}
+        payloads = {
+            "meta": json.dumps(meta).encode("utf-8"),
+            "bounds": _little_endian(bounds).tobytes(),
+            "parents": _little_endian(array("i", element_index.parents)).tobytes(),
+            "table": zlib.compress(json.dumps(table, ensure_ascii=False).encode("utf-8"), 6),
+            "source": zlib.compress(snapshot.page_source.encode("utf-8"), 6),
+            "pixels": snapshot.pixels,
+        }
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            offset = _HEADER.size + _SECTION.size * len(_SECTIONS)
+            table_entries = []
+            for name in _SECTIONS:
+                offset += -offset % _ALIGN
+                table_entries.append((offset, len(payloads[name])))
+                offset += len(payloads[name])
+
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(_SECTIONS)))
+            for entry in table_entries:
+                f.write(_SECTION.pack(*entry))
+            for name, (section_offset, _) in zip(_SECTIONS, table_entries):
+                f.write(b"\0" * (section_offset - f.tell()))
+                f.write(payloads[name])
+        os.replace(temp_path, path)
+        return key
+
+
+    def load(self, key: str):
+        """Maps a stored snapshot; pixels stay a view on the file, nothing is re-parsed or decoded."""
+        with open(self.path(key), "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+        magic, version, section_count = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{key} is not a version {_VERSION} snapshot")
+
+        sections = {}
+        for position, name in enumerate(_SECTIONS[:section_count]):
+            offset, length = _SECTION.unpack_from(view, _HEADER.size + position * _SECTION.size)
+            sections[name] = view[offset:offset + length]
+
+        meta = json.loads(bytes(sections["meta"]))
+        table = json.loads(zlib.decompress(sections["table"]))
+        flat_bounds = _little_endian(array("f", bytes(sections["bounds"])))
+        parents = _little_endian(array("i", bytes(sections["parents"]))).tolist()
+
+        bounds = []
+        for node_id in range(meta["node_count"]):
+            node_bounds = tuple(flat_bounds[node_id * 4:node_id * 4 + 4])
+            bounds.append(None if math.isnan(node_bounds[0]) else node_bounds)
+
+        element_index = ElementIndex.from_table(table["tags"], table["attribs"], table["texts"], parents, bounds)
+        return Snapshot(
+            sections["pixels"],
+            tuple(meta["size"]),
+            zlib.decompress(sections["source"]).decode("utf-8"),
+            meta["window_size"],
+            meta["platform"],
+            element_index,
+            key=meta["key"],
+            locators=table["locators"],
+            device=meta.get("device"),
+        )
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import statistics
+
+from .element_index import ElementIndex
+
+LOCATOR_ATTRIBUTES = {"iOS": ("name", "label"), "Android": ("resource-id", "text", "content-desc")}
+IOS_EXCLUDED_ATTRIBUTES = "visible,accessible,enabled,index,focused,hittable,placeholderValue,traits"
+
+
+class SourceProfile:
+    """
+    One way of fetching the hierarchy: Appium settings applied once per session plus
+    the command that returns the source. `settings` always lists every setting any
+    profile of the platform touches, so switching profiles leaves nothing behind.
+    """
+
+    def __init__(self, name: str, platform: str, settings: dict, command: str = None, arguments: dict = None):
+        self.name = name
+        self.platform = platform
+        self.settings = settings
+        self._command = command # `mobile:` extension, None for the plain page source
+        self._arguments = arguments or {}
+
+
+    def apply(self, driver):
+        driver.update_settings(self.settings)
+
+
+    def fetch(self, driver):
+        """(source text, ElementIndex); the text is what gets stored and measured."""
+        if self._command is None:
+            page_source = driver.page_source
+            return page_source, ElementIndex.from_page_source(page_source)
+
+        payload = driver.execute_script(self._command, self._arguments)
+        if self._arguments.get("format") == "json":
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+            return json.dumps(payload, ensure_ascii=False), index_from_ios_json(payload)
+        return payload, ElementIndex.from_page_source(payload)
+
+
+_IOS_DEFAULTS = {"snapshotMaxDepth": 50, "useJSONSource": False}
+_ANDROID_DEFAULTS = {"snapshotMaxDepth": 70, "ignoreUnimportantViews": False}
+
+PROFILES = {
+    "iOS": [
+        SourceProfile("full", "iOS", _IOS_DEFAULTS),
+        SourceProfile("json-source", "iOS", {**_IOS_DEFAULTS, "useJSONSource": True}),
+        SourceProfile("lean-xml", "iOS", _IOS_DEFAULTS, "mobile: source",
+                      {"format": "xml", "excludedAttributes": IOS_EXCLUDED_ATTRIBUTES}),
+        SourceProfile("json", "iOS", _IOS_DEFAULTS, "mobile: source", {"format": "json"}),
+        SourceProfile("json-shallow", "iOS", {**_IOS_DEFAULTS, "snapshotMaxDepth": 30}, "mobile: source", {"format": "json"}),
+    ],
+    "Android": [
+        SourceProfile("full", "Android", _ANDROID_DEFAULTS),
+        SourceProfile("compressed", "Android", {**_ANDROID_DEFAULTS, "ignoreUnimportantViews": True}),
+        SourceProfile("compressed-shallow", "Android", {"snapshotMaxDepth": 40, "ignoreUnimportantViews": True}),
+    ],
+}
+
+
+def index_from_ios_json(tree: dict):
+    """ElementIndex of a `mobile: source` JSON tree, same tags and attributes as the XML source."""
+    tags, attribs, texts, parents, bounds = [], [], [], [], []
+    stack = [(tree, -1)]
+    while stack:
+        node, parent_id = stack.pop()
+        node_id = len(tags)
+        tag = node.get("type") or "XCUIElementTypeOther"
+        if not tag.startswith("XCUIElementType"):
+            tag = "XCUIElementType" + tag
+        rect = node.get("rect") or {}
+        attrib = {"type": tag}
+        for key in ("name", "label", "value"):
+            if node.get(key) not in (None, ""):
+                attrib[key] = str(node[key])
+        for key, json_key in (("enabled", "isEnabled"), ("visible", "isVisible")):
+            if json_key in node:
+                attrib[key] = "true" if node[json_key] in (True, "1", 1) else "false"
+        node_bounds = None
+        if rect:
+            node_bounds = tuple(float(rect[key]) for key in ("x", "y", "width", "height"))
+            attrib.update({key: str(int(value)) for key, value in zip(("x", "y", "width", "height"), node_bounds)})
+
+        tags.append(tag)
+        attribs.append(attrib)
+        texts.append(None)
+        parents.append(parent_id)
+        bounds.append(node_bounds)
+        # Reversed so ids keep document order
+        stack.extend((child, node_id) for child in reversed(node.get("children") or []))
+    return ElementIndex.from_table(tags, attribs, texts, parents, bounds)
+
+
+def locator_coverage(candidate: ElementIndex, reference: ElementIndex, platform: str):
+    """Share of the reference's identifiable, bounded nodes that the candidate also has, with the same bounds."""
+    def identities(element_index):
+        found = set()
+        for node_id in element_index.bounded_ids():
+            element = element_index.elements[node_id]
+            x, y, width, height = element_index.bounds[node_id]
+            for attribute in LOCATOR_ATTRIBUTES[platform]:
+                value = element.get(attribute)
+                if value:
+                    found.add((element.tag, attribute, value, round(x), round(y), round(width), round(height)))
+        return found
+
+    expected = identities(reference)
+    if not expected:
+        return 1.0
+    return len(expected & identities(candidate)) / len(expected)
+
+
+class SourceProfiler:
+    """
+    Measures every profile of the platform on a live session and picks the cheapest one
+    whose hierarchy still carries the bounds and locator attributes of the full source.
+    Results are kept per device in a JSON file so the benchmark runs once.
+    """
+
+    def __init__(self, driver, platform: str, cache_path: str = None, min_coverage: float = 0.98):
+        self.driver = driver
+        self.platform = platform
+        self.cache_path = cache_path
+        self.min_coverage = min_coverage
+        self.results = [] # one row per profile: name, latency_ms, bytes, nodes, coverage, error
+
+
+    def benchmark(self, repeats: int = 2):
+        reference = None
+        self.results = []
+        for profile in PROFILES[self.platform]:
+            row = {"name": profile.name}
+            try:
+                profile.apply(self.driver)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    source, element_index = profile.fetch(self.driver)
+                    timings.append(time.perf_counter() - start)
+                if reference is None:
+                    reference = element_index # the first profile is the full source
+                row.update({
+                    "latency_ms": round(statistics.median(timings) * 1000, 1),
+                    "bytes": len(source.encode("utf-8")),
+                    "nodes": len(element_index),
+                    "coverage": round(locator_coverage(element_index, reference, self.platform), 3),
+                })
+            except Exception as e:
+                row["error"] = repr(e)
+            self.results.append(row)
+            print(f"⏱️ {self.platform} {profile.name}: {row}")
+        return self.results
+
+
+    def choose(self, repeats: int = 2):
+        """Cheapest valid profile, applied to the session; the full source when nothing else qualifies."""
+        cache = self._load_cache()
+        device = self._device_key()
+        if device in cache:
+            self.results = cache[device]
+        else:
+            self.benchmark(repeats)
+            cache[device] = self.results
+            self._save_cache(cache)
+
+        valid = [
+            row for row in self.results
+            if "error" not in row and row["coverage"] >= self.min_coverage
+        ]
+        best = min(valid, key=lambda row: row["latency_ms"])["name"] if valid else "full"
+        profile = get_profile(self.platform, best)
+        profile.apply(self.driver)
+        return profile
+
+
+    def _device_key(self):
+        capabilities = self.driver.capabilities
+        device = capabilities.get("udid") or capabilities.get("deviceName") or "device"
+        return f"{self.platform}|{device}|{capabilities.get('platformVersion', '')}"
+
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+    def _save_cache(self, cache: dict):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+
+
+def get_profile(platform: str, name: str):
+    for profile in PROFILES[platform]:
+        if profile.name == name:
+            return profile
+    raise ValueError(f"Unknown {platform} source profile: {name}")
+
+
+def select_source_profile(driver, platform: str, mode: str, cache_path: str = None):
+    """Profile for a session: None keeps the plain page source, `auto` benchmarks (once per device), else by name."""
+    if not mode:
+        return None
+    if mode == "auto":
+        return SourceProfiler(driver, platform, cache_path).choose()
+    profile = get_profile(platform, mode)
+    profile.apply(driver)
+    return profile
@@ -1,8 +1,77 @@
+from utils.startup_report import StartupReport
+
+startup = StartupReport()
+
+import os
 import sys
+import json
+import argparse
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
 from gui import MainWindow
 
+startup.mark("imports")
+
+
+def load_offline_snapshots(path: str):
+    """Snapshots grouped per device (udid or name, platform for older stores) from a snapshot store directory or a recording JSON."""
+    if os.path.isdir(path):
+        from logic.snapshot_store import SnapshotStore
+
+        store = SnapshotStore(path)
+        snapshots = {}
+        for key in store.keys():
+            snapshot = store.load(key)
+            snapshots.setdefault(snapshot.device or snapshot.platform, []).append(snapshot)
+        return snapshots
+
+    from logic.snapshot import snapshots_from_recording
+
+    with open(path) as f:
+        return snapshots_from_recording(json.load(f))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Appium inspector")
+    parser.add_argument("--offline", metavar="PATH", help="snapshot store directory or recording JSON to inspect without devices")
+    parser.add_argument("--startup-report", action="store_true", help="print startup timings")
+    parser.add_argument("--locator-report", metavar="OUT", help="with --offline: write every locator of every snapshot to OUT (.csv or .json) and exit")
+    parser.add_argument("--processes", action="store_true", help="run every device session in its own worker process")
+    parser.add_argument("--history-mb", type=int, default=64, help="snapshot history memory budget per device, in MB")
+    parser.add_argument("--source-profile", metavar="NAME", help="how to fetch hierarchies: auto (measure and pick the cheapest) or a profile name such as json or compressed")
+    parser.add_argument("--dedupe-dataset", metavar="DIR", help="merge near-duplicate images of a YOLO dataset (DIR/images/train) and exit")
+    parser.add_argument("--pack-dataset", metavar="DIR", help="pack a YOLO dataset (DIR/images/train) into sharded tar archives under DIR/packed, appending only new captures, and exit")
+    args = parser.parse_args()
+    if args.locator_report and not args.offline:
+        parser.error("--locator-report requires --offline")
+
+    if args.dedupe_dataset:
+        from logic.dataset_dedup import dedupe_dataset
+
+        kept, moved = dedupe_dataset(args.dedupe_dataset)
+        print(f"{kept} images kept, {moved} near-duplicates moved to {os.path.join(args.dedupe_dataset, 'duplicates')}")
+        sys.exit(0)
+
+    if args.pack_dataset:
+        from logic.dataset_pack import pack_dataset
+
+        counts = pack_dataset(args.pack_dataset)
+        print(f"{counts['train']} train / {counts['val']} val samples packed ({counts['updated']} with new labels) -> {os.path.join(args.pack_dataset, 'packed')}")
+        if counts["updated"]:
+            print("⚠️ Relabelled images keep their old record in the tars: read them with PackedSplit, not a plain tar/WebDataset loader")
+        sys.exit(0)
+
+    if args.locator_report:
+        from logic.locator_report import build_locator_report, write_report
+
+        rows = []
+        for snapshots in load_offline_snapshots(args.offline).values():
+            for snapshot in snapshots:
+                rows.extend(build_locator_report(snapshot.element_index, snapshot.platform, snapshot.locators))
+        write_report(rows, args.locator_report)
+        print(f"{len(rows)} locators -> {args.locator_report}")
+        sys.exit(0)
+
     capabilities = {
         "cap1": {
             "platformName": "iOS",
@@ -26,8 +95,19 @@ if __name__ == "__main__":
     }
 
     app = QApplication(sys.argv)
-    window = MainWindow()
-    window.load(capabilities)
+    window = MainWindow(history_budget_mb=args.history_mb)
+    if args.offline:
+        window.load_offline(load_offline_snapshots(args.offline))
+    else:
+        window.load(capabilities, processes=args.processes, source_profile=args.source_profile)
+    startup.mark("load")
     window.resize(1200, 800)
     window.show()
-    app.exec()
\ No newline at end of file
+
+    if args.startup_report:
+        def report():
+            startup.mark("first paint")
+            print(startup.format())
+        QTimer.singleShot(0, report)
+
+    app.exec()
@@ -0,0 +1,27 @@
+import sys
+import time
+
+HEAVY_MODULES = ("appium", "selenium", "lxml", "PIL", "rtree", "numpy")
+
+
+class StartupReport:
+    """Wall-clock marks from process start to first paint, plus which heavy modules got imported."""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self._marks = []
+
+
+    def mark(self, label: str):
+        self._marks.append((label, time.perf_counter()))
+
+
+    def format(self):
+        lines = ["Startup report:"]
+        previous = self._start
+        for label, timestamp in self._marks:
+            lines.append(f"  {label:<24} +{(timestamp - previous) * 1000:7.1f} ms  ({(timestamp - self._start) * 1000:7.1f} ms)")
+            previous = timestamp
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        lines.append(f"  heavy modules loaded: {', '.join(loaded) or 'none'}")
+        return "\n".join(lines)
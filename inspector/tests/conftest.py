@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The inspector runs from src/ and imports `logic` / `gui` as top-level packages
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
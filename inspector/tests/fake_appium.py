@@ -0,0 +1,101 @@
+"""Minimal W3C/Appium HTTP server for tests: one session, canned hierarchy, a new screenshot color per capture."""
+import io
+import json
+import time
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+ANDROID_SOURCE = """<?xml version='1.0' encoding='UTF-8'?><hierarchy rotation="0">
+<android.widget.FrameLayout bounds="[0,0][360,800]" class="android.widget.FrameLayout">
+ <android.view.ViewGroup bounds="[0,40][360,200]" class="android.view.ViewGroup" resource-id="com.app:id/header">
+  <android.widget.TextView bounds="[10,50][200,90]" class="android.widget.TextView" text="Hello" resource-id="com.app:id/title"/>
+  <android.widget.Button bounds="[10,100][200,140]" class="android.widget.Button" text="Continue" content-desc="continue"/>
+ </android.view.ViewGroup>
+</android.widget.FrameLayout></hierarchy>"""
+
+
+def png(color, size=(360, 800)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive, like Appium
+
+    def log_message(self, *args):
+        pass
+
+
+    def _send(self, value, status=200):
+        body = json.dumps({"value": value}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_idle:
+            self.close_connection = True # without saying so, like a keep-alive timeout on the server
+
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else None
+
+
+    def do_POST(self):
+        body = self._body()
+        server = self.server
+        server.requests.append(("POST", self.path, body))
+        if self.path.endswith("/session"):
+            return self._send({"sessionId": f"s{len(server.requests)}", "capabilities": body["capabilities"]["alwaysMatch"]})
+        if self.path.endswith("/elements"):
+            return self._send([{"element-6066-11e4-a52e-4f735466cecf": "e1"}, {"ELEMENT": "e2"}])
+        if self.path.endswith("/element"):
+            if body["value"] == "missing":
+                return self._send({"error": "no such element", "message": "not found"}, 404)
+            return self._send({"element-6066-11e4-a52e-4f735466cecf": "e1"})
+        if self.path.endswith("/execute/sync"):
+            if body["script"] == "slow":
+                time.sleep(2)
+            if body["script"] == "drop":
+                self.close_connection = True # request read, connection dropped before any answer
+                return
+            return self._send(body["args"])
+        self._send(None)
+
+
+    def do_DELETE(self):
+        self.server.requests.append(("DELETE", self.path, None))
+        self._send(None)
+
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(("GET", self.path, None))
+        if self.path.endswith("/screenshot"):
+            server.captures += 1
+            return self._send(base64.b64encode(png((server.captures * 40 % 256, 0, 0))).decode())
+        if self.path.endswith("/source"):
+            return self._send(ANDROID_SOURCE)
+        if self.path.endswith("/window/rect"):
+            return self._send({"x": 0, "y": 0, "width": 360, "height": 800})
+        self._send(None)
+
+
+def serve():
+    """
+    Started server on a free port; `server.url`, `server.requests`, call shutdown() when done.
+    Set `server.drop_idle` to close every connection after its answer.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.requests = []
+    server.captures = 0
+    server.drop_idle = False
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from logic.async_driver import AppiumCommandError, AsyncAppiumDriver, ConnectionPool
+
+from fake_appium import ANDROID_SOURCE, serve
+
+
+@pytest.fixture
+def server():
+    server = serve()
+    yield server
+    server.shutdown()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_create_prefixes_appium_capabilities(server):
+    async def scenario():
+        pool = ConnectionPool(server.url)
+        driver = await AsyncAppiumDriver.create(pool, {
+            "platformName": "Android", "automationName": "UiAutomator2", "appium:udid": "emulator-5554",
+            "goog:chromeOptions": {}, "timeouts": {"implicit": 0},
+        })
+        await pool.close()
+        return driver
+
+    driver = run(scenario())
+    _, path, body = server.requests[0]
+    assert path == "/session"
+    assert body["capabilities"]["alwaysMatch"] == {
+        "platformName": "Android", "appium:automationName": "UiAutomator2", "appium:udid": "emulator-5554",
+        "goog:chromeOptions": {}, "timeouts": {"implicit": 0},
+    }
+    assert driver.session_id == "s1"
+
+
+def test_commands_share_one_keep_alive_connection(server):
+    async def scenario():
+        pool = ConnectionPool(server.url)
+        driver = AsyncAppiumDriver.attach(pool, "s1")
+        results = (
+            await driver.page_source(), await driver.get_window_size(),
+            await driver.find_element("id", "title"), await driver.find_elements("xpath", "//*"),
+            await driver.execute_script("echo", 1, "two"),
+        )
+        with pytest.raises(AppiumCommandError) as error:
+            await driver.find_element("id", "missing")
+        await driver.quit()
+        await pool.close()
+        return results, error.value, pool.opened
+
+    (source, size, element, elements, echoed), error, opened = run(scenario())
+    assert source == ANDROID_SOURCE
+    assert size == {"width": 360, "height": 800}
+    assert element == "e1" and elements == ["e1", "e2"]
+    assert echoed == [1, "two"]
+    assert (error.status, error.error) == (404, "no such element")
+    assert opened == 1
+    assert server.requests[-1] == ("DELETE", "/session/s1", None)
+
+
+def test_connection_closed_while_idle_is_replaced(server):
+    server.drop_idle = True
+
+    async def scenario():
+        pool = ConnectionPool(server.url)
+        driver = AsyncAppiumDriver.attach(pool, "s1")
+        results = [await driver.get_window_size() for _ in range(3)]
+        await pool.close()
+        return results, pool.opened
+
+    results, opened = run(scenario())
+    assert results == [{"width": 360, "height": 800}] * 3
+    assert opened == 3
+    assert sum(1 for _, path, _ in server.requests if path.endswith("/window/rect")) == 3
+
+
+def test_dropped_post_is_not_sent_twice(server):
+    async def scenario():
+        pool = ConnectionPool(server.url)
+        driver = AsyncAppiumDriver.attach(pool, "s1")
+        await driver.page_source() # leaves a pooled connection for the POST to reuse
+        with pytest.raises((ConnectionError, asyncio.IncompleteReadError)):
+            await driver.execute_script("drop")
+        await pool.close()
+
+    run(scenario())
+    assert sum(1 for _, path, _ in server.requests if path.endswith("/execute/sync")) == 1
+
+
+def test_timeout_discards_the_connection(server):
+    async def scenario():
+        pool = ConnectionPool(server.url)
+        driver = AsyncAppiumDriver.attach(pool, "s1")
+        with pytest.raises(asyncio.TimeoutError):
+            await driver.execute_script("slow", timeout=0.2)
+        echoed = await driver.execute_script("echo", "after")
+        await pool.close()
+        return echoed, pool.opened
+
+    echoed, opened = run(scenario())
+    assert echoed == ["after"]
+    assert opened == 2
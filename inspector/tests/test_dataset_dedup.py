@@ -0,0 +1,105 @@
+import io
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+from logic.dataset_dedup import DatasetIndex, HashIndex, dedupe_dataset
+from logic.snapshot import Snapshot
+
+from fake_appium import ANDROID_SOURCE
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+WINDOW = {"width": 360, "height": 800}
+
+
+def screen(seed: int, touched: int = 0):
+    """PNG of a random block pattern; touched changes that many pixels, well below the threshold."""
+    np = pytest.importorskip("numpy")
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = np.kron(rng.integers(0, 256, (40, 18, 3), dtype=np.uint8), np.ones((20, 20, 1), dtype=np.uint8))
+    for offset in range(touched):
+        pixels[offset * 7, offset * 5] ^= 1
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def snapshot(seed: int, touched: int = 0):
+    return Snapshot.from_png(screen(seed, touched), ANDROID_SOURCE, WINDOW, "Android")
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_hash_index_finds_everything_a_full_scan_finds():
+    rng = random.Random(7)
+    bases = [rng.getrandbits(256) for _ in range(20)]
+
+    def near(hash_value: int):
+        for bit in rng.sample(range(256), rng.randint(0, 20)):
+            hash_value ^= 1 << bit
+        return hash_value
+
+    hashes = [near(rng.choice(bases)) for _ in range(500)]
+    index = HashIndex(12)
+    for name, hash_value in enumerate(hashes):
+        index.add(hash_value, name)
+
+    for query in (near(rng.choice(bases)) for _ in range(100)):
+        expected = sorted(
+            ((hash_value ^ query).bit_count(), name) for name, hash_value in enumerate(hashes)
+            if (hash_value ^ query).bit_count() <= 12
+        )
+        found = index.search(query, 12)
+        assert sorted(found) == expected
+        assert [distance for distance, _ in found] == sorted(distance for distance, _ in found)
+
+
+def test_importing_dedup_does_not_load_numpy():
+    code = "import sys; import logic.dataset_dedup; print('numpy' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=SRC_DIR, check=True)
+    assert result.stdout.strip() == "False"
+
+
+def test_dataset_index_writes_new_captures_and_merges_near_duplicates(tmp_path):
+    index = DatasetIndex(str(tmp_path))
+    assert len(index) == 0
+
+    name, merged = index.add(snapshot(1), ["0 0.5 0.5 0.1 0.1"])
+    assert not merged
+    assert os.listdir(index.images_dir) == [name]
+    label_path = tmp_path / "labels" / "train" / (os.path.splitext(name)[0] + ".txt")
+    assert read_lines(label_path) == ["0 0.5 0.5 0.1 0.1"]
+
+    duplicate, merged = index.add(snapshot(1, touched=5), ["0 0.5 0.5 0.1 0.1", "0 0.2 0.2 0.1 0.1"])
+    assert (duplicate, merged) == (name, True)
+    assert os.listdir(index.images_dir) == [name]
+    assert read_lines(label_path) == ["0 0.5 0.5 0.1 0.1", "0 0.2 0.2 0.1 0.1"]
+
+    other, merged = index.add(snapshot(2), ["0 0.7 0.7 0.1 0.1"])
+    assert other != name and not merged
+    assert [line.split()[1] for line in read_lines(index.index_path)] == [name, other]
+    assert len(DatasetIndex(str(tmp_path))) == 2 # reopened from the index file
+
+
+def test_dedupe_dataset_keeps_the_first_and_moves_duplicates(tmp_path):
+    images_dir = tmp_path / "images" / "train"
+    labels_dir = tmp_path / "labels" / "train"
+    images_dir.mkdir(parents=True)
+    labels_dir.mkdir(parents=True)
+    for name, seed, touched, label in (("a", 1, 0, "0 a"), ("b", 1, 5, "0 b"), ("c", 2, 0, "0 c")):
+        (images_dir / f"{name}.png").write_bytes(screen(seed, touched))
+        (labels_dir / f"{name}.txt").write_text(label + "\n")
+
+    assert dedupe_dataset(str(tmp_path)) == (2, 1)
+    assert sorted(os.listdir(images_dir)) == ["a.png", "c.png"]
+    assert read_lines(labels_dir / "a.txt") == ["0 a", "0 b"]
+    assert sorted(os.listdir(tmp_path / "duplicates" / "train")) == ["b.png", "b.txt"]
+    assert [line.split()[1] for line in read_lines(tmp_path / "hashes_train.txt")] == ["a.png", "c.png"]
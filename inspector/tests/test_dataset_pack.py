@@ -0,0 +1,136 @@
+import os
+import tarfile
+
+import pytest
+
+import logic.dataset_pack as dataset_pack
+from logic.dataset_pack import DatasetPacker, PackedSplit, pack_dataset
+
+
+def make_dataset(root, count: int, start: int = 0):
+    images_dir = root / "images" / "train"
+    labels_dir = root / "labels" / "train"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    labels_dir.mkdir(parents=True, exist_ok=True)
+    for number in range(start, start + count):
+        (images_dir / f"img{number:03d}.png").write_bytes(os.urandom(100 + number))
+        if number % 5:
+            (labels_dir / f"img{number:03d}.txt").write_text(f"{number % 3} 0.5 0.5 0.1 0.1\n")
+
+
+def packed(pack_dir):
+    samples = {}
+    for split in ("train", "val"):
+        for key, image, label in PackedSplit(str(pack_dir), split):
+            samples[key] = (image, label)
+    return samples
+
+
+def expected(root):
+    samples = {}
+    for name in sorted(os.listdir(root / "images" / "train")):
+        key = os.path.splitext(name)[0]
+        label_path = root / "labels" / "train" / f"{key}.txt"
+        samples[key] = ((root / "images" / "train" / name).read_bytes(), label_path.read_text() if label_path.exists() else "")
+    return samples
+
+
+def tar_members(pack_dir):
+    members = []
+    for name in sorted(os.listdir(pack_dir)):
+        if name.endswith(".tar"):
+            with tarfile.open(pack_dir / name) as tar:
+                members.extend(tar.getnames())
+    return members
+
+
+def test_pack_round_trips_through_the_index_and_tar(tmp_path):
+    make_dataset(tmp_path, 40)
+    counts = pack_dataset(str(tmp_path), shard_bytes=4096)
+
+    assert counts["train"] + counts["val"] == 40 and counts["val"] > 0
+    assert packed(tmp_path / "packed") == expected(tmp_path)
+    assert len(os.listdir(tmp_path / "packed")) > 4 # several shards per split
+    assert len(tar_members(tmp_path / "packed")) == 80
+
+    train = PackedSplit(str(tmp_path / "packed"), "train")
+    key = train.keys()[0]
+    assert train.read(key) == expected(tmp_path)[key]
+
+
+def test_unchanged_labels_are_not_read_again(tmp_path, monkeypatch):
+    make_dataset(tmp_path, 10)
+    pack_dataset(str(tmp_path))
+
+    reads = []
+    read_label = dataset_pack._read_label
+    monkeypatch.setattr(dataset_pack, "_read_label", lambda path: reads.append(path) or read_label(path))
+    assert pack_dataset(str(tmp_path)) == {"train": 0, "val": 0, "updated": 0}
+    assert reads == []
+
+    (tmp_path / "labels" / "train" / "img003.txt").write_text("0 0.5 0.5 0.1 0.1\n1 0.2 0.2 0.1 0.1\n")
+    counts = pack_dataset(str(tmp_path))
+    assert counts["updated"] == 1 and counts["train"] + counts["val"] == 1
+    assert packed(tmp_path / "packed") == expected(tmp_path)
+
+
+def test_interrupted_pack_resumes_without_corrupting_shards(tmp_path, monkeypatch):
+    make_dataset(tmp_path, 12)
+    monkeypatch.setattr(dataset_pack, "COMMIT_EVERY", 2)
+    commit = dataset_pack._Shard.commit
+    calls = []
+
+    def crash_on_third_commit(shard):
+        calls.append(shard.name)
+        if len(calls) == 3:
+            # Killed after the tar bytes were written, before their index lines
+            shard._tar.flush()
+            raise KeyboardInterrupt
+        commit(shard)
+
+    monkeypatch.setattr(dataset_pack._Shard, "commit", crash_on_third_commit)
+    with pytest.raises(KeyboardInterrupt):
+        DatasetPacker(str(tmp_path / "packed")).pack(str(tmp_path), workers=2)
+    monkeypatch.setattr(dataset_pack._Shard, "commit", commit)
+
+    survived = packed(tmp_path / "packed")
+    assert 0 < len(survived) < 12
+    for key, sample in survived.items():
+        assert sample == expected(tmp_path)[key]
+
+    make_dataset(tmp_path, 3, start=12)
+    counts = pack_dataset(str(tmp_path))
+    assert counts["train"] + counts["val"] == 15 - len(survived)
+    assert packed(tmp_path / "packed") == expected(tmp_path)
+    assert len(tar_members(tmp_path / "packed")) == 30
+
+
+def test_torn_index_line_is_ignored_and_cut_off(tmp_path):
+    make_dataset(tmp_path, 6)
+    pack_dataset(str(tmp_path))
+    pack_dir = tmp_path / "packed"
+    idx_path = next(pack_dir / name for name in sorted(os.listdir(pack_dir)) if name.endswith(".idx"))
+    lines = idx_path.read_bytes().splitlines(keepends=True)
+    # Crash halfway through writing the last line
+    idx_path.write_bytes(b"".join(lines[:-1]) + lines[-1][:len(lines[-1]) // 2])
+
+    torn_key = lines[-1].split(b"\t")[0].decode()
+    survived = packed(pack_dir)
+    assert torn_key not in survived and len(survived) == 5
+
+    counts = pack_dataset(str(tmp_path))
+    assert counts["train"] + counts["val"] == 1
+    assert packed(pack_dir) == expected(tmp_path)
+    assert all(line.count(b"\t") >= 7 for line in idx_path.read_bytes().splitlines())
+    assert len(tar_members(pack_dir)) == 12
+
+
+def test_relabelled_keys_are_superseded_only_for_packed_split(tmp_path):
+    make_dataset(tmp_path, 4)
+    pack_dataset(str(tmp_path))
+    (tmp_path / "labels" / "train" / "img001.txt").write_text("2 0.1 0.1 0.1 0.1\n")
+    pack_dataset(str(tmp_path))
+
+    assert packed(tmp_path / "packed") == expected(tmp_path)
+    members = tar_members(tmp_path / "packed")
+    assert members.count("img001.txt") == 2 # the old record stays in the tar
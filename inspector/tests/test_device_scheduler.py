@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from logic.device_scheduler import DeviceScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = DeviceScheduler(max_workers=1)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def blocked(scheduler: DeviceScheduler, device):
+    """Occupies device (and, with one worker, the pool) until the returned event is set."""
+    gate = threading.Event()
+    started = threading.Event()
+    scheduler.submit(device, lambda: (started.set(), gate.wait(5)))
+    assert started.wait(5)
+    return gate
+
+
+def test_devices_are_served_round_robin(scheduler):
+    order = []
+    gate = blocked(scheduler, "a")
+    futures = [scheduler.submit("a", order.append, f"a{n}") for n in range(3)]
+    futures += [scheduler.submit("b", order.append, f"b{n}") for n in range(3)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+
+    # a was busy when b queued, so b goes first; after that they alternate
+    assert order == ["b0", "a0", "b1", "a1", "b2", "a2"]
+
+
+def test_one_job_in_flight_per_device():
+    scheduler = DeviceScheduler(max_workers=8)
+    lock = threading.Lock()
+    running = {"a": 0, "b": 0}
+    peaks = {"a": 0, "b": 0}
+
+    def job(device):
+        with lock:
+            running[device] += 1
+            peaks[device] = max(peaks[device], running[device])
+        time.sleep(0.01)
+        with lock:
+            running[device] -= 1
+
+    futures = [scheduler.submit(device, job, device) for _ in range(10) for device in ("a", "b")]
+    for future in futures:
+        future.result(5)
+    scheduler.shutdown()
+    assert peaks == {"a": 1, "b": 1}
+
+
+def test_queued_jobs_with_the_same_key_are_coalesced(scheduler):
+    calls = []
+    gate = blocked(scheduler, "a")
+    first = scheduler.submit("a", calls.append, 1, key="refresh")
+    second = scheduler.submit("a", calls.append, 2, key="refresh")
+    other = scheduler.submit("b", calls.append, 3, key="refresh") # keys are per device
+    assert first is second and first is not other
+    assert scheduler.pending("a") == 1
+
+    gate.set()
+    first.result(5)
+    other.result(5)
+    later = scheduler.submit("a", calls.append, 4, key="refresh") # nothing queued any more
+    later.result(5)
+    assert later is not first
+    assert sorted(calls) == [1, 3, 4]
+
+
+def test_gather_keeps_going_when_a_device_fails():
+    scheduler = DeviceScheduler(max_workers=2)
+
+    def fail():
+        raise RuntimeError("session lost")
+
+    results = scheduler.gather({"a": (fail,), "b": (sum, [1, 2])})
+    scheduler.shutdown()
+    assert results["b"] == (3, None)
+    assert isinstance(results["a"][1], RuntimeError)
+
+
+def test_shutdown_cancels_queued_jobs(scheduler):
+    gate = blocked(scheduler, "a")
+    queued = scheduler.submit("a", lambda: None)
+    scheduler.shutdown(wait=False)
+    gate.set()
+    assert queued.cancelled()
@@ -0,0 +1,44 @@
+import pytest
+
+from logic.element_index import ElementIndex
+from logic.device_worker import pack_table, unpack_table
+
+from fake_appium import ANDROID_SOURCE, serve
+
+
+def test_packed_table_round_trips():
+    element_index = ElementIndex.from_page_source(ANDROID_SOURCE)
+    restored = unpack_table(pack_table(element_index))
+    assert restored.to_table() == element_index.to_table()
+    assert list(restored.parents) == list(element_index.parents)
+    assert restored.bounds == element_index.bounds
+
+
+def test_packed_table_keeps_missing_bounds_and_texts():
+    element_index = ElementIndex.from_table(
+        ["root", "leaf"], [{}, {"name": "ü"}], [None, "text"], [-1, 0], [None, (1.5, 2.0, 3.0, 4.0)]
+    )
+    restored = unpack_table(pack_table(element_index))
+    assert restored.bounds[0] is None and restored.bounds[1] == (1.5, 2.0, 3.0, 4.0)
+    assert restored.to_table() == (["root", "leaf"], [{}, {"name": "ü"}], [None, "text"])
+
+
+def test_snapshot_pixels_survive_later_captures():
+    pytest.importorskip("appium")
+    from logic.device_worker import DeviceProcess
+
+    server = serve()
+    process = DeviceProcess(server.url, {"platformName": "Android", "appium:automationName": "UiAutomator2"})
+    try:
+        first = process.capture_snapshot()
+        image = first.image
+        color = image.getpixel((0, 0))
+        for _ in range(3):
+            later = process.capture_snapshot()
+        assert later.image.getpixel((0, 0)) != color
+        assert image.getpixel((0, 0)) == color
+        assert first.image.getpixel((5, 5)) == color
+        assert len(first.element_index) == len(ElementIndex.from_page_source(ANDROID_SOURCE))
+    finally:
+        process.close()
+        server.shutdown()
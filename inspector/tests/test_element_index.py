@@ -0,0 +1,48 @@
+from logic.element_index import ElementIndex, parse_bounds
+
+from fake_appium import ANDROID_SOURCE
+
+IOS_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><AppiumAUT>
+<XCUIElementTypeApplication type="XCUIElementTypeApplication" name="App" x="0" y="0" width="390" height="844">
+ <XCUIElementTypeButton type="XCUIElementTypeButton" name="Login" label="Login" x="20" y="700" width="350" height="44"/>
+ <XCUIElementTypeOther type="XCUIElementTypeOther" x="0" y="0" width="" height="10"/>
+</XCUIElementTypeApplication></AppiumAUT>"""
+
+
+def test_bounds_of_both_platforms():
+    android = ElementIndex.from_page_source(ANDROID_SOURCE)
+    assert android.bounds[0] is None # the <hierarchy> wrapper
+    assert android.bounds[1] == (0.0, 0.0, 360.0, 800.0)
+    assert android.bounds[3] == (10.0, 50.0, 190.0, 40.0)
+
+    ios = ElementIndex.from_page_source(IOS_SOURCE)
+    assert ios.bounds[0] is None # AppiumAUT root has no geometry
+    assert ios.bounds[2] == (20.0, 700.0, 350.0, 44.0)
+    assert ios.bounds[3] is None # empty width
+    assert ios.bounded_ids() == [1, 2]
+
+
+def test_parse_bounds_rejects_malformed_values():
+    assert parse_bounds({"bounds": "[0,0]"}) is None
+    assert parse_bounds({"x": "a", "y": "0", "width": "1", "height": "1"}) is None
+
+
+def test_parents_children_and_hit_test():
+    index = ElementIndex.from_page_source(ANDROID_SOURCE)
+    assert index.parents == [-1, 0, 1, 2, 2]
+    assert index.children_of(2) == [3, 4]
+    assert index.hit_test(50, 120) == 4 # the button, not the header around it
+    assert index.hit_test(300, 700) == 1
+    assert index.hit_test(400, 900) is None
+
+
+def test_table_round_trip_keeps_the_hierarchy():
+    index = ElementIndex.from_page_source(ANDROID_SOURCE)
+    restored = ElementIndex.from_table(*index.to_table(), index.parents, index.bounds)
+
+    assert restored.to_table() == index.to_table()
+    assert restored.elements[4].getparent() is restored.elements[2]
+    assert [child.get("text") for child in restored.elements[2]] == ["Hello", "Continue"]
+    # XPath on a stored index rebuilds the lxml tree on demand
+    assert restored.find_xpath("//android.widget.Button[@content-desc='continue']") == [4]
+    assert restored.find_xpath("//*[") == []
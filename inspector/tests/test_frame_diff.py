@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+from logic.frame_diff import FrameDiffer
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+SIZE = (100, 70) # tiles of 32: 4 columns, 3 rows, the last ones partial
+
+
+def frame(fill: int = 0):
+    return bytearray([fill]) * (SIZE[0] * SIZE[1] * 3)
+
+
+def paint(pixels: bytearray, x: int, y: int, value: int = 255):
+    offset = (y * SIZE[0] + x) * 3
+    pixels[offset:offset + 3] = bytes([value]) * 3
+
+
+def test_first_frame_and_new_resolution_are_full():
+    differ = FrameDiffer()
+    assert differ.update(bytes(frame()), SIZE).full
+    assert not differ.update(bytes(frame()), SIZE).full
+    assert differ.update(bytes(100 * 10 * 3), (100, 10)).full
+
+
+def test_only_changed_tiles_are_reported():
+    differ = FrameDiffer()
+    differ.update(bytes(frame()), SIZE)
+    current = frame()
+    paint(current, 5, 5)
+    paint(current, 40, 5) # same tile row, next column: one merged run
+    paint(current, 99, 69) # partial corner tile
+    diff = differ.update(bytes(current), SIZE)
+
+    assert sorted(diff.rects) == [(0, 0, 64, 32), (96, 64, 4, 6)]
+    assert diff.intersects((50, 10, 2, 2)) and not diff.intersects((70, 40, 10, 10))
+
+
+def test_noise_below_threshold_is_ignored():
+    differ = FrameDiffer(threshold=12)
+    differ.update(bytes(frame(100)), SIZE)
+    noisy = frame(100)
+    paint(noisy, 10, 10, 110)
+    assert differ.update(bytes(noisy), SIZE).rects == []
+
+
+def test_reused_buffers_are_diffed_against_a_copy():
+    differ = FrameDiffer()
+    shared = frame()
+    differ.update(memoryview(shared), SIZE)
+    paint(shared, 1, 1) # the producer writes the next frame into the same buffer
+    assert differ.update(memoryview(shared), SIZE).rects == [(0, 0, 32, 32)]
+
+
+def test_inspection_panel_import_leaves_numpy_for_the_first_frame():
+    code = "import sys, gui.inspection_panel; print('numpy' in sys.modules)"
+    env = {**os.environ, "QT_QPA_PLATFORM": "offscreen"}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=SRC_DIR, env=env, check=True)
+    assert result.stdout.strip() == "False"
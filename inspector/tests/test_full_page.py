@@ -0,0 +1,115 @@
+import io
+import random
+from types import SimpleNamespace
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import logic.full_page as full_page
+from logic.full_page import capture_full_page, find_scroll_offset
+
+WIDTH, HEIGHT = 360, 800
+TOP, BOTTOM = 100, 580 # scroll container, device pixels = points
+ROW_HEIGHT, ROWS = 60, 20
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(full_page, "time", SimpleNamespace(sleep=lambda seconds: None))
+
+
+class ScrollingDriver:
+    """Fake device: fixed header and footer around a list that swipes move."""
+
+    capabilities = {"platformName": "Android", "appium:udid": "emulator-5554"}
+
+    def __init__(self):
+        rng = random.Random(3)
+        self.content = Image.frombytes(
+            "RGB", (WIDTH, ROW_HEIGHT * ROWS), bytes(rng.getrandbits(8) for _ in range(WIDTH * ROW_HEIGHT * ROWS * 3))
+        )
+        self.offset = 0
+
+
+    @property
+    def max_offset(self):
+        return ROW_HEIGHT * ROWS - (BOTTOM - TOP)
+
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration):
+        self.offset = max(0, min(self.max_offset, self.offset + start_y - end_y))
+
+
+    def get_screenshot_as_png(self):
+        screen = Image.new("RGB", (WIDTH, HEIGHT), (200, 30, 30))
+        screen.paste(self.content.crop((0, self.offset, WIDTH, self.offset + BOTTOM - TOP)), (0, TOP))
+        buffer = io.BytesIO()
+        screen.save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+    def get_window_size(self):
+        return {"width": WIDTH, "height": HEIGHT}
+
+
+    @property
+    def page_source(self):
+        rows = []
+        for row in range(ROWS):
+            top = TOP + row * ROW_HEIGHT - self.offset
+            clipped_top, clipped_bottom = max(top, TOP), min(top + ROW_HEIGHT, BOTTOM)
+            if clipped_top < clipped_bottom:
+                rows.append(
+                    f'<android.widget.TextView class="android.widget.TextView" text="Row {row}" '
+                    f'bounds="[0,{clipped_top}][{WIDTH},{clipped_bottom}]"/>'
+                )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?><hierarchy>'
+            f'<android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][{WIDTH},{HEIGHT}]">'
+            f'<android.widget.TextView class="android.widget.TextView" text="Title" bounds="[0,0][{WIDTH},{TOP}]"/>'
+            f'<android.widget.ScrollView class="android.widget.ScrollView" scrollable="true" bounds="[0,{TOP}][{WIDTH},{BOTTOM}]">'
+            f'{"".join(rows)}</android.widget.ScrollView>'
+            '</android.widget.FrameLayout></hierarchy>'
+        )
+
+
+def test_scroll_offset_from_row_votes():
+    rng = random.Random(5)
+    rows = [bytes(rng.getrandbits(8) for _ in range(32)) for _ in range(100)]
+    assert find_scroll_offset(rows[:60], rows[25:85]) == 25
+    assert find_scroll_offset(rows[:60], rows[:60]) == 0
+
+
+def test_full_page_stitches_every_row_once():
+    driver = ScrollingDriver()
+    capture = capture_full_page(driver)
+
+    assert capture.frame_offsets == [0.0, 288.0, 576.0, 720.0]
+    snapshot = capture.snapshot
+    assert snapshot.size == (WIDTH, HEIGHT + driver.max_offset)
+    assert snapshot.device == "emulator-5554"
+    stitched = snapshot.image.crop((0, TOP, WIDTH, TOP + ROW_HEIGHT * ROWS))
+    assert stitched.tobytes() == driver.content.tobytes()
+
+    element_index = capture.element_index
+    rows = {element.get("text"): node_id for node_id, element in enumerate(element_index.elements) if element.get("text", "").startswith("Row")}
+    assert len([element for element in element_index.elements if element.get("text", "").startswith("Row")]) == ROWS
+    for row, node_id in ((0, rows["Row 0"]), (7, rows["Row 7"]), (19, rows["Row 19"])):
+        assert element_index.bounds[node_id] == (0.0, TOP + row * ROW_HEIGHT, WIDTH, ROW_HEIGHT)
+
+    title = next(node_id for node_id, element in enumerate(element_index.elements) if element.get("text") == "Title")
+    assert title in capture.fixed_ids
+    assert capture.scroll_delta_for(title) == 0.0
+
+
+def test_scroll_into_view_moves_back_to_an_element():
+    driver = ScrollingDriver()
+    capture = capture_full_page(driver)
+    element_index = capture.element_index
+    first_row = next(node_id for node_id, element in enumerate(element_index.elements) if element.get("text") == "Row 0")
+
+    assert capture.scroll_delta_for(first_row) == -driver.max_offset
+    capture.scroll_into_view(driver, first_row)
+    assert driver.offset == 0
+    assert capture.scroll_delta_for(first_row) == 0.0
@@ -0,0 +1,37 @@
+import pytest
+
+QtCore = pytest.importorskip("PySide6.QtCore")
+
+from logic.hover_coalescer import HoverCoalescer
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def wait_for_flush(coalescer: HoverCoalescer, processed: int):
+    loop = QtCore.QEventLoop()
+    coalescer.flushed.connect(lambda *_: coalescer.processed >= processed and loop.quit())
+    QtCore.QTimer.singleShot(2000, loop.quit)
+    loop.exec()
+
+
+def test_only_the_last_hover_of_a_burst_is_hit_tested(app):
+    tested = []
+    changed = []
+    coalescer = HoverCoalescer(lambda x, y: tested.append((x, y)) or x // 100, fps=100)
+    coalescer.changed.connect(changed.append)
+
+    for x in range(0, 250, 10):
+        coalescer.push(x, 5)
+    wait_for_flush(coalescer, 1)
+
+    assert tested == [(240, 5)]
+    assert changed == [2]
+    assert (coalescer.received, coalescer.processed, coalescer.coalesced) == (25, 1, 24)
+
+    # Same element under the pointer: hit tested, but nothing new to report
+    coalescer.push(260, 5)
+    wait_for_flush(coalescer, 2)
+    assert changed == [2] and coalescer.unchanged == 1
@@ -0,0 +1,90 @@
+import pytest
+
+from logic.AppiumRecorder import generate_android_locators, generate_ios_locators
+from logic.element_index import ElementIndex
+from logic.locator_report import MatchCounter, build_locator_report, find_locator, score_locator
+
+from fake_appium import ANDROID_SOURCE
+
+# Names and texts padded the way some apps ship them
+IOS_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><AppiumAUT>
+<XCUIElementTypeApplication type="XCUIElementTypeApplication" name="Demo" x="0" y="0" width="390" height="844">
+ <XCUIElementTypeCell type="XCUIElementTypeCell" name=" Row " x="0" y="100" width="390" height="44">
+  <XCUIElementTypeStaticText type="XCUIElementTypeStaticText" value="First " x="20" y="110" width="200" height="20"/>
+ </XCUIElementTypeCell>
+ <XCUIElementTypeCell type="XCUIElementTypeCell" name="Row" x="0" y="144" width="390" height="44">
+  <XCUIElementTypeStaticText type="XCUIElementTypeStaticText" label="Second" x="20" y="154" width="200" height="20"/>
+ </XCUIElementTypeCell>
+ <XCUIElementTypeButton type="XCUIElementTypeButton" name="  Done" x="20" y="700" width="350" height="44"/>
+</XCUIElementTypeApplication></AppiumAUT>"""
+
+
+def node(element_index: ElementIndex, **attributes):
+    return next(
+        element for element in element_index.elements
+        if all(element.get(key) == value for key, value in attributes.items())
+    )
+
+
+@pytest.fixture
+def ios():
+    return ElementIndex.from_page_source(IOS_SOURCE)
+
+
+def test_padded_values_are_counted_like_the_recorder_strips_them(ios):
+    counter = MatchCounter(ios)
+    done = generate_ios_locators(node(ios, name="  Done"))
+    assert done["-ios predicate string"] == "name == 'Done'"
+    for strategy, value in done.items():
+        assert counter.count(strategy, value) == 1, strategy
+        assert len(find_locator(ios, strategy, value)) == 1, strategy
+
+    # " Row " and "Row" are the same locator once stripped
+    assert counter.count("accessibility id", "Row") == 2
+    assert counter.count("-ios class chain", "**/XCUIElementTypeCell[`name == 'Row'`]") == 2
+    assert len(find_locator(ios, "-ios predicate string", "name == 'Row'")) == 2
+    assert counter.count("-ios predicate string", "value == 'First'") == 1
+
+
+def test_xpath_anchors_keep_the_raw_value(ios):
+    counter = MatchCounter(ios)
+    first = generate_ios_locators(node(ios, value="First "))
+    assert first["xpath"] == "//XCUIElementTypeCell[@name=' Row ']/XCUIElementTypeStaticText"
+    assert counter.count("xpath", first["xpath"]) == 1
+    assert counter.count("xpath", "//XCUIElementTypeCell/XCUIElementTypeStaticText") == 2
+    # Not the builder's shape: resolved by lxml
+    assert counter.count("xpath", "//XCUIElementTypeStaticText[@label='Second']") == 1
+
+
+def test_counts_agree_with_find_locator_on_android():
+    android = ElementIndex.from_page_source(ANDROID_SOURCE)
+    counter = MatchCounter(android)
+    for node_id in android.bounded_ids():
+        for strategy, value in generate_android_locators(android.elements[node_id]).items():
+            if value:
+                assert counter.count(strategy, value) == len(find_locator(android, strategy, value)), (strategy, value)
+
+
+def test_score_penalties():
+    assert score_locator("resource-id", "com.app:id/title", 1) == 95
+    assert score_locator("-android uiautomator", 'new UiSelector().text("Hello")', 1) == 70
+    assert score_locator("-android uiautomator", 'new UiSelector().className("android.widget.Button")', 1) == 45
+    assert score_locator("-ios class chain", "**/XCUIElementTypeButton", 1) == 45
+    assert score_locator("xpath", "//android.view.ViewGroup[@resource-id='com.app:id/header']", 1) == 75
+    assert score_locator("xpath", "//android.widget.TextView[@text='Hello']", 1) == 60
+    assert score_locator("xpath", "//hierarchy/android.widget.FrameLayout/android.view.ViewGroup", 1) == 25
+    assert score_locator("resource-id", "com.app:id/row", 4) == 19
+    assert score_locator("resource-id", "com.app:id/missing", 0) == 0
+
+
+def test_build_locator_report_scores_every_bounded_node():
+    android = ElementIndex.from_page_source(ANDROID_SOURCE)
+    rows = build_locator_report(android, "Android")
+
+    assert {row["node_id"] for row in rows} == set(android.bounded_ids())
+    title = {row["strategy"]: row for row in rows if row["node_id"] == 3}
+    assert title["resource-id"]["matches"] == 1 and title["resource-id"]["score"] == 95
+    assert title["xpath"]["value"] == "//android.widget.TextView[@resource-id='com.app:id/title']"
+    # The button has no resource id: its empty locator is left out, not reported with 0 matches
+    button = {row["strategy"] for row in rows if row["node_id"] == 4}
+    assert button == {"-android uiautomator", "xpath"}
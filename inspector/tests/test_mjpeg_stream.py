@@ -0,0 +1,104 @@
+import io
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from logic.mjpeg_stream import MjpegStream, iter_multipart_frames, iter_marker_frames
+
+
+def jpeg(size=(64, 128), color=(200, 30, 30), thumbnail=True):
+    """JPEG whose APP1 segment embeds a whole second JPEG, as EXIF thumbnails do."""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    data = buffer.getvalue()
+    if not thumbnail:
+        return data
+    small = io.BytesIO()
+    Image.new("RGB", (8, 8), (0, 0, 255)).save(small, "JPEG")
+    payload = b"Exif\0\0" + small.getvalue()
+    app1 = b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+    return data[:2] + app1 + data[2:]
+
+
+def multipart(frames, boundary="--BoundaryString", content_length=True):
+    body = b""
+    for frame in frames:
+        body += f"--{boundary.lstrip('-')}\r\nContent-Type: image/jpeg\r\n".encode()
+        if content_length:
+            body += f"Content-Length: {len(frame)}\r\n".encode()
+        body += b"\r\n" + frame + b"\r\n"
+    return body
+
+
+def chunked(data, size=7):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("content_length", [True, False])
+def test_multipart_keeps_frames_with_embedded_thumbnail_whole(content_length):
+    frames = [jpeg(color=(i * 40, 0, 0)) for i in range(4)]
+    found = list(iter_multipart_frames(chunked(multipart(frames, content_length=content_length)), "--BoundaryString"))
+    assert found == frames
+    assert Image.open(io.BytesIO(found[0])).size == (64, 128)
+
+
+def test_multipart_accepts_boundary_with_or_without_dashes():
+    frames = [jpeg(), jpeg(color=(0, 200, 0))]
+    body = multipart(frames, boundary="----BoundaryString")
+    assert list(iter_multipart_frames(chunked(body, 100), "BoundaryString")) == frames
+    assert list(iter_multipart_frames(chunked(body, 100), "--BoundaryString")) == frames
+
+
+def test_marker_fallback_cuts_plain_jpegs():
+    frames = [jpeg(thumbnail=False), jpeg(color=(1, 2, 3), thumbnail=False)]
+    assert list(iter_marker_frames(chunked(b"junk" + b"".join(frames)))) == frames
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    frames = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=--BoundaryString")
+        self.end_headers()
+        try:
+            for frame in self.frames:
+                self.wfile.write(multipart([frame]))
+                self.wfile.flush()
+                time.sleep(0.02)
+            time.sleep(1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def mjpeg_server():
+    _MjpegHandler.frames = [jpeg(size=(90, 160), color=(i * 20, 0, 0)) for i in range(5)]
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MjpegHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_decodes_frames_from_fake_server(mjpeg_server):
+    stream = MjpegStream(mjpeg_server, timeout=5)
+    stream.start()
+    try:
+        deadline = time.monotonic() + 5
+        frame = None
+        while time.monotonic() < deadline and stream.frames_received < 5:
+            frame = stream.latest_frame() or frame
+            time.sleep(0.01)
+        frame = stream.latest_frame() or frame
+    finally:
+        stream.stop()
+    assert stream.error is None
+    assert stream.frames_received == 5
+    assert frame is not None and frame.size == (90, 160)
@@ -0,0 +1,83 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from logic.element_index import ElementIndex
+from logic.screen_index import ScreenIndex, fingerprint, similarity
+from logic.StepToAction import tap_known_position
+
+from fake_appium import ANDROID_SOURCE
+
+
+def list_source(first_item: int, clock: str = "12:00"):
+    rows = "".join(
+        f'<android.widget.TextView bounds="[0,{100 + 60 * row}][360,{160 + 60 * row}]" class="android.widget.TextView" '
+        f'text="Item {first_item + row}" resource-id="com.app:id/row"/>'
+        for row in range(8)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><hierarchy>'
+        '<android.widget.FrameLayout bounds="[0,0][360,800]" class="android.widget.FrameLayout">'
+        f'<android.widget.TextView bounds="[0,0][360,40]" class="android.widget.TextView" text="{clock}"/>'
+        f'<android.widget.ListView bounds="[0,100][360,580]" class="android.widget.ListView">{rows}</android.widget.ListView>'
+        '</android.widget.FrameLayout></hierarchy>'
+    )
+
+
+class FakeDriver:
+    def __init__(self, page_source: str):
+        self.page_source = page_source
+        self.taps = []
+
+
+    def tap(self, positions, duration):
+        self.taps.extend(positions)
+
+
+def test_digits_and_scrolling_keep_the_fingerprint():
+    first = fingerprint(ElementIndex.from_page_source(list_source(1)))
+    assert similarity(first, fingerprint(ElementIndex.from_page_source(list_source(1, "12:59")))) == 1.0
+    assert similarity(first, fingerprint(ElementIndex.from_page_source(list_source(5)))) == 1.0
+    assert similarity(first, fingerprint(ElementIndex.from_page_source(ANDROID_SOURCE))) < 0.5
+
+
+def test_match_learn_and_round_trip(tmp_path):
+    screens = ScreenIndex()
+    list_screen = screens.learn(fingerprint(ElementIndex.from_page_source(list_source(1))), "//row", step=1)
+    other = screens.add(fingerprint(ElementIndex.from_page_source(ANDROID_SOURCE)))
+    assert list_screen != other and len(screens) == 2
+    assert screens.match(fingerprint(ElementIndex.from_page_source(list_source(3))))[0] == list_screen
+
+    screens.save(str(tmp_path / "screens.json"))
+    loaded = ScreenIndex.load(str(tmp_path / "screens.json"))
+    assert loaded.screens[list_screen]["steps"] == [1]
+    assert loaded.cached_element(list_screen, "//row") == {}
+
+
+def recorded_step(element_index: ElementIndex, text: str):
+    node_id = next(node_id for node_id, element in enumerate(element_index.elements) if element.get("text") == text)
+    locator = {"strategy": "-android uiautomator", "by": "-android uiautomator", "value": f'new UiSelector().text("{text}")'}
+    return {"stepNumber": 1, "Android": {"locator": locator, "fallbacks": [], "bounds": list(element_index.bounds[node_id])}}
+
+
+def test_known_position_is_tapped_on_the_recorded_screen():
+    recorded = ElementIndex.from_page_source(list_source(1))
+    screens = ScreenIndex()
+    screens.learn(fingerprint(recorded), "//row", step=1)
+    entry = recorded_step(recorded, "Item 3")
+
+    driver = FakeDriver(list_source(1))
+    assert tap_known_position(driver, screens, entry, "Android")
+    x, y, width, height = entry["Android"]["bounds"]
+    assert driver.taps == [(int(x + width / 2), int(y + height / 2))]
+
+
+def test_scrolled_list_falls_back_to_the_locator():
+    recorded = ElementIndex.from_page_source(list_source(1))
+    screens = ScreenIndex()
+    screens.learn(fingerprint(recorded), "//row", step=1)
+    entry = recorded_step(recorded, "Item 3")
+
+    driver = FakeDriver(list_source(2)) # same screen, every row moved up one
+    assert not tap_known_position(driver, screens, entry, "Android")
+    assert driver.taps == []
@@ -0,0 +1,65 @@
+from logic.element_index import ElementIndex
+from logic.search_index import SearchIndex, tokenize
+
+SOURCE = """<?xml version="1.0" encoding="UTF-8"?><hierarchy>
+<android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][360,800]">
+ <android.view.ViewGroup class="android.view.ViewGroup" resource-id="com.shop:id/brand_card" bounds="[0,0][360,200]">
+  <android.widget.TextView class="android.widget.TextView" text="Summer Sale" resource-id="com.shop:id/title" bounds="[0,0][360,50]"/>
+  <android.widget.Button class="android.widget.Button" text="Add to cart" content-desc="addToCart" bounds="[0,60][360,110]"/>
+ </android.view.ViewGroup>
+ <android.widget.TextView class="android.widget.TextView" text="Cartography" bounds="[0,300][360,350]"/>
+</android.widget.FrameLayout></hierarchy>"""
+
+
+def ids_with(element_index: ElementIndex, attribute: str, value: str):
+    return [node_id for node_id, element in enumerate(element_index.elements) if element.get(attribute) == value]
+
+
+def test_tokenize_splits_snake_and_camel_case():
+    assert tokenize("brand_card") == ["brand", "card"]
+    assert tokenize("brandCard") == ["brand", "card"]
+    assert tokenize("Add to cart!") == ["add", "to", "cart"]
+
+
+def test_prefix_terms_are_anded():
+    element_index = ElementIndex.from_page_source(SOURCE)
+    index = SearchIndex(element_index)
+    button = ids_with(element_index, "text", "Add to cart")
+    cartography = ids_with(element_index, "text", "Cartography")
+
+    assert index.search("cart") == sorted(button + cartography)
+    assert index.search("add cart") == button
+    assert index.search("CART button") == button
+    assert index.search("cart nothing") == []
+
+
+def test_attribute_terms_and_split_ids():
+    element_index = ElementIndex.from_page_source(SOURCE)
+    index = SearchIndex(element_index)
+    card = ids_with(element_index, "resource-id", "com.shop:id/brand_card")
+
+    assert index.search("resource-id:brand_card") == card
+    assert index.search("resource-id:card") == card
+    assert index.search("text:brand") == []
+    # camelCase values are split like the query
+    assert index.search("content-desc:cart") == ids_with(element_index, "content-desc", "addToCart")
+
+
+def test_substring_terms_match_inside_values():
+    element_index = ElementIndex.from_page_source(SOURCE)
+    index = SearchIndex(element_index)
+
+    assert index.search("*ography") == ids_with(element_index, "text", "Cartography")
+    assert index.search("*mer") == ids_with(element_index, "text", "Summer Sale")
+    assert index.search("*id/ti") == ids_with(element_index, "resource-id", "com.shop:id/title")
+    assert index.search("*zz") == []
+
+
+def test_pasted_resource_id_is_not_an_attribute_qualifier():
+    element_index = ElementIndex.from_page_source(SOURCE)
+    index = SearchIndex(element_index)
+    card = ids_with(element_index, "resource-id", "com.shop:id/brand_card")
+
+    assert index.search("com.shop:id/brand_card") == card
+    assert index.search("resource-id:com.shop:id/brand_card") == card
+    assert index.search("tag:android.widget.button") == ids_with(element_index, "text", "Add to cart")
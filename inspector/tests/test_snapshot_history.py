@@ -0,0 +1,113 @@
+import os
+import threading
+
+import pytest
+
+from logic.snapshot import Snapshot
+from logic.snapshot_history import SnapshotHistory
+from logic.snapshot_store import SnapshotStore
+
+from fake_appium import ANDROID_SOURCE
+
+WINDOW = {"width": 360, "height": 800}
+
+
+def snapshot(size=(200, 200)):
+    # Random pixels barely compress, so every frame weighs about its raw size
+    pixels = os.urandom(size[0] * size[1] * 3)
+    return Snapshot(pixels, size, ANDROID_SOURCE, WINDOW, "Android", device="emulator-5554")
+
+
+def settle(history: SnapshotHistory):
+    history._executor.submit(lambda: None).result()
+
+
+def test_positions_stay_stable_when_the_budget_drops_entries():
+    history = SnapshotHistory(capacity_bytes=200_000)
+    snapshots = [snapshot() for _ in range(8)]
+    positions = [history.append(item) for item in snapshots]
+    settle(history)
+
+    assert positions == list(range(8))
+    assert history.last_position == 7
+    assert len(history) == 1
+    assert history.get(positions[-1]).key == snapshots[-1].key
+    assert history.memory_bytes <= 200_000
+    with pytest.raises(KeyError):
+        history.get(positions[0])
+    assert history.nearest(0) == 7
+    assert history.append(snapshot()) == 8
+    history.close()
+
+
+def test_pending_frames_count_against_the_budget():
+    history = SnapshotHistory()
+    stalled = threading.Event()
+    history._executor.submit(stalled.wait) # compression queues behind it
+    history.append(snapshot())
+    assert history.memory_bytes == 200 * 200 * 3
+    stalled.set()
+    settle(history)
+    assert 0 < history.memory_bytes < 200 * 200 * 3 + 4096
+    history.close()
+
+
+def test_append_compresses_inline_when_pending_frames_exceed_the_budget():
+    history = SnapshotHistory(capacity_bytes=200_000)
+    stalled = threading.Event()
+    history._executor.submit(stalled.wait)
+    snapshots = [snapshot() for _ in range(6)]
+    for item in snapshots:
+        history.append(item)
+        assert history.memory_bytes <= 200_000
+
+    assert history.get(history.last_position).key == snapshots[-1].key
+    stalled.set()
+    settle(history)
+    assert history.memory_bytes <= 200_000
+    history.close()
+
+
+def test_max_entries_moves_the_first_position():
+    history = SnapshotHistory(max_entries=3)
+    snapshots = [snapshot((8, 8)) for _ in range(5)]
+    for item in snapshots:
+        history.append(item)
+    settle(history)
+
+    assert (history.first_position, history.last_position) == (2, 4)
+    assert 1 not in history and 2 in history
+    assert history.get(4).key == snapshots[4].key
+    with pytest.raises(KeyError):
+        history.get(1)
+    history.close()
+
+
+def test_evicted_snapshots_come_back_from_the_store_and_are_deleted_on_close(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    history = SnapshotHistory(capacity_bytes=200_000, store=store)
+    snapshots = [snapshot() for _ in range(4)]
+    for item in snapshots:
+        history.append(item)
+    settle(history)
+
+    assert len(history) == 4
+    assert store.keys()
+    restored = history.get(0)
+    assert restored.key == snapshots[0].key
+    assert bytes(restored.pixels) == snapshots[0].pixels
+    assert restored.device == "emulator-5554"
+
+    history.close()
+    assert store.keys() == []
+
+
+def test_store_prune_keeps_the_newest(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    keys = [store.save(snapshot((16, 16))) for _ in range(4)]
+    for age, key in enumerate(keys):
+        os.utime(store.path(key), (age, age))
+    size = os.path.getsize(store.path(keys[0]))
+
+    assert store.prune(2 * size) == 2
+    assert store.keys() == keys[2:]
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from logic.snapshot import Snapshot
+from logic.snapshot_store import SnapshotStore
+
+from fake_appium import ANDROID_SOURCE
+
+WINDOW = {"width": 360, "height": 800}
+
+
+def snapshot(size=(36, 80)):
+    pixels = os.urandom(size[0] * size[1] * 3)
+    return Snapshot(pixels, size, ANDROID_SOURCE, WINDOW, "Android", device="emulator-5554")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    original = snapshot()
+    key = store.save(original)
+
+    assert key == original.key and key in store
+    loaded = store.load(key)
+    assert isinstance(loaded.pixels, memoryview) # mapped, not copied
+    assert bytes(loaded.pixels) == original.pixels
+    assert (loaded.size, loaded.window_size, loaded.platform, loaded.device) == ((36, 80), WINDOW, "Android", "emulator-5554")
+    assert loaded.page_source == ANDROID_SOURCE
+    assert loaded.element_index.to_table() == original.element_index.to_table()
+    assert loaded.element_index.parents == original.element_index.parents
+    assert loaded.element_index.bounds == original.element_index.bounds
+    assert loaded.locators == original.locators
+
+
+def test_save_is_idempotent_and_keys_follow_capture_order(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    snapshots = [snapshot() for _ in range(3)]
+    keys = [store.save(item) for item in snapshots]
+    for age, key in enumerate(keys):
+        os.utime(store.path(key), (age, age))
+
+    assert store.save(snapshots[0]) == keys[0]
+    assert store.keys() == keys
+    store.delete(keys[1])
+    store.delete(keys[1]) # already gone
+    assert store.keys() == [keys[0], keys[2]]
+
+
+def test_load_rejects_other_files(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    path = store.path("ab" * 32)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"\0" * 64)
+    with pytest.raises(ValueError):
+        store.load("ab" * 32)
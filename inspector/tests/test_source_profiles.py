@@ -0,0 +1,86 @@
+import time
+
+from logic.element_index import ElementIndex
+from logic.source_profiles import SourceProfiler, index_from_ios_json, locator_coverage
+
+from fake_appium import ANDROID_SOURCE
+
+IOS_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><AppiumAUT>
+<XCUIElementTypeApplication type="XCUIElementTypeApplication" name="Demo" label="Demo" enabled="true" visible="true" x="0" y="0" width="390" height="844">
+ <XCUIElementTypeButton type="XCUIElementTypeButton" name="continue" label="Continue" enabled="true" visible="true" x="20" y="700" width="350" height="44"/>
+ <XCUIElementTypeTextField type="XCUIElementTypeTextField" name="email" value="a@b.c" enabled="false" visible="true" x="20" y="100" width="350" height="40"/>
+</XCUIElementTypeApplication></AppiumAUT>"""
+
+IOS_JSON = {
+    "type": "Application", "name": "Demo", "label": "Demo", "isEnabled": "1", "isVisible": "1",
+    "rect": {"x": 0, "y": 0, "width": 390, "height": 844},
+    "children": [
+        {"type": "Button", "name": "continue", "label": "Continue", "isEnabled": True, "isVisible": True,
+         "rect": {"x": 20, "y": 700, "width": 350, "height": 44}},
+        {"type": "TextField", "name": "email", "label": "", "value": "a@b.c", "isEnabled": False, "isVisible": True,
+         "rect": {"x": 20, "y": 100, "width": 350, "height": 40}},
+    ],
+}
+
+# The Continue button is past the depth limit
+SHALLOW_SOURCE = "\n".join(line for line in ANDROID_SOURCE.splitlines() if "Continue" not in line)
+
+
+class FakeDriver:
+    """Serves the hierarchy the applied settings ask for; the full source is the slowest."""
+
+    def __init__(self):
+        self.capabilities = {"platformName": "Android", "udid": "emulator-5554", "platformVersion": "14"}
+        self.settings = {}
+        self.fetches = 0
+
+
+    def update_settings(self, settings: dict):
+        self.settings.update(settings)
+
+
+    @property
+    def page_source(self):
+        self.fetches += 1
+        if self.settings.get("snapshotMaxDepth") == 40:
+            return SHALLOW_SOURCE
+        time.sleep(0.01 if self.settings.get("ignoreUnimportantViews") else 0.04)
+        return ANDROID_SOURCE
+
+
+def test_ios_json_index_matches_the_xml_source():
+    xml = ElementIndex.from_page_source(IOS_SOURCE)
+    json_index = index_from_ios_json(IOS_JSON)
+    xml_ids = range(1, len(xml)) # the XML wraps the tree in AppiumAUT
+
+    assert [xml.elements[node_id].tag for node_id in xml_ids] == [element.tag for element in json_index.elements]
+    assert [xml.bounds[node_id] for node_id in xml_ids] == json_index.bounds
+    assert [xml.parents[node_id] - 1 if xml.parents[node_id] > 0 else -1 for node_id in xml_ids] == json_index.parents
+    for node_id, element in zip(xml_ids, json_index.elements):
+        assert element.attrib == {key: xml.elements[node_id].get(key) for key in element.attrib}
+    assert locator_coverage(json_index, xml, "iOS") == 1.0
+
+
+def test_shallow_tree_loses_coverage():
+    full = ElementIndex.from_page_source(ANDROID_SOURCE)
+    shallow = ElementIndex.from_page_source(SHALLOW_SOURCE)
+    assert locator_coverage(full, full, "Android") == 1.0
+    assert locator_coverage(shallow, full, "Android") == 0.6
+
+
+def test_choose_skips_shallow_profiles_and_reuses_the_cache(tmp_path):
+    cache_path = str(tmp_path / "profiles.json")
+    driver = FakeDriver()
+    profile = SourceProfiler(driver, "Android", cache_path).choose()
+
+    # compressed-shallow is the fastest, but misses the button
+    assert profile.name == "compressed"
+    assert driver.settings == profile.settings
+    assert driver.fetches == 6
+
+    again = FakeDriver()
+    profiler = SourceProfiler(again, "Android", cache_path)
+    assert profiler.choose().name == "compressed"
+    assert again.fetches == 0
+    assert again.settings == profile.settings
+    assert [row["name"] for row in profiler.results] == ["full", "compressed", "compressed-shallow"]
@@ -0,0 +1,133 @@
+import pytest
+
+from logic.element_index import ElementIndex
+from logic.StepToAction import DEFAULT_COSTS, LocalFinder, LocatorStats, StepCompiler, click_step, replay_plan
+
+from fake_appium import ANDROID_SOURCE
+
+CONTINUE = {
+    "accessibility id": "continue",
+    "-android uiautomator": 'new UiSelector().text("Continue")',
+    "xpath": "//android.widget.Button",
+    "resource-id": "com.app:id/missing",
+}
+
+
+class FakeElement:
+    def __init__(self, driver, locator):
+        self._driver = driver
+        self._locator = locator
+
+
+    def click(self):
+        self._driver.clicks.append(self._locator)
+
+
+class FakeDriver:
+    """Resolves (by, value) pairs to a match count; anything else is not found."""
+
+    def __init__(self, matches: dict):
+        self.matches = matches
+        self.clicks = []
+
+
+    def find_elements(self, by, value):
+        return [FakeElement(self, (by, value))] * self.matches.get((by, value), 0)
+
+
+    def find_element(self, by, value):
+        if not self.matches.get((by, value)):
+            raise LookupError(f"{by}={value} not found")
+        return FakeElement(self, (by, value))
+
+
+def android_finder():
+    return LocalFinder(ElementIndex.from_page_source(ANDROID_SOURCE), "Android")
+
+
+def test_unmeasured_strategies_rank_by_default_cost():
+    compiled = StepCompiler().compile_step(CONTINUE, android_finder())
+
+    assert compiled["locator"]["strategy"] == "accessibility id"
+    assert [locator["strategy"] for locator in compiled["fallbacks"]] == ["-android uiautomator", "xpath"]
+    assert compiled["locator"]["cost_ms"] == DEFAULT_COSTS["accessibility id"]
+
+
+def test_device_timings_override_the_defaults():
+    stats = LocatorStats()
+    stats.record("Android", "accessibility id", 0.9)
+    stats.record("Android", "xpath", 0.2)
+    stats.record("iOS", "-android uiautomator", 0.001) # other platforms do not count
+    compiled = StepCompiler(stats).compile_step(CONTINUE, android_finder())
+
+    assert [compiled["locator"]["strategy"]] + [locator["strategy"] for locator in compiled["fallbacks"]] == [
+        "xpath", "-android uiautomator", "accessibility id",
+    ]
+    assert compiled["locator"]["cost_ms"] == 200.0
+
+
+def test_local_lookups_leave_the_stats_alone():
+    stats = LocatorStats()
+    StepCompiler(stats).compile_step(CONTINUE, android_finder())
+    assert stats.summary() == {}
+
+
+def test_no_unique_locator_compiles_to_none():
+    assert StepCompiler().compile_step({"xpath": "//*[@bounds]", "resource-id": ""}, android_finder()) is None
+
+
+def test_stats_round_trip_and_drop_local_samples(tmp_path):
+    path = tmp_path / "stats.json"
+    stats = LocatorStats()
+    stats.record("Android", "xpath", 0.5)
+    stats.record("Android", "xpath", 1.5)
+    stats.save(str(path))
+
+    loaded = LocatorStats.load(str(path))
+    assert loaded.cost("Android", "xpath") == 1000.0
+    assert loaded.summary()["Android|xpath"] == {"count": 2, "mean_ms": 1000.0, "min_ms": 500.0, "max_ms": 1500.0}
+    assert LocatorStats.load(str(tmp_path / "missing.json")).summary() == {}
+
+    path.write_text('{"Android|xpath": [1, 0.1, 0.1, 0.1], "Android|xpath|local": [1, 0.00001, 0.00001, 0.00001]}')
+    assert list(LocatorStats.load(str(path)).summary()) == ["Android|xpath"]
+
+
+def test_click_step_falls_back_in_order_and_records_what_resolved():
+    compiled = StepCompiler().compile_step(CONTINUE, android_finder())
+    driver = FakeDriver({("xpath", "//android.widget.Button"): 1})
+    stats = LocatorStats()
+
+    locator = click_step(driver, compiled, stats, "Android")
+    assert locator["strategy"] == "xpath"
+    assert driver.clicks == [("xpath", "//android.widget.Button")]
+    assert list(stats.summary()) == ["Android|xpath"]
+
+
+def test_click_step_raises_the_last_error_when_nothing_resolves():
+    compiled = StepCompiler().compile_step(CONTINUE, android_finder())
+    with pytest.raises(LookupError, match="xpath"):
+        click_step(FakeDriver({}), compiled)
+
+
+def test_compile_recording_on_a_device_measures_and_clicks():
+    records = [{"stepNumber": 3, "android_ids": {"accessibility id": "continue", "resource-id": "com.app:id/title"}}]
+    driver = FakeDriver({("accessibility id", "continue"): 1, ("id", "com.app:id/title"): 1})
+    compiler = StepCompiler()
+    plan = compiler.compile_recording(records, drivers={"Android": driver}, settle=0)
+
+    assert plan[0]["stepNumber"] == 3
+    assert plan[0]["Android"]["locator"]["by"] in ("accessibility id", "id")
+    assert set(compiler.stats.summary()) == {"Android|accessibility id", "Android|resource-id"}
+    assert driver.clicks == [(plan[0]["Android"]["locator"]["by"], plan[0]["Android"]["locator"]["value"])]
+
+
+def test_replay_plan_clicks_every_step_and_skips_missing_platforms():
+    compiled = StepCompiler().compile_step(CONTINUE, android_finder())
+    plan = [{"stepNumber": 1, "Android": compiled}, {"stepNumber": 2}]
+    driver = FakeDriver({("-android uiautomator", CONTINUE["-android uiautomator"]): 1})
+    stats = LocatorStats()
+
+    timings = replay_plan(plan, {"Android": driver}, settle=0, stats=stats)
+    assert len(timings) == 2
+    assert driver.clicks == [("-android uiautomator", CONTINUE["-android uiautomator"])]
+    assert list(stats.summary()) == ["Android|-android uiautomator"]